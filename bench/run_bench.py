@@ -0,0 +1,270 @@
+"""
+ShellExecutor 基准测试。
+
+启动本地 SSH 替身服务器（见 bench/standin.py），对插件的关键路径计时：
+
+- cold_exec：新建连接 + 执行一条命令 + 关闭
+- jump_cold_exec：同上，但经由跳板机（另一个替身服务器）转发，跳板机连接在各次之间复用
+- warm_exec：在已建立的连接上执行一条命令
+- cached_command：经 _run_command 命中结果缓存
+- status_sweep：完整的 _collect_remote_status
+- status_html：_build_status_html
+- large_output：流式读取大输出（默认 8 MB）
+- ansi_to_html：转换合成的多 MB ANSI 彩色文本
+- sftp_get / sftp_put：通过 SFTP 下载、上传文件（默认 32 MB）
+
+结果以 JSON 输出，可用 --baseline 与上一次的结果对比。需要在能导入 astrbot 的环境中运行
+（例如 AstrBot 的虚拟环境），在仓库根目录执行::
+
+    python -m bench.run_bench --iterations 20 --output bench_output.json
+    python -m bench.run_bench --baseline bench_output.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import paramiko
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench.standin import StandinServer  # noqa: E402
+from main import ShellExecutor  # noqa: E402
+
+
+class _BenchEvent:
+    """只实现 _run_command 需要的最少接口"""
+
+    message_str = ""
+    unified_msg_origin = "bench"
+
+    def plain_result(self, text):
+        return text
+
+    def get_sender_id(self):
+        return "bench"
+
+    def get_sender_name(self):
+        return "bench"
+
+
+def _summarize(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "n": len(samples),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "median_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+    }
+
+
+def _time(fn, iterations: int, warmup: int = 1) -> list[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _synthetic_ansi(size: int) -> str:
+    line = (
+        "\x1b[1;32muser\x1b[0m@\x1b[1;34mhost\x1b[0m  \x1b[33mOS:\x1b[0m Arch Linux x86_64 "
+        "\x1b[31m<&>\x1b[39m \x1b[90;44mdim\x1b[0m plain text tail\n"
+    )
+    return line * max(1, size // len(line))
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run(args) -> dict:
+    server = StandinServer(
+        exec_latency=args.exec_latency_ms / 1000, connect_latency=args.connect_latency_ms / 1000
+    ).start()
+    bastion = StandinServer(connect_latency=args.connect_latency_ms / 1000).start()
+    plugin = ShellExecutor(
+        None,
+        {
+            "ssh_host": server.host,
+            "ssh_port": server.port,
+            "username": "bench",
+            "password": "bench",
+            "private_key_path": "",
+            "timeout": 30,
+        },
+    )
+    results: dict[str, dict] = {}
+    try:
+        def cold():
+            client = plugin.connect_client()
+            plugin._exec(client, "echo ok")
+            client.close()
+
+        results["cold_exec"] = _summarize(_time(cold, args.iterations))
+
+        jump_plugin = ShellExecutor(
+            None,
+            {
+                "ssh_host": server.host,
+                "ssh_port": server.port,
+                "username": "bench",
+                "password": "bench",
+                "private_key_path": "",
+                "timeout": 30,
+                "jump_host": f"bench@{bastion.host}:{bastion.port}",
+                "jump_password": "bench",
+            },
+        )
+
+        def jump_cold():
+            client = jump_plugin.connect_client()
+            jump_plugin._exec(client, "echo ok")
+            client.close()
+
+        try:
+            results["jump_cold_exec"] = _summarize(_time(jump_cold, args.iterations))
+            results["jump_cold_exec"]["bastion_connections"] = len(bastion._transports)
+        finally:
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(jump_plugin.terminate())
+            loop.close()
+
+        client = plugin.connect_client()
+        try:
+            results["warm_exec"] = _summarize(
+                _time(lambda: plugin._exec(client, "echo ok"), args.iterations)
+            )
+
+            size = args.large_output_mb * 1024 * 1024
+            samples = _time(
+                lambda: plugin._exec_timed(client, f"bench-output {size}"), max(3, args.iterations // 4)
+            )
+            results["large_output"] = _summarize(samples)
+            results["large_output"]["mb_per_s"] = round(
+                args.large_output_mb / statistics.median(samples), 2
+            )
+        finally:
+            client.close()
+
+        event = _BenchEvent()
+
+        async def drain():
+            async for _ in plugin._run_command(event, "cat /proc/cpuinfo", cache="lspci"):
+                pass
+
+        loop = asyncio.new_event_loop()
+        try:
+            results["cached_command"] = _summarize(
+                _time(lambda: loop.run_until_complete(drain()), args.iterations)
+            )
+        finally:
+            loop.close()
+
+        status_samples = []
+        status = None
+        for _ in range(max(3, args.iterations // 4)):
+            start = time.perf_counter()
+            status = plugin._collect_remote_status()
+            status_samples.append(time.perf_counter() - start)
+        results["status_sweep"] = _summarize(status_samples)
+        results["status_sweep"]["remote_execs"] = server.exec_count
+        results["status_html"] = _summarize(
+            _time(lambda: plugin._build_status_html(status), args.iterations)
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "source.bin")
+            with open(source, "wb") as f:
+                for _ in range(args.transfer_mb):
+                    f.write(os.urandom(1024 * 1024))
+            iterations = max(3, args.iterations // 4)
+            samples = _time(lambda: plugin._sftp_get(source), iterations)
+            results["sftp_get"] = _summarize(samples)
+            results["sftp_get"]["mb_per_s"] = round(args.transfer_mb / statistics.median(samples), 2)
+            target = os.path.join(directory, "target.bin")
+            samples = _time(lambda: plugin._sftp_put(source, target), iterations)
+            results["sftp_put"] = _summarize(samples)
+            results["sftp_put"]["mb_per_s"] = round(args.transfer_mb / statistics.median(samples), 2)
+
+        text = _synthetic_ansi(args.ansi_mb * 1024 * 1024)
+        samples = _time(lambda: plugin._ansi_to_html(text), max(3, args.iterations // 4))
+        results["ansi_to_html"] = _summarize(samples)
+        results["ansi_to_html"]["mb_per_s"] = round(args.ansi_mb / statistics.median(samples), 2)
+    finally:
+        bastion.stop()
+        server.stop()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "paramiko": paramiko.__version__,
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "exec_latency_ms": args.exec_latency_ms,
+            "connect_latency_ms": args.connect_latency_ms,
+            "large_output_mb": args.large_output_mb,
+            "ansi_mb": args.ansi_mb,
+            "transfer_mb": args.transfer_mb,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """按 median 计算相对基线的变化比例，正数表示变慢"""
+    diff = {}
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base and base.get("median_ms"):
+            diff[name] = round(stats["median_ms"] / base["median_ms"] - 1, 4)
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShellExecutor 基准测试")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--exec-latency-ms", type=float, default=0.0)
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0)
+    parser.add_argument("--large-output-mb", type=int, default=8)
+    parser.add_argument("--ansi-mb", type=int, default=4)
+    parser.add_argument("--transfer-mb", type=int, default=32)
+    parser.add_argument("--output", help="结果写入的 JSON 文件，缺省输出到 stdout")
+    parser.add_argument("--baseline", help="用于对比的上一次结果 JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["vs_baseline"] = compare(report, json.load(f))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
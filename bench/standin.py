@@ -0,0 +1,299 @@
+"""
+本地 SSH 替身服务器，供基准测试使用。
+
+基于 Paramiko 实现，接受任意用户名/密码或公钥认证，按以下顺序响应 exec 请求：
+
+1. 内置的固定响应（如 ``bench-output <字节数>`` 用于大输出流式传输测试）；
+2. 其余命令交给本机 ``/bin/sh`` 执行，``bench/stubs`` 目录会被放在 PATH 最前面，
+   以便在没有 GPU、dmidecode 等环境的机器上也能返回固定的模拟输出。
+
+同时提供直接映射本机文件系统的 SFTP 子系统，用于文件传输测试；并支持 ``direct-tcpip``
+端口转发，可作为跳板机把连接转发到另一个替身服务器。
+
+每次 exec 与每次建连都可注入固定延迟，用于模拟网络往返或远程执行耗时。
+
+单独运行::
+
+    python -m bench.standin --port 2222 --exec-latency-ms 20
+"""
+
+import argparse
+import os
+import re
+import select
+import socket
+import subprocess
+import threading
+import time
+
+import paramiko
+
+STUBS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stubs")
+CHUNK_SIZE = 32 * 1024
+
+
+class _StandinInterface(paramiko.ServerInterface):
+    def __init__(self, server: "StandinServer"):
+        self.server = server
+        # 通道 ID -> direct-tcpip 转发目标
+        self.forwards: dict[int, tuple[str, int]] = {}
+
+    def get_allowed_auths(self, username):
+        return "password,publickey"
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_direct_tcpip_request(self, chanid, origin, destination):
+        self.forwards[chanid] = destination
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        cmd = command.decode("utf-8", errors="replace")
+        threading.Thread(target=self.server.handle_exec, args=(channel, cmd), daemon=True).start()
+        return True
+
+
+class _LocalSFTP(paramiko.SFTPServerInterface):
+    """把 SFTP 请求直接映射到本机文件系统，只实现文件传输所需的操作"""
+
+    @staticmethod
+    def _errno(e: OSError) -> int:
+        return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(path))
+        except OSError as e:
+            return self._errno(e)
+
+    def lstat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+        except OSError as e:
+            return self._errno(e)
+
+    def list_folder(self, path):
+        try:
+            return [
+                paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)), name)
+                for name in os.listdir(path)
+            ]
+        except OSError as e:
+            return self._errno(e)
+
+    def open(self, path, flags, attr):
+        try:
+            fd = os.open(path, flags | getattr(os, "O_BINARY", 0), 0o644)
+        except OSError as e:
+            return self._errno(e)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = paramiko.SFTPHandle(flags)
+        handle.filename = path
+        f = os.fdopen(fd, mode)
+        if "r" in mode or "+" in mode:
+            handle.readfile = f
+        if mode != "rb":
+            handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            return self._errno(e)
+        return paramiko.SFTP_OK
+
+    def posix_rename(self, oldpath, newpath):
+        try:
+            os.replace(oldpath, newpath)
+        except OSError as e:
+            return self._errno(e)
+        return paramiko.SFTP_OK
+
+    rename = posix_rename
+
+
+class StandinServer:
+    """监听本地端口的 SSH 替身服务器，在后台线程中运行"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, exec_latency: float = 0.0,
+                 connect_latency: float = 0.0, host_key: paramiko.PKey | None = None):
+        self.exec_latency = exec_latency
+        self.connect_latency = connect_latency
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)
+        self.exec_count = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen(64)
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._transports: list[paramiko.Transport] = []
+        self._stopped = threading.Event()
+        self._env = dict(os.environ, PATH=f"{STUBS_DIR}:{os.environ.get('PATH', '/usr/bin:/bin')}", LANG="C")
+
+    def start(self) -> "StandinServer":
+        threading.Thread(target=self._accept_loop, name="ssh-standin", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        for transport in self._transports:
+            transport.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn: socket.socket):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+        transport = paramiko.Transport(conn)
+        transport.add_server_key(self.host_key)
+        transport.set_subsystem_handler("sftp", paramiko.SFTPServer, _LocalSFTP)
+        self._transports.append(transport)
+        interface = _StandinInterface(self)
+        try:
+            transport.start_server(server=interface)
+        except (paramiko.SSHException, EOFError, OSError):
+            transport.close()
+            return
+        # exec 请求在回调中处理，这里只接管 direct-tcpip 通道；
+        # Transport 对通道只持有弱引用，取出的会话通道需保留引用，否则会被回收并关闭
+        sessions = []
+        while transport.is_active():
+            channel = transport.accept(1)
+            if channel is None:
+                continue
+            if channel.get_id() in interface.forwards:
+                destination = interface.forwards.pop(channel.get_id())
+                threading.Thread(target=self._forward, args=(channel, destination), daemon=True).start()
+            else:
+                sessions.append(channel)
+
+    @staticmethod
+    def _forward(channel: paramiko.Channel, destination: tuple[str, int]):
+        try:
+            sock = socket.create_connection(destination)
+        except OSError:
+            channel.close()
+            return
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                readable, _, _ = select.select([sock, channel], [], [])
+                if sock in readable:
+                    data = sock.recv(CHUNK_SIZE)
+                    if not data:
+                        break
+                    channel.sendall(data)
+                if channel in readable:
+                    data = channel.recv(CHUNK_SIZE)
+                    if not data:
+                        break
+                    sock.sendall(data)
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            sock.close()
+            channel.close()
+
+    def handle_exec(self, channel: paramiko.Channel, cmd: str):
+        self.exec_count += 1
+        try:
+            if self.exec_latency:
+                time.sleep(self.exec_latency)
+            match = re.fullmatch(r"bench-output (\d+)", cmd.strip())
+            if match:
+                self._send_synthetic(channel, int(match.group(1)))
+                channel.send_exit_status(0)
+            else:
+                channel.send_exit_status(self._run_local(channel, cmd))
+            # 先发送 EOF，稍后再关闭通道：过早关闭可能抢在 exec 请求的成功应答之前到达客户端
+            channel.shutdown_write()
+        except (OSError, EOFError, paramiko.SSHException):
+            pass
+        finally:
+            threading.Timer(1.0, channel.close).start()
+
+    @staticmethod
+    def _send_synthetic(channel: paramiko.Channel, size: int):
+        line = b"0123456789abcdefghijklmnopqrstuvwxyz" * 3 + b"\n"
+        chunk = line * (CHUNK_SIZE // len(line))
+        remaining = size
+        while remaining > 0:
+            part = chunk[:remaining]
+            channel.sendall(part)
+            remaining -= len(part)
+
+    def _run_local(self, channel: paramiko.Channel, cmd: str) -> int:
+        proc = subprocess.Popen(
+            ["/bin/sh", "-c", cmd],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self._env,
+        )
+
+        def pump_stderr():
+            for data in iter(lambda: proc.stderr.read(CHUNK_SIZE), b""):
+                channel.sendall_stderr(data)
+
+        err_thread = threading.Thread(target=pump_stderr, daemon=True)
+        err_thread.start()
+        for data in iter(lambda: proc.stdout.read1(CHUNK_SIZE), b""):
+            channel.sendall(data)
+        err_thread.join()
+        code = proc.wait()
+        # 被信号终止时按 shell 的习惯返回 128 + 信号值
+        return code if code >= 0 else 128 - code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 SSH 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2222)
+    parser.add_argument("--exec-latency-ms", type=float, default=0.0, help="每次 exec 前注入的延迟")
+    parser.add_argument("--connect-latency-ms", type=float, default=0.0, help="每次建连前注入的延迟")
+    args = parser.parse_args()
+    server = StandinServer(
+        args.host, args.port, args.exec_latency_ms / 1000, args.connect_latency_ms / 1000
+    ).start()
+    print(f"SSH 替身服务器已启动: {server.host}:{server.port}（任意用户名/密码）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,1878 @@
+import asyncio
+import bisect
+import concurrent.futures
+import contextlib
+import copy
+import fnmatch
+import glob
+import hashlib
+import heapq
 import html
+import json
+import operator
 import os
 import re
 import shlex
+import socket
+import sqlite3
+import stat
+import string
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
 
 import paramiko  # 依赖 Paramiko 实现 SSH 功能
 
 from astrbot.api.all import *
 from astrbot.api.event.filter import *
 
+try:
+    # Pillow 为可选依赖，仅本地绘制状态图片时使用；astrbot 的消息组件中也有 Image，这里改名导入
+    from PIL import Image as PILImage, ImageDraw, ImageFont
+except ImportError:
+    PILImage = ImageDraw = ImageFont = None
+
+
+class _ResultCache:
+    """
+    只读命令结果缓存，按 (主机, 命令) 存储。
+    每条记录带独立 TTL 与标签，超出内存上限时按 LRU 淘汰，变更类命令按标签失效。
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # (host, key) -> (过期时间, 写入时间, 估算字节数, 标签, 值)
+        self._entries: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _estimate_size(value) -> int:
+        if isinstance(value, str):
+            return len(value.encode("utf-8", errors="ignore"))
+        if isinstance(value, bytes):
+            return len(value)
+        if isinstance(value, (tuple, list)):
+            return sum(_ResultCache._estimate_size(v) for v in value) + 16
+        if hasattr(value, "__dict__"):
+            return _ResultCache._estimate_size(tuple(vars(value).values()))
+        return len(repr(value))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry[2]
+
+    def get(self, host: str, key: str):
+        """返回 (值, 写入时间)，未命中或已过期返回 None"""
+        with self._lock:
+            entry = self._entries.get((host, key))
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop((host, key))
+                self.misses += 1
+                return None
+            self._entries.move_to_end((host, key))
+            self.hits += 1
+            return entry[4], entry[1]
+
+    def put(self, host: str, key: str, value, ttl: float, tags=()):
+        size = self._estimate_size(value)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._drop((host, key))
+            self._entries[(host, key)] = (now + ttl, now, size, frozenset(tags), value)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        """命中与未命中次数（每次 get 计一次）以及当前的条目数与估算字节数"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+    def invalidate(self, host: str, tags=None) -> int:
+        """使主机下带任一标签的记录失效，tags 为 None 时清空该主机全部记录"""
+        with self._lock:
+            keys = [
+                k for k, entry in self._entries.items()
+                if k[0] == host and (tags is None or entry[3] & set(tags))
+            ]
+            for k in keys:
+                self._drop(k)
+            return len(keys)
+
+
+# 延迟直方图的桶上界（秒），从 1ms 起按 1.5 倍递增至约 128s
+_LATENCY_BUCKETS = tuple(round(0.001 * 1.5 ** i, 6) for i in range(30))
+
+
+class _Histogram:
+    """固定桶的延迟直方图，内存占用恒定，用桶内线性插值估算分位数"""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(_LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(_LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = _LATENCY_BUCKETS[i - 1] if i > 0 else 0.0
+                upper = _LATENCY_BUCKETS[i] if i < len(_LATENCY_BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class _LatencyStats:
+    """
+    按主机记录各阶段（TCP 建连、密钥交换、认证、通道、执行、传输、渲染）与各命令的耗时直方图，
+    并保留每台主机最慢的若干次状态探测。可选地把每条记录以 JSON 行写入日志文件。
+    """
+
+    SLOW_PROBES_KEPT = 5
+
+    def __init__(self, log_path: str = ""):
+        self.log_path = os.path.expanduser(log_path) if log_path else ""
+        # (host, 类别, 名称) -> _Histogram，类别为 phase / command / probe
+        self.histograms: dict[tuple[str, str, str], _Histogram] = {}
+        self.slow_probes: dict[str, list] = {}
+        # 每次记录递增，供指标导出判断是否需要重新生成
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def _observe(self, key: tuple[str, str, str], value: float):
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = _Histogram()
+        hist.observe(value)
+
+    def record(self, host: str, kind: str, name: str, phases: dict[str, float], total: float | None = None):
+        """
+        记录一次连接 (connect)、命令 (command) 或状态探测 (probe) 的分段耗时。
+        total 缺省为各阶段之和；命令的总耗时包含建连，但建连阶段已由 connect 单独记录。
+        """
+        if total is None:
+            total = sum(phases.values())
+        with self._lock:
+            for phase, value in phases.items():
+                self._observe((host, "phase", phase), value)
+            self._observe((host, kind, name), total)
+            self.version += 1
+            if kind == "probe":
+                slow = self.slow_probes.setdefault(host, [])
+                entry = (total, name, datetime.now().strftime("%H:%M:%S"))
+                if len(slow) < self.SLOW_PROBES_KEPT:
+                    heapq.heappush(slow, entry)
+                elif total > slow[0][0]:
+                    heapq.heapreplace(slow, entry)
+        if self.log_path:
+            self._write_log(host, kind, name, phases, total)
+
+    def _write_log(self, host: str, kind: str, name: str, phases: dict[str, float], total: float):
+        line = json.dumps(
+            {
+                "ts": round(time.time(), 3),
+                "host": host,
+                "kind": kind,
+                "name": name,
+                "phases": {k: round(v, 6) for k, v in phases.items()},
+                "total": round(total, 6),
+            },
+            ensure_ascii=False,
+        )
+        try:
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            logger.warning(f"[耗时日志写入失败] {self.log_path}: {e}")
+
+
+# 主机指标族：名称 -> (类型, 说明)
+_HOST_METRIC_FAMILIES = {
+    "shell_executor_host_up": ("gauge", "Whether the last status collection succeeded."),
+    "shell_executor_last_sample_timestamp_seconds": ("gauge", "Unix time of the last status sample."),
+    "shell_executor_cpu_usage_percent": ("gauge", "Total CPU usage."),
+    "shell_executor_load_average": ("gauge", "System load average."),
+    "shell_executor_memory_total_bytes": ("gauge", "Total memory."),
+    "shell_executor_memory_used_bytes": ("gauge", "Used memory."),
+    "shell_executor_swap_total_bytes": ("gauge", "Total swap."),
+    "shell_executor_swap_used_bytes": ("gauge", "Used swap."),
+    "shell_executor_processes": ("gauge", "Number of processes."),
+    "shell_executor_disk_used_percent": ("gauge", "Filesystem usage."),
+    "shell_executor_disk_used_bytes": ("gauge", "Filesystem used bytes."),
+    "shell_executor_disk_size_bytes": ("gauge", "Filesystem size."),
+    "shell_executor_disk_io_bytes_per_second": ("gauge", "Block device throughput."),
+    "shell_executor_disk_iops": ("gauge", "Block device I/O operations per second."),
+    "shell_executor_disk_busy_percent": ("gauge", "Share of time the block device was busy."),
+    "shell_executor_network_bytes_per_second": ("gauge", "Network interface throughput."),
+    "shell_executor_network_link_utilization_percent": ("gauge", "Busier direction of an interface relative to its link speed."),
+    "shell_executor_network_errors_total": ("counter", "Network interface receive and transmit errors."),
+    "shell_executor_network_drops_total": ("counter", "Network interface receive and transmit drops."),
+    "shell_executor_tcp_connections": ("gauge", "TCP sockets by state."),
+    "shell_executor_tcp_retransmit_percent": ("gauge", "Share of TCP segments retransmitted during the sample interval."),
+    "shell_executor_container_running": ("gauge", "Whether a Docker container is running."),
+    "shell_executor_container_cpu_percent": ("gauge", "Docker container CPU usage."),
+    "shell_executor_container_memory_bytes": ("gauge", "Docker container memory usage."),
+    "shell_executor_gpu_utilization_percent": ("gauge", "GPU utilization."),
+    "shell_executor_gpu_memory_used_bytes": ("gauge", "Used GPU memory."),
+    "shell_executor_gpu_memory_total_bytes": ("gauge", "Total GPU memory."),
+    "shell_executor_gpu_temperature_celsius": ("gauge", "GPU temperature."),
+    "shell_executor_gpu_power_watts": ("gauge", "GPU power draw."),
+}
+
+
+class _MetricsExporter:
+    """
+    以 Prometheus 文本格式导出最近一次采样的主机指标与插件自身的命令计数、耗时。
+    主机指标在采样时按主机预先格式化，抓取时只拼接缓存文本，数据未变化时直接返回上次结果。
+    """
+
+    def __init__(self, latency: _LatencyStats):
+        self.latency = latency
+        # 指标族 -> 主机 -> 已格式化的样本行
+        self._host_lines: dict[str, dict[str, list[str]]] = {}
+        # (host, command, result) -> 次数
+        self._command_counts: dict[tuple[str, str, str], int] = {}
+        self._version = 0
+        self._rendered_key = None
+        self._rendered = b""
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: dict) -> str:
+        if not labels:
+            return ""
+        parts = []
+        for key, value in labels.items():
+            value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+            parts.append(f'{key}="{value}"')
+        return "{" + ",".join(parts) + "}"
+
+    @staticmethod
+    def _value(value) -> str:
+        return repr(float(value)) if value is not None else "NaN"
+
+    def update_host(self, host: str, samples: dict[str, list[tuple[dict, float]]]):
+        """替换某台主机的全部指标样本，samples 为 指标族 -> [(标签, 值)]"""
+        with self._lock:
+            for family in _HOST_METRIC_FAMILIES:
+                lines = [
+                    f"{family}{self._labels({'host': host, **labels})} {self._value(value)}"
+                    for labels, value in samples.get(family, [])
+                    if value is not None
+                ]
+                if lines:
+                    self._host_lines.setdefault(family, {})[host] = lines
+                else:
+                    self._host_lines.get(family, {}).pop(host, None)
+            self._version += 1
+
+    def count_command(self, host: str, command: str, result: str):
+        with self._lock:
+            key = (host, command, result)
+            self._command_counts[key] = self._command_counts.get(key, 0) + 1
+            self._version += 1
+
+    def render(self) -> bytes:
+        """返回当前的文本格式指标，仅在数据变化后重新拼接"""
+        with self._lock:
+            key = (self._version, self.latency.version)
+            if key == self._rendered_key:
+                return self._rendered
+            out = []
+            for family, (kind, help_text) in _HOST_METRIC_FAMILIES.items():
+                by_host = self._host_lines.get(family)
+                if not by_host:
+                    continue
+                out.append(f"# HELP {family} {help_text}")
+                out.append(f"# TYPE {family} {kind}")
+                for lines in by_host.values():
+                    out.extend(lines)
+
+            if self._command_counts:
+                out.append("# HELP shell_executor_commands_total Commands executed by the plugin.")
+                out.append("# TYPE shell_executor_commands_total counter")
+                for (host, command, result), n in sorted(self._command_counts.items()):
+                    labels = self._labels({"host": host, "command": command, "result": result})
+                    out.append(f"shell_executor_commands_total{labels} {n}")
+
+            with self.latency._lock:
+                hists = sorted(
+                    (k, h) for k, h in self.latency.histograms.items() if k[1] in ("phase", "command")
+                )
+                for family, kind, label in (
+                    ("shell_executor_phase_duration_seconds", "phase", "phase"),
+                    ("shell_executor_command_duration_seconds", "command", "command"),
+                ):
+                    selected = [(k, h) for k, h in hists if k[1] == kind]
+                    if not selected:
+                        continue
+                    out.append(f"# HELP {family} SSH {kind} latency.")
+                    out.append(f"# TYPE {family} histogram")
+                    for (host, _, name), hist in selected:
+                        base = {"host": host, label: name}
+                        cumulative = 0
+                        for bound, n in zip(_LATENCY_BUCKETS, hist.counts):
+                            cumulative += n
+                            out.append(f"{family}_bucket{self._labels({**base, 'le': bound})} {cumulative}")
+                        out.append(f"{family}_bucket{self._labels({**base, 'le': '+Inf'})} {hist.count}")
+                        out.append(f"{family}_sum{self._labels(base)} {hist.sum!r}")
+                        out.append(f"{family}_count{self._labels(base)} {hist.count}")
+
+            self._rendered = ("\n".join(out) + "\n").encode("utf-8")
+            self._rendered_key = key
+            return self._rendered
+
+    def write_file(self, path: str):
+        """原子地写入指标文件，供 node_exporter textfile collector 等读取"""
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, host: str, port: int) -> ThreadingHTTPServer:
+        """在后台线程中启动 /metrics HTTP 端点"""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = exporter.render()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="shell-executor-metrics", daemon=True).start()
+        return server
+
+
+class _HistoryStore:
+    """
+    本地历史库（SQLite，WAL 模式），保存主机指标采样与命令审计记录。
+    指标写入时同时累加进 5 分钟与 1 小时的降采样层，查询长时间范围时直接读取粗粒度的层；
+    各层按各自的保留时间每小时清理一次。
+    """
+
+    # (粒度秒数, 保留秒数)，粒度 0 表示原始采样
+    TIERS = ((0, 2 * 86400), (300, 30 * 86400), (3600, 365 * 86400))
+    PRUNE_INTERVAL = 3600
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS samples (
+            host TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            step INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            avg REAL NOT NULL,
+            min REAL NOT NULL,
+            max REAL NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (host, metric, step, ts)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS samples_step_ts ON samples (step, ts);
+        CREATE TABLE IF NOT EXISTS series (
+            host TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            PRIMARY KEY (host, metric)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS audit (
+            id INTEGER PRIMARY KEY,
+            ts REAL NOT NULL,
+            host TEXT NOT NULL,
+            user TEXT,
+            command TEXT NOT NULL,
+            exit_code INTEGER,
+            duration REAL,
+            output_bytes INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS audit_host_ts ON audit (host, ts);
+    """
+    UPSERT = """
+        INSERT INTO samples (host, metric, step, ts, avg, min, max, n) VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        ON CONFLICT (host, metric, step, ts) DO UPDATE SET
+            avg = (avg * n + excluded.avg) / (n + 1),
+            min = MIN(min, excluded.min),
+            max = MAX(max, excluded.max),
+            n = n + 1
+    """
+    # 不写入历史的指标族：存活标记、采样时间与累计计数
+    SKIP_FAMILIES = ("shell_executor_host_up", "shell_executor_last_sample_timestamp_seconds")
+
+    def __init__(self, path: str, retention_days: int = 365):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        keep = max(retention_days, 1) * 86400
+        self.tiers = tuple((step, min(seconds, keep)) for step, seconds in self.TIERS)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+        self._lock = threading.Lock()
+        self._series = {tuple(row) for row in self._db.execute("SELECT host, metric FROM series")}
+        self._pruned_at = 0.0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def series_values(samples: dict[str, list[tuple[dict, float]]]) -> dict[str, float]:
+        """把 _status_to_metrics 的样本展开为 序列名 -> 值，序列名形如 disk_used_percent{mount=/}"""
+        values = {}
+        for family, entries in samples.items():
+            if family in _HistoryStore.SKIP_FAMILIES or _HOST_METRIC_FAMILIES.get(family, ("",))[0] == "counter":
+                continue
+            name = family.removeprefix("shell_executor_")
+            for labels, value in entries:
+                if value is None:
+                    continue
+                if labels:
+                    name_with_labels = name + "{" + ",".join(f"{k}={v}" for k, v in labels.items()) + "}"
+                else:
+                    name_with_labels = name
+                values[name_with_labels] = float(value)
+        return values
+
+    def record_samples(self, host: str, ts: float, values: dict[str, float]):
+        """写入一次采样，同时累加到各降采样层"""
+        now = int(ts)
+        rows = []
+        for step, _ in self.tiers:
+            bucket = now - now % step if step else now
+            rows.extend((host, metric, step, bucket, value, value, value) for metric, value in values.items())
+        new_series = [(host, metric) for metric in values if (host, metric) not in self._series]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                self._db.executemany(self.UPSERT, rows)
+                if new_series:
+                    self._db.executemany("INSERT OR IGNORE INTO series (host, metric) VALUES (?, ?)", new_series)
+                self._db.execute("COMMIT")
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+            self._series.update(new_series)
+            if ts - self._pruned_at >= self.PRUNE_INTERVAL:
+                self._prune(ts)
+
+    def record_command(self, host: str, user: str, command: str, exit_code: int | None,
+                       duration: float | None, output_bytes: int | None):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO audit (ts, host, user, command, exit_code, duration, output_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), host, user, command, exit_code, duration, output_bytes),
+            )
+
+    def _prune(self, now: float):
+        for step, keep in self.tiers:
+            self._db.execute("DELETE FROM samples WHERE step = ? AND ts < ?", (step, int(now - keep)))
+        self._db.execute("DELETE FROM audit WHERE ts < ?", (now - self.tiers[-1][1],))
+        self._pruned_at = now
+
+    def metrics(self, host: str) -> list[str]:
+        with self._lock:
+            return sorted(metric for h, metric in self._series if h == host)
+
+    def pick_step(self, since: float, until: float) -> int:
+        """选择能覆盖该时间范围的最细粒度：6 小时内用原始采样，7 天内用 5 分钟层，更长用 1 小时层"""
+        span = until - since
+        age = time.time() - since
+        for step, keep in self.tiers:
+            if keep >= age and (span <= 6 * 3600 if step == 0 else span / step <= 2016):
+                return step
+        return self.tiers[-1][0]
+
+    def query(self, host: str, metric: str, since: float, until: float, step: int) -> list[tuple]:
+        """按主键范围读取 (时间, 平均, 最小, 最大)"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, avg, min, max FROM samples "
+                "WHERE host = ? AND metric = ? AND step = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                (host, metric, step, int(since), int(until)),
+            ).fetchall()
+
+    def recent_commands(self, host: str, limit: int = 20) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT ts, user, command, exit_code, duration, output_bytes FROM audit "
+                "WHERE host = ? ORDER BY ts DESC LIMIT ?",
+                (host, limit),
+            ).fetchall()
+
+
+def _alert_num(val) -> float | None:
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def _alert_ratio(used, total) -> float | None:
+    used, total = _alert_num(used), _alert_num(total)
+    return used / total * 100 if used is not None and total else None
+
+
+# 告警规则可引用的对象与字段：对象名 -> (从状态字典取出 [(标签, 条目)], 字段名 -> 取值函数)
+_ALERT_SUBJECTS = {
+    "host": (lambda s: [("", s)], {"up": lambda s: 0 if s is None else 1}),
+    "cpu": (lambda s: [("", s)], {"usage": lambda s: s.get("cpu_usage")}),
+    "load": (
+        lambda s: [("", (s.get("load_avg") or "").split())],
+        {
+            "1": lambda v: v[0] if len(v) > 0 else None,
+            "5": lambda v: v[1] if len(v) > 1 else None,
+            "15": lambda v: v[2] if len(v) > 2 else None,
+        },
+    ),
+    "mem": (lambda s: [("", s)], {"percent": lambda s: _alert_ratio(s.get("mem_used"), s.get("mem_total"))}),
+    "swap": (lambda s: [("", s)], {"percent": lambda s: _alert_ratio(s.get("swap_used"), s.get("swap_total"))}),
+    "disk": (
+        lambda s: [(d.get("mount") or "", d) for d in s.get("disks") or []],
+        {
+            "percent": lambda d: d.get("percent"),
+            "busy": lambda d: (d.get("io") or {}).get("util"),
+            "read": lambda d: (d.get("io") or {}).get("read_bps"),
+            "write": lambda d: (d.get("io") or {}).get("write_bps"),
+        },
+    ),
+    "net": (
+        lambda s: [(i["name"], i) for i in (s.get("network") or {}).get("interfaces", [])],
+        {
+            "percent": lambda i: i.get("percent"),
+            "rx": lambda i: i.get("rx_bps"),
+            "tx": lambda i: i.get("tx_bps"),
+        },
+    ),
+    "tcp": (
+        lambda s: [("", (s.get("network") or {}).get("tcp", {}))],
+        {
+            "retrans": lambda t: t.get("retrans_percent"),
+            "established": lambda t: t.get("established"),
+            "time_wait": lambda t: t.get("time_wait"),
+        },
+    ),
+    "gpu": (
+        lambda s: [(str(g.get("index", n)), g) for n, g in enumerate(s.get("gpus") or [])],
+        {
+            "temp": lambda g: g.get("temp"),
+            "util": lambda g: g.get("util"),
+            "power": lambda g: g.get("power_draw"),
+            "mem_percent": lambda g: _alert_ratio(g.get("mem_used"), g.get("mem_total")),
+        },
+    ),
+    "container": (
+        lambda s: [(c["name"], c) for c in s.get("containers") or []],
+        {
+            "cpu": lambda c: c.get("cpu"),
+            "mem": lambda c: c.get("mem_used_bytes"),
+            "running": lambda c: 1 if c.get("state") == "running" else 0,
+        },
+    ),
+}
+
+_ALERT_OPS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le, "==": operator.eq, "!=": operator.ne}
+
+_ALERT_RULE_RE = re.compile(
+    r"\s*(?P<subject>[a-z]+)(?:\[(?P<select>[^\]]+)\])?\.(?P<field>[a-z0-9_]+)"
+    r"\s*(?P<op>>=|<=|==|!=|>|<)\s*(?P<threshold>-?\d+(?:\.\d+)?)"
+    r"(?:\s+for\s+(?P<duration>\d+)(?P<unit>[smhd]))?\s*"
+)
+
+
+class _AlertRule:
+    """一条已编译的阈值规则，如 disk.percent > 90 for 5m 或 gpu[0].temp > 85"""
+
+    def __init__(self, text: str):
+        match = _ALERT_RULE_RE.fullmatch(text)
+        if not match:
+            raise ValueError(f"无法解析规则: {text}")
+        self.text = text.strip()
+        self.subject = match.group("subject")
+        if self.subject not in _ALERT_SUBJECTS:
+            raise ValueError(f"未知的对象 {self.subject}，可用: {', '.join(_ALERT_SUBJECTS)}")
+        self.entries, fields = _ALERT_SUBJECTS[self.subject]
+        self.field = match.group("field")
+        if self.field not in fields:
+            raise ValueError(f"{self.subject} 没有字段 {self.field}，可用: {', '.join(fields)}")
+        self.getter = fields[self.field]
+        self.select = match.group("select")
+        self.op_text = match.group("op")
+        self.op = _ALERT_OPS[self.op_text]
+        self.threshold = float(match.group("threshold"))
+        self.duration = 0
+        if match.group("duration"):
+            self.duration = int(match.group("duration")) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group("unit")]
+
+    def values(self, status: dict | None):
+        """取出本次采样中各对象的值，select 为标签的通配符过滤"""
+        entries = self.entries(status) if status is not None else [("", None)]
+        for label, entry in entries:
+            if self.select and not fnmatch.fnmatchcase(label, self.select):
+                continue
+            yield label, _alert_num(self.getter(entry))
+
+    def name(self, label: str) -> str:
+        return f"{self.subject}[{label}].{self.field}" if label else f"{self.subject}.{self.field}"
+
+
+class _AlertEngine:
+    """
+    阈值告警规则引擎。
+    规则在加载时编译，每次采样时每条规则只取本次的值并更新各对象的状态（首次越过阈值的时间、是否已告警），
+    不回看历史数据。超过阈值并持续 for 指定的时间后告警一次，恢复时再通知一次，期间不重复发送。
+    恢复同样需要去抖：值回到阈值内并持续 for 指定的时间、且至少连续 RECOVER_SAMPLES 次采样后才算恢复，
+    在阈值附近来回波动的值不会交替发送告警与恢复。
+    """
+
+    # 判定恢复所需的最少连续正常采样次数
+    RECOVER_SAMPLES = 2
+
+    def __init__(self, rules: list[str], repeat_seconds: float = 0):
+        self.rules: list[_AlertRule] = []
+        self.errors: list[str] = []
+        for text in rules:
+            if not text or not text.strip():
+                continue
+            try:
+                self.rules.append(_AlertRule(text))
+            except ValueError as e:
+                self.errors.append(str(e))
+        self.repeat_seconds = repeat_seconds
+        # 与 rules 一一对应：对象标签 -> {"since": 首次越过阈值的时间, "firing": 是否已告警, "notified": 上次通知时间,
+        # "value": 最新值, "clear_since": 告警中回到阈值内的时间, "clear_count": 此后连续正常的采样次数}
+        self._state: list[dict[str, dict]] = [{} for _ in self.rules]
+
+    def evaluate(self, status: dict | None, now: float) -> tuple[list, list]:
+        """
+        用一次采样更新状态，返回 (新告警, 已恢复)，元素为 (规则, 标签, 值, 开始时间)。
+        status 为 None 表示采集失败，此时只评估 host.up，其余规则保持原状态。
+        """
+        fired, resolved = [], []
+        for rule, states in zip(self.rules, self._state):
+            if status is None and rule.subject != "host":
+                continue
+            seen = set()
+            for label, value in rule.values(status):
+                seen.add(label)
+                state = states.get(label)
+                if value is not None and rule.op(value, rule.threshold):
+                    if state is None:
+                        state = states[label] = {"since": now, "firing": False, "notified": 0.0}
+                    state["value"] = value
+                    state["clear_since"] = None
+                    state["clear_count"] = 0
+                    due = not state["firing"] and now - state["since"] >= rule.duration
+                    repeat = state["firing"] and self.repeat_seconds and now - state["notified"] >= self.repeat_seconds
+                    if due or repeat:
+                        state["firing"] = True
+                        state["notified"] = now
+                        fired.append((rule, label, value, state["since"]))
+                elif state is not None and not state["firing"]:
+                    del states[label]
+                elif state is not None:
+                    state["value"] = value
+                    if state["clear_since"] is None:
+                        state["clear_since"] = now
+                    state["clear_count"] += 1
+                    if now - state["clear_since"] >= rule.duration and state["clear_count"] >= self.RECOVER_SAMPLES:
+                        del states[label]
+                        resolved.append((rule, label, value, state["since"]))
+            # 采样中已不存在的对象（如卸载的磁盘、删除的容器）视为恢复，值记为 None
+            for label in [label for label in states if label not in seen]:
+                state = states.pop(label)
+                if state["firing"]:
+                    resolved.append((rule, label, None, state["since"]))
+        return fired, resolved
+
+    def active(self) -> list[tuple]:
+        """当前处于告警中的 (规则, 标签, 值, 开始时间)"""
+        return [
+            (rule, label, state["value"], state["since"])
+            for rule, states in zip(self.rules, self._state)
+            for label, state in states.items()
+            if state["firing"]
+        ]
+
+
+def _format_bytes(num: float | None) -> str:
+    """按 df -h 的风格格式化字节数，如 931G、9.8G"""
+    if num is None:
+        return "-"
+    num = float(num)
+    for unit in ("B", "K", "M", "G", "T"):
+        if abs(num) < 1024:
+            break
+        num /= 1024
+    else:
+        unit = "P"
+    if unit == "B":
+        return f"{int(num)}B"
+    return f"{num:.1f}{unit}" if abs(num) < 10 else f"{num:.0f}{unit}"
+
+
+_SIZE_UNITS = {
+    "b": 1, "kb": 1e3, "mb": 1e6, "gb": 1e9, "tb": 1e12,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+
+
+def _parse_size(text: str) -> float | None:
+    """解析 docker stats 等输出中的大小，如 21.5MiB、1.2GB、0B"""
+    match = re.match(r"\s*([\d.]+)\s*([a-zA-Z]*)", text or "")
+    if not match:
+        return None
+    factor = _SIZE_UNITS.get(match.group(2).lower() or "b")
+    try:
+        return float(match.group(1)) * factor if factor else None
+    except ValueError:
+        return None
+
+
+def _format_rate(bps: float | None) -> str:
+    """格式化每秒字节数"""
+    return f"{_format_bytes(bps)}/s" if bps is not None else "-"
+
+
+def _disk_io_line(disk: dict) -> str:
+    """磁盘吞吐摘要，如 读 12M/s · 写 1.0M/s · 45 IOPS · 繁忙 3.2%"""
+    stats = disk.get("io")
+    if not stats:
+        return ""
+    iops = stats["read_iops"] + stats["write_iops"]
+    return (
+        f"读 {_format_rate(stats['read_bps'])} · 写 {_format_rate(stats['write_bps'])} · "
+        f"{iops:g} IOPS · 繁忙 {stats['util']}%"
+    )
+
+
+def _net_rate_line(iface: dict) -> str:
+    """网卡收发速率，如 ↓ 12M/s · ↑ 1.0M/s"""
+    if iface.get("rx_bps") is None:
+        return "-"
+    return f"↓ {_format_rate(iface['rx_bps'])} · ↑ {_format_rate(iface['tx_bps'])}"
+
+
+def _net_meta_line(iface: dict) -> str:
+    """网卡链路摘要，如 1000 Mb/s · 占用 3.2% · 错误 0 · 丢包 0"""
+    parts = [f"{iface['speed_mbps']} Mb/s" if iface.get("speed_mbps") else "速率未知"]
+    if iface.get("percent") is not None:
+        parts.append(f"占用 {iface['percent']}%")
+    parts.append(f"错误 {iface.get('errors', 0)} · 丢包 {iface.get('drops', 0)}")
+    return " · ".join(parts)
+
+
+def _tcp_line(tcp: dict) -> str:
+    """TCP 连接摘要，如 TCP 已建立 12 · TIME_WAIT 3 · 重传 0.1%"""
+    parts = []
+    for key, label in (("established", "已建立"), ("time_wait", "TIME_WAIT"), ("orphan", "孤儿")):
+        if tcp.get(key) is not None:
+            parts.append(f"{label} {tcp[key]}")
+    if tcp.get("retrans_percent") is not None:
+        parts.append(f"重传 {tcp['retrans_percent']}%")
+    return "TCP " + " · ".join(parts) if parts else ""
+
+
+def _container_line(container: dict) -> str:
+    """容器资源摘要，如 CPU 12.4% · 内存 366M / 5.9G (6.1%) · 网络 88M / 120M"""
+    if container.get("cpu") is None:
+        return container.get("status") or container.get("state") or "-"
+    mem = _format_bytes(container.get("mem_used_bytes"))
+    if container.get("mem_limit_bytes"):
+        mem += f" / {_format_bytes(container['mem_limit_bytes'])}"
+    if container.get("mem_percent") is not None:
+        mem += f" ({container['mem_percent']}%)"
+    parts = [f"CPU {container['cpu']}%", f"内存 {mem}"]
+    if container.get("net_io"):
+        parts.append(f"网络 {container['net_io']}")
+    return " · ".join(parts)
+
+
+def _gpu_processes_line(gpu: dict, limit: int = 3) -> str:
+    """按显存占用取前几个 GPU 进程，格式如 python3 (4242) 7800 MiB"""
+
+    def mem(proc: dict) -> float:
+        try:
+            return float(proc.get("mem") or 0)
+        except ValueError:
+            return 0.0
+
+    procs = sorted(gpu.get("processes") or [], key=mem, reverse=True)
+    parts = [
+        f"{p.get('name') or '?'} ({p.get('pid')})" + (f" {p['mem']} MiB" if p.get("mem") else "")
+        for p in procs[:limit]
+    ]
+    if len(procs) > limit:
+        parts.append(f"等 {len(procs)} 个进程")
+    return " · ".join(parts)
+
+
+class _StatusRasterizer:
+    """
+    不经过浏览器，直接用 Pillow 按状态卡片的布局绘制图片。
+    画布尺寸在绘制前根据磁盘、GPU 行数一次算好，字体按字号缓存。
+    """
+
+    WIDTH = 1100
+    # 优先使用支持中文的字体，找不到时退回 DejaVu 或 Pillow 内置字体
+    FONT_CANDIDATES = (
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/google-noto-cjk/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+        "/usr/share/fonts/wenquanyi/wqy-microhei/wqy-microhei.ttc",
+        "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+        "/System/Library/Fonts/PingFang.ttc",
+        "C:/Windows/Fonts/msyh.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    )
+    COLORS = {
+        "bg": (11, 37, 71),
+        "card": (16, 40, 76),
+        "card_border": (52, 75, 108),
+        "panel": (29, 52, 86),
+        "panel_border": (45, 68, 101),
+        "title": (249, 251, 255),
+        "text": (238, 243, 251),
+        "value": (248, 250, 252),
+        "h3": (217, 229, 249),
+        "muted": (169, 186, 212),
+        "subtle": (156, 163, 175),
+        "pill": (52, 74, 106),
+        "bar_bg": (58, 80, 112),
+        "bar": (56, 189, 248),
+        "bar_warn": (250, 204, 21),
+        "bar_crit": (248, 113, 113),
+        "bad": (252, 165, 165),
+    }
+
+    def __init__(self, font_path: str = ""):
+        self.font_path = os.path.expanduser(font_path) if font_path else ""
+        self._resolved_path = None
+        self._fonts: dict[int, object] = {}
+
+    def _font(self, size: int):
+        font = self._fonts.get(size)
+        if font is not None:
+            return font
+        if self._resolved_path is None:
+            candidates = ([self.font_path] if self.font_path else []) + list(self.FONT_CANDIDATES)
+            self._resolved_path = next((p for p in candidates if os.path.exists(p)), "")
+        try:
+            font = ImageFont.truetype(self._resolved_path, size) if self._resolved_path else None
+        except OSError:
+            font = None
+        if font is None:
+            try:
+                font = ImageFont.load_default(size=size)
+            except TypeError:
+                font = ImageFont.load_default()
+        self._fonts[size] = font
+        return font
+
+    @staticmethod
+    def _fit(draw, text: str, font, width: float) -> str:
+        """超出宽度时截断并补省略号"""
+        if draw.textlength(text, font=font) <= width:
+            return text
+        while text and draw.textlength(text + "…", font=font) > width:
+            text = text[:-1]
+        return text + "…"
+
+    def _bar(self, draw, box, percent, k):
+        x0, y0, x1, y1 = box
+        draw.rounded_rectangle(box, radius=4 * k, fill=self.COLORS["bar_bg"])
+        try:
+            ratio = max(0.0, min(float(percent), 100.0)) / 100
+        except (TypeError, ValueError):
+            ratio = 0.0
+        if ratio > 0:
+            color = self.COLORS["bar_crit"] if ratio >= 0.9 else self.COLORS["bar_warn"] if ratio >= 0.75 else self.COLORS["bar"]
+            draw.rounded_rectangle((x0, y0, x0 + max((x1 - x0) * ratio, 2 * k), y1), radius=4 * k, fill=color)
+
+    def _panel(self, draw, box, title: str, k):
+        draw.rounded_rectangle(
+            box, radius=12 * k, fill=self.COLORS["panel"], outline=self.COLORS["panel_border"], width=max(1, int(k))
+        )
+        draw.text((box[0] + 14 * k, box[1] + 12 * k), title, font=self._font(int(14 * k)), fill=self.COLORS["h3"])
+
+    def render(
+        self, status: dict, port, scale: float = 1.0, disk_rows: int = 0, net_rows: int = 4, docker_rows: int = 8
+    ):
+        """
+        按状态字典绘制卡片，返回 Pillow 图片对象。
+        disk_rows、net_rows、docker_rows 大于 0 时只绘制占用最高的若干个挂载点、流量最大的若干个网卡与排在前面的若干个容器。
+        """
+        k = scale
+        c = self.COLORS
+        gpus = status.get("gpus", [])
+        all_disks = status.get("disks", [])
+        disks = all_disks[:disk_rows] if disk_rows > 0 else all_disks
+        hidden_disks = len(all_disks) - len(disks)
+        width = int(self.WIDTH * k)
+        gpu_rows = [92 + (18 if gpu.get("processes") else 0) for gpu in gpus]
+        gpu_height = (sum(gpu_rows) if gpus else 24) + 44
+        disk_rows_height = [26 + (16 if disk.get("io") else 0) for disk in disks]
+        disk_height = (sum(disk_rows_height) if disks else 24) + (22 if hidden_disks else 0) + 44
+        network = status.get("network") or {}
+        all_interfaces = network.get("interfaces", [])
+        interfaces = all_interfaces[:net_rows] if net_rows > 0 else all_interfaces
+        hidden_interfaces = len(all_interfaces) - len(interfaces)
+        tcp_line = _tcp_line(network.get("tcp", {}))
+        net_height = 0
+        if interfaces or tcp_line:
+            net_height = 42 * len(interfaces) + (22 if hidden_interfaces else 0) + (22 if tcp_line else 0) + 44 + 12
+        procs = status.get("processes") or {}
+        proc_lines = max(len(procs.get("cpu", [])), len(procs.get("memory", [])))
+        proc_height = 44 + 20 * (proc_lines + 1) + 22 + 12 if procs else 0
+        all_containers = status.get("containers") or []
+        containers = all_containers[:docker_rows] if docker_rows > 0 else all_containers
+        docker_height = 44 + 20 * (len(containers) + 1) + 22 + 12 if containers else 0
+        height = int(
+            (12 + 18 + 64 + 14 + 134 + 12 + gpu_height + 12 + disk_height + net_height + proc_height + docker_height
+             + 18 + 12) * k
+        )
+
+        image = PILImage.new("RGB", (width, height), c["bg"])
+        draw = ImageDraw.Draw(image)
+        pad_x = 14 * k
+        card = (pad_x, 12 * k, width - pad_x, height - 12 * k)
+        draw.rounded_rectangle(card, radius=16 * k, fill=c["card"], outline=c["card_border"], width=max(1, int(k)))
+        left, right = card[0] + 18 * k, card[2] - 18 * k
+        y = card[1] + 16 * k
+
+        def muted(text, x, y_pos, size=12, max_width=None, color="muted"):
+            font = self._font(int(size * k))
+            if max_width is not None:
+                text = self._fit(draw, text, font, max_width)
+            draw.text((x, y_pos), text, font=font, fill=c[color])
+
+        # 标题与右上角的连接信息
+        title_font = self._font(int(24 * k))
+        draw.text((left, y), self._fit(draw, str(status.get("hostname") or "-"), title_font, (right - left) * 0.7),
+                  font=title_font, fill=c["title"])
+        muted(str(status.get("os") or "-"), left, y + 34 * k, 14, (right - left) * 0.7)
+        meta_font = self._font(int(12 * k))
+        for i, text in enumerate((f"IP: {status.get('host')}:{port}", f"时间: {status.get('timestamp') or '-'}")):
+            draw.text((right - draw.textlength(text, font=meta_font), y + i * 18 * k), text, font=meta_font, fill=c["muted"])
+        y += 64 * k
+        draw.line((left, y, right, y), fill=c["card_border"], width=max(1, int(k)))
+        y += 14 * k
+
+        # CPU / 内存 / 运行时间三个面板
+        gap = 12 * k
+        panel_w = (right - left - 2 * gap) / 3
+        panel_h = 134 * k
+        value_font = self._font(int(20 * k))
+        pill_font = self._font(int(12 * k))
+
+        def value_row(x, y_pos, value, pill=None):
+            draw.text((x, y_pos), value, font=value_font, fill=c["value"])
+            if pill:
+                px = x + draw.textlength(value, font=value_font) + 8 * k
+                pw = draw.textlength(pill, font=pill_font) + 16 * k
+                draw.rounded_rectangle((px, y_pos + 4 * k, px + pw, y_pos + 22 * k), radius=9 * k, fill=c["pill"])
+                draw.text((px + 8 * k, y_pos + 6 * k), pill, font=pill_font, fill=c["text"])
+
+        boxes = [(left + i * (panel_w + gap), y, left + i * (panel_w + gap) + panel_w, y + panel_h) for i in range(3)]
+        inner = panel_w - 28 * k
+
+        x0 = boxes[0][0] + 14 * k
+        self._panel(draw, boxes[0], "CPU", k)
+        cpu_usage = status.get("cpu_usage")
+        value_row(x0, y + 34 * k, f"{cpu_usage}%" if cpu_usage is not None else "-", "总占用")
+        freq = status.get("cpu_freq")
+        freq_line = "频率: 未获取"
+        if freq:
+            try:
+                freq_line = f"频率: {round(float(freq), 1)}"
+            except ValueError:
+                freq_line = f"频率: {freq}"
+            if status.get("cpu_freq_max"):
+                freq_line += f" / {status['cpu_freq_max']}"
+            freq_line += " MHz"
+        muted(str(status.get("cpu_model") or "-"), x0, y + 66 * k, 12, inner)
+        muted(freq_line, x0, y + 86 * k, 12, inner)
+        muted(f"平均负载: {status.get('load_avg') or '-'}", x0, y + 106 * k, 12, inner)
+
+        x1 = boxes[1][0] + 14 * k
+        self._panel(draw, boxes[1], "内存", k)
+        mem_percent = status.get("mem_percent")
+        value_row(x1, y + 34 * k, f"{mem_percent}%" if mem_percent is not None else "-", "内存占用")
+        mem_line = "-"
+        if status.get("mem_total") and status.get("mem_used") is not None:
+            mem_line = f"{status['mem_used']} / {status['mem_total']} MiB"
+        value_w = draw.textlength(mem_line, font=meta_font)
+        self._bar(draw, (x1, y + 70 * k, x1 + inner - value_w - 10 * k, y + 80 * k), mem_percent, k)
+        draw.text((x1 + inner - value_w, y + 67 * k), mem_line, font=meta_font, fill=c["text"])
+        mem_free = status.get("mem_free")
+        muted(f"{mem_free} MiB 可用" if mem_free is not None else "-", x1, y + 88 * k, 12, inner)
+        muted(f"内存频率: {status.get('mem_speed') or '-'}", x1, y + 106 * k, 12, inner)
+
+        x2 = boxes[2][0] + 14 * k
+        self._panel(draw, boxes[2], "运行时间", k)
+        draw.text((x2, y + 34 * k), self._fit(draw, str(status.get("uptime") or "-"), value_font, inner),
+                  font=value_font, fill=c["value"])
+        muted(f"内核 {status.get('kernel') or '-'}", x2, y + 66 * k, 12, inner)
+        y += panel_h + gap
+
+        # GPU 面板
+        self._panel(draw, (left, y, right, y + gpu_height * k), "GPU", k)
+        gx, gw = left + 14 * k, right - left - 28 * k
+        gy = y + 40 * k
+        if not gpus:
+            muted("GPU 信息不可用或无显卡", gx, gy, 13)
+        for gpu, row_height in zip(gpus, gpu_rows):
+            name_font = self._font(int(13 * k))
+            draw.text((gx, gy), self._fit(draw, str(gpu.get("name") or "-"), name_font, gw * 0.7),
+                      font=name_font, fill=c["title"])
+            temp = f"温度 {gpu.get('temp')}℃" if gpu.get("temp") else "温度 -"
+            draw.text((gx + gw - draw.textlength(temp, font=name_font), gy), temp, font=name_font, fill=c["muted"])
+            core = f"{gpu.get('clock_core')} MHz" if gpu.get("clock_core") else "-"
+            mem_clock = f"{gpu.get('clock_mem')} MHz" if gpu.get("clock_mem") else "-"
+            meta = f"核心频率 {core} · 显存频率 {mem_clock}"
+            if gpu.get("power_draw"):
+                limit = f" / {gpu['power_limit']}" if gpu.get("power_limit") else ""
+                meta += f" · 功耗 {gpu['power_draw']}{limit} W"
+            muted(meta, gx, gy + 20 * k, 12, gw, "subtle")
+            try:
+                vram_percent = round(float(gpu.get("mem_used")) / float(gpu.get("mem_total")) * 100)
+                vram_text = f"{gpu.get('mem_used')} / {gpu.get('mem_total')} MiB ({vram_percent}%)"
+            except (TypeError, ValueError, ZeroDivisionError):
+                vram_percent = 0
+                vram_text = f"{gpu.get('mem_used') or '-'} / {gpu.get('mem_total') or '-'} MiB"
+            util = gpu.get("util")
+            for row, (label, percent, text) in enumerate(
+                (("显存", vram_percent, vram_text), ("负载", util, f"{util}%" if util else "-"))
+            ):
+                ry = gy + (42 + row * 22) * k
+                muted(label, gx, ry - 3 * k, 12, None, "subtle")
+                self._bar(draw, (gx + 64 * k, ry, gx + gw - 180 * k, ry + 10 * k), percent, k)
+                tw = draw.textlength(text, font=meta_font)
+                draw.text((gx + gw - tw, ry - 3 * k), text, font=meta_font, fill=c["text"])
+            processes = _gpu_processes_line(gpu)
+            if processes:
+                muted(f"进程: {processes}", gx, gy + 84 * k, 12, gw, "subtle")
+            gy += row_height * k
+        y += gpu_height * k + gap
+
+        # 磁盘面板
+        self._panel(draw, (left, y, right, y + disk_height * k), "磁盘", k)
+        dy = y + 40 * k
+        disk_font = self._font(int(13 * k))
+        if not disks:
+            muted("未获取到磁盘信息", gx, dy, 13)
+        for disk, row_height in zip(disks, disk_rows_height):
+            percent = disk.get("percent", 0)
+            draw.text((gx, dy), self._fit(draw, str(disk.get("mount") or "-"), disk_font, 170 * k),
+                      font=disk_font, fill=c["text"])
+            self._bar(draw, (gx + 190 * k, dy + 4 * k, gx + gw - 202 * k, dy + 14 * k), percent, k)
+            text = f"{disk.get('used')} / {disk.get('size')} ({percent}%)"
+            draw.text((gx + gw - draw.textlength(text, font=disk_font), dy), text, font=disk_font, fill=c["text"])
+            io_line = _disk_io_line(disk)
+            if io_line:
+                muted(io_line, gx, dy + 18 * k, 12, gw, "subtle")
+            dy += row_height * k
+        if hidden_disks:
+            muted(f"另有 {hidden_disks} 个挂载点未显示", gx, dy, 12)
+        y += disk_height * k + gap
+
+        # 网络面板
+        if net_height:
+            self._panel(draw, (left, y, right, y + (net_height - 12) * k), "网络", k)
+            ny = y + 40 * k
+            for iface in interfaces:
+                draw.text((gx, ny), self._fit(draw, iface["name"], disk_font, 170 * k), font=disk_font, fill=c["text"])
+                self._bar(draw, (gx + 190 * k, ny + 4 * k, gx + gw - 202 * k, ny + 14 * k), iface.get("percent") or 0, k)
+                text = _net_rate_line(iface)
+                draw.text((gx + gw - draw.textlength(text, font=disk_font), ny), text, font=disk_font, fill=c["text"])
+                muted(_net_meta_line(iface), gx, ny + 18 * k, 12, gw, "subtle")
+                ny += 42 * k
+            if hidden_interfaces:
+                muted(f"另有 {hidden_interfaces} 个网卡未显示", gx, ny, 12)
+                ny += 22 * k
+            if tcp_line:
+                muted(tcp_line, gx, ny, 12, gw)
+            y += net_height * k
+
+        # 进程面板：按 CPU 与按内存两列
+        if proc_height:
+            self._panel(draw, (left, y, right, y + (proc_height - 12) * k), "进程", k)
+            col_w = (gw - 16 * k) / 2
+            for col, (title, key) in enumerate((("按 CPU", "cpu"), ("按内存", "memory"))):
+                cx = gx + col * (col_w + 16 * k)
+                py = y + 40 * k
+                for i, proc in enumerate([None] + procs.get(key, [])):
+                    if proc is None:
+                        cells, color = (title, "PID", "CPU", "内存"), "subtle"
+                    else:
+                        cpu = f"{proc['cpu']}%" if proc.get("cpu") is not None else "-"
+                        cells, color = (proc["name"], str(proc["pid"]), cpu, _format_bytes(proc["rss_bytes"])), "text"
+                    font = self._font(int(12 * k))
+                    draw.text((cx, py), self._fit(draw, cells[0], font, col_w - 230 * k), font=font, fill=c[color])
+                    for j, cell in enumerate(cells[1:]):
+                        right_edge = cx + col_w - (2 - j) * 72 * k
+                        draw.text((right_edge - draw.textlength(cell, font=font), py), cell, font=font, fill=c[color])
+                    py += 20 * k
+            muted(f"共 {procs.get('count', 0)} 个进程", gx, y + (40 + 20 * (proc_lines + 1) + 4) * k, 12)
+            y += proc_height * k
+
+        # Docker 面板
+        if docker_height:
+            self._panel(draw, (left, y, right, y + (docker_height - 12) * k), "Docker", k)
+            font = self._font(int(12 * k))
+            cy = y + 40 * k
+            for container in [None] + containers:
+                if container is None:
+                    cells, color, state_color = ("容器", "状态", "CPU", "内存", "PIDs"), "subtle", "subtle"
+                else:
+                    cpu = f"{container['cpu']}%" if container.get("cpu") is not None else "-"
+                    mem = "-"
+                    if container.get("mem_used_bytes") is not None:
+                        mem = _format_bytes(container["mem_used_bytes"])
+                    state = container["status"] or container["state"]
+                    cells = (container["name"], state, cpu, mem, str(container.get("pids") or "-"))
+                    color, state_color = "text", "text" if container["state"] == "running" else "bad"
+                draw.text((gx, cy), self._fit(draw, cells[0], font, gw * 0.3), font=font, fill=c[color])
+                draw.text((gx + gw * 0.32, cy), self._fit(draw, cells[1], font, gw * 0.3),
+                          font=font, fill=c[state_color])
+                for j, cell in enumerate(cells[2:]):
+                    right_edge = gx + gw - (2 - j) * 90 * k
+                    draw.text((right_edge - draw.textlength(cell, font=font), cy), cell, font=font, fill=c[color])
+                cy += 20 * k
+            running = sum(1 for ctr in all_containers if ctr["state"] == "running")
+            footer = f"共 {len(all_containers)} 个容器，运行中 {running} 个"
+            if len(all_containers) > len(containers):
+                footer += f"，另有 {len(all_containers) - len(containers)} 个未显示"
+            muted(footer, gx, cy + 4 * k, 12)
+        return image
+
+
+class _TimedSSHClient(paramiko.SSHClient):
+    """在标准 SSHClient 基础上分别记录 TCP 建连、密钥交换与认证的耗时"""
+
+    def __init__(self):
+        super().__init__()
+        self.timings: dict[str, float] = {}
+        self._auth_elapsed = 0.0
+
+    def connect(self, hostname, port=22, timeout=None, sock=None, **kwargs):
+        if sock is None:
+            start = time.perf_counter()
+            sock = socket.create_connection((hostname, port), timeout=timeout)
+            # SSH 的小包请求/应答交替频繁，关闭 Nagle 以免与延迟确认叠加出约 40ms 的停顿
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.timings["tcp"] = time.perf_counter() - start
+        start = time.perf_counter()
+        try:
+            super().connect(hostname, port=port, timeout=timeout, sock=sock, **kwargs)
+        except Exception:
+            sock.close()
+            raise
+        # 认证之前的握手耗时主要来自密钥交换
+        self.timings["kex"] = time.perf_counter() - start - self._auth_elapsed
+        self.timings["auth"] = self._auth_elapsed
+
+    def _auth(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super()._auth(*args, **kwargs)
+        finally:
+            self._auth_elapsed = time.perf_counter() - start
+
+
+class _CommandResult:
+    """
+    一次远程命令的执行结果：退出码、耗时、stdout / stderr 及各自的字节数。
+    exit_code 为 None 表示命令未能执行（连接失败、超时等），原因见 error；cached_age 为命中缓存时已缓存的秒数。
+    """
+
+    def __init__(self, command: str, stdout: bytes = b"", stderr: bytes = b"", exit_code: int | None = None,
+                 duration: float = 0.0, error: str = ""):
+        self.command = command
+        self.stdout = stdout.decode(errors="replace")
+        self.stderr = stderr.decode(errors="replace")
+        self.stdout_bytes = len(stdout)
+        self.stderr_bytes = len(stderr)
+        self.exit_code = exit_code
+        self.duration = duration
+        self.error = error
+        self.cached_age: int | None = None
+        # 视为成功的退出码，如 systemctl status 对未运行的服务返回 3
+        self.ok_codes: tuple[int, ...] = (0,)
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code in self.ok_codes
+
+    def as_dict(self) -> dict:
+        return {
+            "command": self.command,
+            "ok": self.ok,
+            "exit_code": self.exit_code,
+            "error": self.error or None,
+            "duration_ms": round(self.duration * 1000, 1),
+            "stdout_bytes": self.stdout_bytes,
+            "stderr_bytes": self.stderr_bytes,
+            "cached_age_seconds": self.cached_age,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.as_dict(), ensure_ascii=False, indent=2)
+
+
+# 声明式命令的参数类型：类型名 -> 取值需完整匹配的正则
+_ARG_TYPES = {
+    "str": r"[^\x00]*",
+    "word": r"[^\s\x00]+",
+    "int": r"-?\d+",
+    "unit": r"[A-Za-z0-9@._:\\-]+",
+    "name": r"[A-Za-z0-9][A-Za-z0-9_.-]*",
+    "image": r"[A-Za-z0-9][A-Za-z0-9_.:/@-]*",
+    "path": r"[^\x00\n]+",
+}
+# 这些类型的取值不允许以 - 开头，避免被当作命令选项
+_OPTION_SAFE_TYPES = ("word", "unit", "name", "image", "path")
+
+
+class _CommandSpec:
+    """
+    一条声明式的远程命令：名称、命令模板、参数、超时、缓存、是否流式输出与并发类别。
+    模板在加载时拆分为字面量与参数占位符，执行时参数按类型校验后经 shlex.quote 插入，不会被远程 shell 解释。
+    """
+
+    NAME_RE = re.compile(r"[a-z0-9][a-z0-9_-]*")
+    ARG_RE = re.compile(r"(?P<name>[a-z_][a-z0-9_]*)(?::(?P<type>[a-z]+))?(?:=(?P<default>.*))?")
+
+    def __init__(self, spec: dict):
+        if not isinstance(spec, dict):
+            raise ValueError("命令定义必须是 JSON 对象")
+        self.name = str(spec.get("name", ""))
+        if not self.NAME_RE.fullmatch(self.name):
+            raise ValueError(f"命令名 {self.name!r} 只能包含小写字母、数字、- 与 _")
+        self.description = spec.get("description", "")
+        self.args = [self._parse_arg(arg) for arg in spec.get("args") or []]
+        # None 表示使用插件的 timeout，0 表示不限制
+        self.timeout = spec.get("timeout")
+        # CACHE_POLICIES 中的策略名，或缓存秒数
+        self.cache = spec.get("cache")
+        self.tags = tuple(spec.get("tags") or ())
+        invalidates = spec.get("invalidates") or ()
+        self.invalidates = None if invalidates == "all" else tuple(invalidates)
+        self.stream = bool(spec.get("stream", False))
+        self.concurrency = spec.get("concurrency", "default")
+        self.ok_codes = tuple(spec.get("ok_codes") or (0,))
+        self.builtin = False
+        self._parts = self._compile(str(spec.get("template", "")))
+
+    @staticmethod
+    def _parse_arg(arg) -> dict:
+        """参数可写作 "名称:类型=默认值" 或 {"name", "type", "default", "choices"}"""
+        if isinstance(arg, str):
+            match = _CommandSpec.ARG_RE.fullmatch(arg)
+            if not match:
+                raise ValueError(f"无法解析参数定义 {arg!r}")
+            arg = {k: v for k, v in match.groupdict().items() if v is not None}
+        name, kind = arg.get("name", ""), arg.get("type", "word")
+        if kind not in _ARG_TYPES:
+            raise ValueError(f"参数 {name} 的类型 {kind} 不受支持，可用: {', '.join(_ARG_TYPES)}")
+        parsed = {
+            "name": name,
+            "type": kind,
+            "pattern": re.compile(_ARG_TYPES[kind]),
+            "choices": [str(c) for c in arg.get("choices") or []],
+            "default": None if arg.get("default") is None else str(arg["default"]),
+        }
+        if parsed["default"] is not None:
+            _CommandSpec._check(parsed, parsed["default"])
+        return parsed
+
+    def _compile(self, template: str) -> list[tuple[str, str | None]]:
+        if not template.strip():
+            raise ValueError(f"命令 {self.name} 缺少 template")
+        names = {arg["name"] for arg in self.args}
+        parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if field is not None:
+                if spec or conversion:
+                    raise ValueError(f"占位符 {{{field}}} 不支持格式说明")
+                if field not in names:
+                    raise ValueError(f"模板中的 {{{field}}} 没有对应的参数定义")
+            parts.append((literal, field))
+        return parts
+
+    @staticmethod
+    def _check(arg: dict, value: str):
+        if arg["choices"] and value not in arg["choices"]:
+            raise ValueError(f"{arg['name']} 只能是 {' / '.join(arg['choices'])}")
+        if not arg["pattern"].fullmatch(value):
+            raise ValueError(f"{arg['name']} 的值 {value!r} 不是有效的 {arg['type']}")
+        if arg["type"] in _OPTION_SAFE_TYPES and value.startswith("-"):
+            raise ValueError(f"{arg['name']} 不能以 - 开头")
+
+    def render(self, values: list[str]) -> str:
+        """按位置绑定参数、校验并生成命令，参数不合法时抛出 ValueError"""
+        if len(values) > len(self.args):
+            raise ValueError(f"参数过多，最多 {len(self.args)} 个")
+        bound = {}
+        for index, arg in enumerate(self.args):
+            value = values[index] if index < len(values) else arg["default"]
+            if value is None:
+                raise ValueError(f"缺少参数 {arg['name']}")
+            self._check(arg, value)
+            bound[arg["name"]] = shlex.quote(value)
+        return "".join(literal + (bound[field] if field else "") for literal, field in self._parts)
+
+    def usage(self) -> str:
+        parts = [self.name]
+        for arg in self.args:
+            kind = "|".join(arg["choices"]) or arg["type"]
+            parts.append(f"<{arg['name']}:{kind}>" if arg["default"] is None else f"[{arg['name']}:{kind}={arg['default']}]")
+        return " ".join(parts)
+
+
+# 统一 GPU 探测：一次远程执行同时获取 NVIDIA、AMD 与 Intel 显卡的信息
+_GPU_PROBE_SECTIONS = {
+    "nvidia_gpu": (
+        "nvidia-smi --query-gpu=index,uuid,name,memory.used,memory.total,utilization.gpu,temperature.gpu,"
+        "clocks.gr,clocks.mem,power.draw,power.limit,fan.speed --format=csv,noheader,nounits"
+    ),
+    "nvidia_apps": "nvidia-smi --query-compute-apps=gpu_uuid,pid,process_name,used_memory --format=csv,noheader,nounits",
+    "rocm": (
+        "rocm-smi --showproductname --showuse --showmeminfo vram --showtemp --showpower "
+        "--showclocks --showfan --showpids --json"
+    ),
+    "intel": r"""for d in /sys/class/drm/card[0-9]*; do
+  case "${d##*/}" in *-*) continue ;; esac
+  [ "$(cat "$d/device/vendor" 2>/dev/null)" = "0x8086" ] || continue
+  slot=$(basename "$(readlink -f "$d/device")")
+  name=$(lspci -s "$slot" 2>/dev/null | cut -d: -f3- | sed 's/^ *//')
+  cur=$(cat "$d/gt_cur_freq_mhz" 2>/dev/null || cat "$d"/device/tile0/gt0/freq0/cur_freq 2>/dev/null)
+  max=$(cat "$d/gt_max_freq_mhz" 2>/dev/null || cat "$d"/device/tile0/gt0/freq0/max_freq 2>/dev/null)
+  temp=$(cat "$d"/device/hwmon/hwmon*/temp1_input 2>/dev/null | head -n 1)
+  echo "${d##*/}|$name|$cur|$max|$temp"
+done""",
+}
+
+
+# Docker 探测：全部容器（含已停止）与运行中容器的一次性资源快照，均以 JSON 行输出
+_DOCKER_PROBE_SECTIONS = {
+    "ps": "docker ps -a --no-trunc --format '{{json .}}'",
+    "stats": "docker stats --no-stream --no-trunc --format '{{json .}}'",
+}
+
+
+# 状态卡片的静态样式在加载时构建一次，渲染时只填充动态片段
+_STATUS_CSS = """
+    * { box-sizing: border-box; }
+    body {
+        margin: 0;
+        padding: 12px 14px;
+        min-height: 100vh;
+        font-family: "JetBrains Mono","SFMono-Regular",Menlo,Consolas,"Liberation Mono",monospace;
+        background: radial-gradient(circle at 18% 18%, #0f172a 0, #0f2747 35%, #0b3c66 70%, #0a2551 100%);
+        color: #eef3fb;
+        display: flex;
+        justify-content: center;
+        align-items: center;
+    }
+    .card {
+        width: min(1100px, 100%);
+        margin: 0 auto;
+        background: rgba(15, 38, 72, 0.85);
+        border: 1px solid rgba(255, 255, 255, 0.14);
+        border-radius: 16px;
+        box-shadow: 0 18px 52px rgba(0, 0, 0, 0.55);
+        padding: 16px 18px 18px 18px;
+        backdrop-filter: blur(12px);
+    }
+    .header {
+        display: flex;
+        justify-content: space-between;
+        align-items: flex-start;
+        border-bottom: 1px solid rgba(255, 255, 255, 0.14);
+        padding-bottom: 14px;
+        margin-bottom: 14px;
+    }
+    .title-block {
+        max-width: 70%;
+    }
+    .title {
+        font-size: 24px;
+        font-weight: 700;
+        letter-spacing: 0.5px;
+        color: #f9fbff;
+    }
+    .subtitle {
+        color: #b7c8e6;
+        margin-top: 6px;
+        font-size: 14px;
+    }
+    .meta {
+        text-align: right;
+        font-size: 12px;
+        color: #c1d4ef;
+    }
+    .section {
+        margin-top: 12px;
+        display: grid;
+        gap: 12px;
+    }
+    .triple-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
+        gap: 12px;
+    }
+    .panel {
+        background: rgba(255, 255, 255, 0.06);
+        border: 1px solid rgba(255, 255, 255, 0.12);
+        border-radius: 12px;
+        padding: 12px 14px;
+    }
+    .panel h3 {
+        margin: 0 0 8px 0;
+        font-size: 14px;
+        color: #d9e5f9;
+        letter-spacing: 0.2px;
+    }
+    .value-row {
+        display: flex;
+        align-items: baseline;
+        gap: 8px;
+        flex-wrap: wrap;
+    }
+    .value {
+        font-size: 20px;
+        font-weight: 700;
+        color: #f8fafc;
+    }
+    .pill {
+        padding: 2px 8px;
+        background: rgba(255, 255, 255, 0.14);
+        border: 1px solid rgba(255, 255, 255, 0.16);
+        border-radius: 999px;
+        color: #e7edfa;
+        font-size: 12px;
+        line-height: 1.4;
+    }
+    .bar-row {
+        display: flex;
+        align-items: center;
+        gap: 12px;
+        margin-top: 8px;
+    }
+    .bar-value {
+        text-align: right;
+        color: #e5e7eb;
+        font-variant-numeric: tabular-nums;
+        min-width: 160px;
+    }
+    .muted {
+        color: #a9bad4;
+    }
+    .disk-row, .net-row {
+        display: grid;
+        grid-template-columns: minmax(90px, 180px) 1fr 190px;
+        align-items: center;
+        gap: 12px;
+        font-size: 13px;
+        margin-bottom: 8px;
+    }
+    .gpu-row {
+        display: flex;
+        flex-direction: column;
+        gap: 8px;
+        font-size: 13px;
+        margin-bottom: 8px;
+    }
+    .bar {
+        width: 100%;
+        height: 10px;
+        background: rgba(255, 255, 255, 0.16);
+        border-radius: 4px;
+        overflow: hidden;
+    }
+    .bar span {
+        display: block;
+        height: 100%;
+        background: linear-gradient(90deg, #22d3ee, #60a5fa);
+    }
+    .disk-mount, .net-name {
+        min-width: 80px;
+        font-weight: 600;
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+    }
+    .disk-io, .net-meta {
+        grid-column: 1 / -1;
+        margin-top: -6px;
+        color: #9ca3af;
+        font-size: 12px;
+    }
+    .disk-usage {
+        color: #cbd5e1;
+    }
+    .disk-value, .net-value {
+        text-align: right;
+        color: #e5e7eb;
+        font-variant-numeric: tabular-nums;
+    }
+    .gpu-name {
+        font-weight: 600;
+        color: #e0f2fe;
+    }
+    .gpu-meta {
+        color: #cbd5e1;
+    }
+    .gpu-meta.small {
+        color: #9ca3af;
+    }
+    .gpu-head {
+        width: 100%;
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+        gap: 8px;
+    }
+    .gpu-bar {
+        width: 100%;
+        display: grid;
+        grid-template-columns: 64px 1fr 130px;
+        align-items: center;
+        gap: 10px;
+    }
+    .gpu-label {
+        width: 64px;
+        color: #9ca3af;
+    }
+    .gpu-value {
+        width: 130px;
+        text-align: right;
+        color: #e5e7eb;
+        font-variant-numeric: tabular-nums;
+    }
+    @media (max-width: 780px) {
+        .disk-row, .net-row {
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+        }
+        .gpu-bar {
+            grid-template-columns: 80px 1fr;
+        }
+        .gpu-value {
+            width: auto;
+            justify-self: end;
+        }
+        .bar-row {
+            flex-direction: column;
+            align-items: flex-start;
+        }
+        .bar-value {
+            min-width: 0;
+            width: 100%;
+            text-align: left;
+        }
+    }
+    .proc-grid {
+        display: grid;
+        grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
+        gap: 16px;
+    }
+    .proc-table {
+        width: 100%;
+        border-collapse: collapse;
+        font-size: 12px;
+        font-variant-numeric: tabular-nums;
+        table-layout: fixed;
+    }
+    .proc-table th {
+        text-align: left;
+        font-weight: 400;
+        color: #9ca3af;
+        padding: 2px 4px;
+    }
+    .proc-table td {
+        color: #e5e7eb;
+        padding: 2px 4px;
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+    }
+    .proc-table .num {
+        width: 72px;
+        text-align: right;
+    }
+    .proc-table .bad {
+        color: #fca5a5;
+    }
+    .fetch-panel pre {
+        margin: 8px 0 0 0;
+        font-size: 13px;
+        line-height: 1.1;
+        white-space: pre;
+        overflow: auto;
+        color: #e5e7eb;
+        background: rgba(255, 255, 255, 0.02);
+        border: 1px solid rgba(255, 255, 255, 0.05);
+        border-radius: 10px;
+        padding: 10px;
+    }
+    .fetch-header {
+        display: flex;
+        justify-content: space-between;
+        align-items: baseline;
+        gap: 8px;
+    }
+"""
+
+# 轻量版样式：去掉模糊、阴影与渐变等高开销效果，适合低清晰度或低带宽场景
+_STATUS_CSS_LITE = _STATUS_CSS + """
+    body { background: #0b2547; padding: 8px 10px; }
+    .card { backdrop-filter: none; box-shadow: none; background: #0f2648; padding: 12px 14px; }
+    .bar span { background: #38bdf8; }
+    .title { font-size: 20px; }
+"""
+
+_STATUS_PAGE = Template("""<html>
+<head>
+    <meta charset="UTF-8" />
+    <style>$css</style>
+</head>
+<body>
+    <div class="card">
+        <div class="header">
+$title
+            <div class="meta">
+                <div>IP: $host:$port</div>
+                <div>时间: $timestamp</div>
+            </div>
+        </div>
+$sections
+    </div>
+</body>
+</html>
+""")
+
+_STATUS_TITLE = Template("""            <div class="title-block">
+                <div class="title">$hostname</div>
+                <div class="subtitle">$os</div>
+            </div>""")
+
+_STATUS_OVERVIEW = Template("""        <div class="section triple-grid">
+            <div class="panel">
+                <h3>CPU</h3>
+                <div class="value-row">
+                    <div class="value">$cpu_usage</div>
+                    <div class="pill">总占用</div>
+                </div>
+                <div class="muted" style="margin-top:4px;">$cpu_model</div>
+                <div class="muted" style="margin-top:4px;">$cpu_freq</div>
+                <div class="muted" style="margin-top:4px;">平均负载: $load_avg</div>
+            </div>
+            <div class="panel">
+                <h3>内存</h3>
+                <div class="value-row">
+                    <div class="value">$mem_percent_display</div>
+                    <div class="pill">内存占用</div>
+                </div>
+                <div class="bar-row">
+                    <div class="bar"><span style="width:$mem_percent%"></span></div>
+                    <div class="bar-value">$mem_line</div>
+                </div>
+                <div class="muted" style="margin-top:4px;">$mem_free_line</div>
+                <div class="muted" style="margin-top:4px;">内存频率: $mem_speed</div>
+            </div>
+            <div class="panel">
+                <h3>运行时间</h3>
+                <div class="value">$uptime</div>
+                <div class="muted">内核 $kernel</div>
+            </div>
+        </div>""")
+
+_STATUS_SECTION = Template("""        <div class="section">
+            <div class="panel">
+                <h3>$title</h3>
+$body
+            </div>
+        </div>""")
+
+_DISK_ROW = Template("""                <div class="disk-row">
+                    <div class="disk-mount" title="$mount">$mount</div>
+                    <div class="bar"><span style="width:$percent%"></span></div>
+                    <div class="disk-value" title="$value">$value</div>$io
+                </div>""")
+
+_NET_ROW = Template("""                <div class="net-row">
+                    <div class="net-name" title="$name">$name</div>
+                    <div class="bar"><span style="width:$percent%"></span></div>
+                    <div class="net-value">$rate</div>
+                    <div class="net-meta">$meta</div>
+                </div>""")
+
+_STATUS_TABLE = Template("""                    <table class="proc-table">
+                        <tr>$head</tr>
+$rows
+                    </table>""")
+
+_PROC_ROW = Template(
+    """                        <tr><td title="$name">$name</td><td class="num">$pid</td>"""
+    """<td class="num">$cpu</td><td class="num">$mem</td></tr>"""
+)
+
+_CONTAINER_ROW = Template(
+    """                        <tr><td title="$image">$name</td><td class="$state_class">$state</td>"""
+    """<td class="num">$cpu</td><td class="num">$mem</td><td class="num">$pids</td></tr>"""
+)
+
+_STATUS_FETCH = Template("""        <div class="section">
+            <div class="panel fetch-panel">
+                <div class="fetch-header">
+                    <h3>$title</h3>
+                    <div class="muted">$meta</div>
+                </div>
+                <pre>$body</pre>
+            </div>
+        </div>""")
+
+_GPU_ROW = Template("""                <div class="gpu-row">
+                    <div class="gpu-head">
+                        <div class="gpu-name">$name</div>
+                        <div class="gpu-meta">温度 $temp</div>
+                    </div>
+                    <div class="gpu-meta small">$meta</div>$processes
+                    <div class="gpu-bar">
+                        <div class="gpu-label">显存</div>
+                        <div class="bar"><span style="width:$mem_percent%"></span></div>
+                        <div class="gpu-value">$mem_value</div>
+                    </div>
+                    <div class="gpu-bar">
+                        <div class="gpu-label">负载</div>
+                        <div class="bar"><span style="width:$util_percent%"></span></div>
+                        <div class="gpu-value">$util_value</div>
+                    </div>
+                </div>""")
+
 
 @register("shell_executor", "buding", "用于远程shell命令执行的插件", "1.0.6",
           "https://github.com/zouyonghe/astrbot_plugin_shell_executor")
 class ShellExecutor(Star):
+    # 只读命令的缓存策略：策略名 -> (TTL 秒, 标签)。变更类命令通过标签使相关缓存失效
+    CACHE_POLICIES = {
+        "lspci": (3600, ("hw",)),
+        "inxi": (600, ("hw",)),
+        "ip": (30, ("net",)),
+        "cpupower": (15, ("cpu",)),
+        "systemctl_status": (10, ("systemd",)),
+        "systemctl_overview": (10, ("systemd",)),
+    }
+    # 内置的声明式命令，custom_commands 中的自定义命令使用相同的格式，见 _CommandSpec
+    BUILTIN_COMMANDS = (
+        {"name": "ip", "template": "ip a", "cache": "ip", "description": "查看网卡信息"},
+        {"name": "lspci", "template": "lspci", "cache": "lspci", "description": "查看 PCI 设备"},
+        {"name": "inxi", "template": "inxi -c", "cache": "inxi", "description": "查询精简系统状态"},
+        {"name": "inxi-full", "template": "inxi -F", "cache": "inxi", "description": "查询完整系统状态"},
+        {"name": "cpupower", "template": "cpupower frequency-info", "cache": "cpupower", "description": "查看 CPU 频率信息"},
+        {
+            "name": "paru",
+            "template": "paru -Syu --noconfirm",
+            "timeout": 0,
+            "stream": True,
+            "invalidates": "all",
+            "concurrency": "heavy",
+            "description": "更新 Arch 系统",
+        },
+        {"name": "reboot", "template": "sudo reboot", "invalidates": "all", "description": "重启远程系统"},
+        {"name": "rewin", "template": "sudo rewin", "invalidates": "all", "description": "重启到 Windows 系统"},
+        {
+            "name": "systemctl-status",
+            "template": "sudo systemctl status {service}",
+            "args": ["service:unit"],
+            "cache": "systemctl_status",
+            # 3 表示服务未运行，仍是有效的状态输出
+            "ok_codes": [0, 3],
+            "description": "查看服务状态",
+        },
+        {
+            "name": "systemctl-logs",
+            "template": "journalctl -u {service} -n {lines} --no-pager",
+            "args": ["service:unit", "lines:int=100"],
+            "description": "查看服务最近的日志",
+        },
+        {
+            "name": "docker-logs",
+            "template": "docker logs --tail {lines} {container}",
+            "args": ["container:name", "lines:int=100"],
+            "description": "查看容器最近的日志",
+        },
+        {
+            "name": "docker-pull",
+            "template": "docker pull {image}",
+            "args": ["image:image"],
+            "timeout": 0,
+            "stream": True,
+            "concurrency": "heavy",
+            "description": "拉取镜像",
+        },
+    )
+    # 并发类别 -> 同时执行的命令数上限
+    CONCURRENCY_LIMITS = {"default": 4, "heavy": 1}
+    # 流式输出时，距上次回复超过该秒数或累计超过该字符数即发送一段
+    STREAM_FLUSH_SECONDS = 5.0
+    STREAM_FLUSH_CHARS = 3000
+    # 状态卡片片段缓存的条目上限
+    FRAGMENT_CACHE_SIZE = 32
+    # /shell history 趋势图的宽度（字符数）与最多显示的序列数
+    TREND_WIDTH = 48
+    TREND_MAX_SERIES = 6
+    SPARK_CHARS = "▁▂▃▄▅▆▇█"
+    # 状态卡片渲染档位，按清晰度从高到低排列：(是否使用轻量样式, html_render 参数)
+    RENDER_PROFILES = {
+        "ultra": (False, {"type": "jpeg", "quality": 90, "full_page": True, "device_scale_factor_level": "ultra"}),
+        "balanced": (False, {"type": "jpeg", "quality": 75, "full_page": True, "device_scale_factor_level": "high"}),
+        "fast": (True, {"type": "jpeg", "quality": 55, "full_page": True, "device_scale_factor_level": "normal"}),
+    }
+    # 尚无渲染记录时，auto 档位按内容量（磁盘行数 + 3 × GPU 数）选择的阈值
+    AUTO_PROFILE_THRESHOLDS = (("ultra", 8), ("balanced", 16))
+    # 超出预算的档位在该时间（秒）后重新尝试一次，旧记录随之被新的测量替换，避免一次冷启动的慢渲染永久降级
+    RENDER_RETRY_SECONDS = 600
+    # 本地绘制时各档位对应的缩放倍数
+    RASTER_SCALES = {"ultra": 2.0, "balanced": 1.5, "fast": 1.0}
+
     def __init__(self, context: Context, config: AstrBotConfig):
         """
         初始化插件，加载配置项和命令列表
@@ -30,94 +1890,1132 @@ class ShellExecutor(Star):
         self.passphrase = self.config.get("passphrase", "")
         self.timeout = self.config.get("timeout", 60)
         self.fetch_command = self.config.get("status_fetch_command", "neofetch --stdout")
+        # fetch 命令在独立线程中执行，状态采集不等待它完成
+        self._fetch_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="shell-fetch")
+        # 跳板机（ProxyJump）：[用户@]主机[:端口]，留空时直接连接
+        self.jump_host = self.config.get("jump_host", "").strip()
+        self.jump_private_key_path = self.config.get("jump_private_key_path", "")
+        self.jump_password = self.config.get("jump_password", "")
+        self._jump_client: paramiko.SSHClient | None = None
+        self._jump_lock = threading.Lock()
+        # 文件传输的锁（下载按本地 .part、上传按远程目标路径）：键 -> [锁, 持有与等待者数量]，无人使用时移除
+        self._transfer_locks: dict[str, list] = {}
+        self._transfer_locks_guard = threading.Lock()
+        self.cache_policies = dict(self.CACHE_POLICIES)
+        self._semaphores = {name: asyncio.Semaphore(limit) for name, limit in self.CONCURRENCY_LIMITS.items()}
+        self.commands, self.command_errors = self._load_commands(self.config.get("custom_commands") or [])
+        for error in self.command_errors:
+            logger.error(f"[自定义命令] {error}")
+        self.result_cache = None
+        if self.config.get("result_cache_enabled", True):
+            self.result_cache = _ResultCache(
+                max(int(self.config.get("result_cache_max_kb", 4096)), 1) * 1024
+            )
+        self.latency = _LatencyStats(self.config.get("latency_log_path", ""))
+        self._fragment_cache: OrderedDict = OrderedDict()
+        self._rasterizer = _StatusRasterizer(self.config.get("status_font_path", "")) if PILImage else None
+        # 会话 -> 渲染档位，仅保存在内存中
+        self._chat_render_profiles: dict[str, str] = {}
+        # 渲染档位 -> {"n": 次数, "ms": 平均耗时, "kb_per_unit": 每单位内容的平均图片大小}
+        self._render_stats: dict[str, dict] = {}
+        self.metrics = None
+        self.metrics_server = None
+        self.metrics_file = ""
+        export_mode = self.config.get("metrics_export", "off")
+        if export_mode in ("http", "file"):
+            self.metrics = _MetricsExporter(self.latency)
+        if export_mode == "http":
+            listen = self.config.get("metrics_listen", "127.0.0.1:9469")
+            bind_host, _, bind_port = listen.rpartition(":")
+            try:
+                self.metrics_server = self.metrics.serve(bind_host or "127.0.0.1", int(bind_port))
+                logger.info(f"[指标导出] 已在 http://{listen}/metrics 提供 Prometheus 指标")
+            except (OSError, ValueError) as e:
+                logger.error(f"[指标导出] 无法监听 {listen}: {e}")
+        elif export_mode == "file":
+            self.metrics_file = os.path.expanduser(self.config.get("metrics_file_path", ""))
+            if not self.metrics_file:
+                logger.warning("[指标导出] 已选择文件导出但未配置 metrics_file_path")
+        self.history = None
+        history_path = os.path.expanduser(self.config.get("history_db_path", ""))
+        if history_path:
+            try:
+                self.history = _HistoryStore(history_path, int(self.config.get("history_retention_days", 365)))
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"[历史记录] 无法打开 {history_path}: {e}")
+        self.alerts = None
+        if self.config.get("alert_rules"):
+            self.alerts = _AlertEngine(
+                self.config.get("alert_rules"), float(self.config.get("alert_repeat_minutes", 0)) * 60
+            )
+            for error in self.alerts.errors:
+                logger.error(f"[告警] {error}")
+        self._sampler_task = None
+        sample_interval = float(self.config.get("status_sample_interval", 0))
+        if sample_interval > 0:
+            try:
+                self._sampler_task = asyncio.get_running_loop().create_task(self._sample_loop(sample_interval))
+            except RuntimeError:
+                logger.warning("[定时采样] 当前没有运行中的事件循环，未启动定时采样")
+
+    def _load_commands(self, custom: list) -> tuple[dict[str, _CommandSpec], list[str]]:
+        """
+        编译内置命令与 custom_commands 中的自定义命令，返回 (名称 -> _CommandSpec, 错误信息)。
+        自定义命令每项为一个 JSON 对象，不能与内置命令重名；cache 为秒数时为其注册独立的缓存策略。
+        """
+        commands: dict[str, _CommandSpec] = {}
+        errors = []
+        for index, raw in enumerate([*self.BUILTIN_COMMANDS, *custom]):
+            builtin = index < len(self.BUILTIN_COMMANDS)
+            try:
+                spec = _CommandSpec(json.loads(raw) if isinstance(raw, str) else raw)
+                if spec.name in commands:
+                    raise ValueError(f"命令 {spec.name} 已存在")
+                if spec.concurrency not in self.CONCURRENCY_LIMITS:
+                    raise ValueError(f"并发类别 {spec.concurrency} 不存在，可用: {', '.join(self.CONCURRENCY_LIMITS)}")
+                if isinstance(spec.cache, (int, float)) and not isinstance(spec.cache, bool):
+                    if spec.cache > 0:
+                        policy = f"cmd:{spec.name}"
+                        self.cache_policies[policy] = (spec.cache, spec.tags or (policy,))
+                        spec.cache = policy
+                    else:
+                        spec.cache = None
+                elif spec.cache is not None and spec.cache not in self.cache_policies:
+                    raise ValueError(f"缓存策略 {spec.cache} 不存在")
+            except (ValueError, TypeError) as e:
+                if builtin:
+                    raise
+                errors.append(f"第 {index - len(self.BUILTIN_COMMANDS) + 1} 条: {e}")
+                continue
+            spec.builtin = builtin
+            commands[spec.name] = spec
+        return commands, errors
+
+    async def _run_registered(self, event: AstrMessageEvent, name: str, values: list[str]):
+        """按名称执行声明式命令：校验参数、渲染模板，并按其超时、缓存、流式与并发设置执行"""
+        spec = self.commands[name]
+        try:
+            cmd = spec.render(values)
+        except ValueError as e:
+            yield event.plain_result(f"⚠️ {e}\n用法: /shell cmd {spec.usage()}")
+            return
+        timeout = self.timeout if spec.timeout is None else (spec.timeout or None)
+        async for result in self._run_command(
+            event,
+            cmd,
+            cache=spec.cache,
+            invalidates=spec.invalidates,
+            timeout=timeout,
+            concurrency=spec.concurrency,
+            stream=spec.stream,
+            ok_codes=spec.ok_codes,
+        ):
+            yield result
+
+    async def terminate(self):
+        """插件卸载时停止定时采样与 fetch 线程，关闭指标 HTTP 服务、历史库与跳板机连接"""
+        if self._sampler_task:
+            self._sampler_task.cancel()
+            self._sampler_task = None
+        self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+        if self.history:
+            self.history.close()
+            self.history = None
+        if self.metrics_server:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        with self._jump_lock:
+            if self._jump_client:
+                self._jump_client.close()
+                self._jump_client = None
+
+    async def _sample_loop(self, interval: float):
+        """按 status_sample_interval 定时收集状态，更新指标导出与历史库"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                status = await asyncio.to_thread(self._collect_remote_status)
+            except Exception as e:
+                logger.warning(f"[定时采样] 收集远程状态失败: {e}")
+                await self._on_sample(self.ssh_host, None)
+                continue
+            await self._on_sample(self.ssh_host, status)
+
+    def _jump_transport(self) -> paramiko.Transport:
+        """
+        返回到跳板机的已认证连接。
+        该连接在各次命令之间复用，到目标主机的每个连接只是其上的一个 direct-tcpip 通道，
+        因此跳板机的握手与认证只在首次使用或连接断开后进行。
+        """
+        with self._jump_lock:
+            transport = self._jump_client.get_transport() if self._jump_client else None
+            if transport is not None and transport.is_active():
+                return transport
+            if self._jump_client:
+                self._jump_client.close()
+                self._jump_client = None
+
+            user, _, address = self.jump_host.rpartition("@")
+            host, _, port = address.partition(":")
+            key_path = os.path.expanduser(self.jump_private_key_path or self.private_key_path or "")
+            client = _TimedSSHClient()
+            client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            if key_path and os.path.exists(key_path):
+                auth = {"pkey": paramiko.RSAKey.from_private_key_file(key_path, password=self.passphrase or None)}
+            else:
+                auth = {"password": self.jump_password}
+            try:
+                client.connect(
+                    hostname=host,
+                    port=int(port or 22),
+                    username=user or self.username,
+                    timeout=self.timeout,
+                    **auth,
+                )
+            except Exception as e:
+                client.close()
+                logger.error(f"[连接失败] 无法连接到跳板机 {self.jump_host}, 错误: {e}")
+                raise
+            transport = client.get_transport()
+            # 保活，避免空闲时被跳板机或中间的防火墙断开
+            transport.set_keepalive(30)
+            self.latency.record(host, "connect", "jump", client.timings)
+            logger.info(f"[跳板机] 已连接到 {self.jump_host}，后续连接将复用该连接")
+            self._jump_client = client
+            return transport
+
+    def connect_client(self, compress: bool = False):
+        """
+        创建并返回一个已连接的 SSH 客户端，compress 为 True 时启用 SSH 传输层压缩
+        """
+        client = _TimedSSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        via = f"（经跳板机 {self.jump_host}）" if self.jump_host else ""
+
+        try:
+            sock = None
+            if self.jump_host:
+                # 在跳板机的连接上打开到目标主机的 direct-tcpip 通道，SSH 会话直接运行在该通道上
+                start = time.perf_counter()
+                sock = self._jump_transport().open_channel(
+                    "direct-tcpip", (self.ssh_host, self.ssh_port), ("127.0.0.1", 0), timeout=self.timeout
+                )
+                client.timings["jump"] = time.perf_counter() - start
+            # 根据配置选择密钥或密码认证方式
+            if self.private_key_path and os.path.exists(os.path.expanduser(self.private_key_path)):
+                private_key = paramiko.RSAKey.from_private_key_file(
+                    os.path.expanduser(self.private_key_path),
+                    password=self.passphrase or None
+                )
+                client.connect(
+                    hostname=self.ssh_host,
+                    port=self.ssh_port,
+                    username=self.username,
+                    pkey=private_key,
+                    timeout=self.timeout,
+                    compress=compress,
+                    sock=sock,
+                )
+                logger.info(f"[连接成功] 使用密钥认证连接到主机 {self.ssh_host}:{self.ssh_port}{via}")
+            else:
+                client.connect(
+                    hostname=self.ssh_host,
+                    port=self.ssh_port,
+                    username=self.username,
+                    password=self.password,
+                    timeout=self.timeout,
+                    compress=compress,
+                    sock=sock,
+                )
+                logger.info(f"[连接成功] 使用密码认证连接到主机 {self.ssh_host}:{self.ssh_port}{via}")
+
+            self.latency.record(self.ssh_host, "connect", "ssh", client.timings)
+            return client
+        except Exception as e:
+            logger.error(f"[连接失败] 无法连接到 {self.ssh_host}:{self.ssh_port}{via}, 错误: {e}")
+            raise e
+
+    def _cached_result(self, cmd: str, cache: str | None) -> _CommandResult | None:
+        """按缓存策略查找命令结果，命中时返回带 cached_age 的副本"""
+        policy = self.cache_policies.get(cache) if cache and self.result_cache else None
+        cached = self.result_cache.get(self.ssh_host, cmd) if policy else None
+        if cached is None:
+            return None
+        value, stored_at = cached
+        result = copy.copy(value)
+        result.cached_age = int(time.monotonic() - stored_at)
+        return result
+
+    def _execute(self, cmd: str, cache: str | None = None, timeout: float | None = None,
+                 ok_codes: tuple[int, ...] = (0,), label: str | None = None,
+                 check_cache: bool = True) -> _CommandResult:
+        """
+        执行单条命令并返回 _CommandResult，不向用户回复，供各指令按退出码与输出自行处理。
+        cache 为 cache_policies 中的策略名，命中缓存时不建立 SSH 连接，只缓存成功（退出码在 ok_codes 中）的结果；
+        调用方已查过缓存时传入 check_cache=False，避免重复查找（也避免未命中被计数两次）。
+        连接或执行失败时不抛出异常，而是返回 exit_code 为 None 的结果。label 为耗时统计中使用的名称（缺省由命令推断）。
+        """
+        if check_cache:
+            cached = self._cached_result(cmd, cache)
+            if cached is not None:
+                return cached
+
+        start = time.perf_counter()
+        try:
+            client = self.connect_client()
+            try:
+                out_bytes, err_bytes, exit_code, phases = self._exec_timed(client, cmd, timeout=timeout)
+            finally:
+                client.close()
+        except Exception as e:
+            logger.error(f"执行命令 {cmd} 时失败: {e}")
+            return _CommandResult(cmd, duration=time.perf_counter() - start, error=self._error_text(e))
+
+        total = sum(client.timings.values()) + sum(phases.values())
+        self.latency.record(self.ssh_host, "command", label or self._command_label(cmd), phases, total=total)
+        result = _CommandResult(cmd, out_bytes, err_bytes, exit_code, total)
+        result.ok_codes = ok_codes
+        policy = self.cache_policies.get(cache) if cache and self.result_cache else None
+        if policy and result.ok:
+            self.result_cache.put(self.ssh_host, cmd, result, *policy)
+        return result
+
+    @staticmethod
+    def _error_text(e: Exception) -> str:
+        return "执行超时" if isinstance(e, TimeoutError) else (str(e) or type(e).__name__)
+
+    # 可能存在安全风险，暂不启用自定义执行命令指令
+    async def _run_command(self, event: AstrMessageEvent, cmd: str, cache: str | None = None, invalidates=(),
+                           timeout: float | None = None, concurrency: str = "default", stream: bool = False,
+                           ok_codes: tuple[int, ...] = (0,)):
+        """
+        执行单条 Shell 命令并回复结果，消息中带 --json 时以 JSON 回复完整的执行结果
+
+        cache 为 cache_policies 中的策略名，命中缓存时直接返回结果而不建立 SSH 连接；
+        invalidates 为执行后需要失效的缓存标签，传入 None 表示清空该主机的全部缓存。
+        命令在后台线程中执行，同一 concurrency 类别同时执行的命令数受 CONCURRENCY_LIMITS 限制；
+        stream 为 True 时边执行边分段回复输出（--json 时除外）。
+        """
+        as_json = self._wants_json(event)
+        result = self._cached_result(cmd, cache)
+        if result is None:
+            try:
+                async with self._semaphores[concurrency]:
+                    if stream and not as_json:
+                        async for item in self._stream_command(cmd, timeout):
+                            if isinstance(item, _CommandResult):
+                                result = item
+                            else:
+                                yield event.plain_result(item)
+                    else:
+                        result = await asyncio.to_thread(
+                            self._execute, cmd, cache, timeout, ok_codes, None, False
+                        )
+            finally:
+                if self.result_cache and invalidates != ():
+                    self.result_cache.invalidate(self.ssh_host, invalidates)
+            result.ok_codes = ok_codes
+
+        if result.cached_age is None:
+            self._audit(event, cmd, result.exit_code, result.duration, result.stdout_bytes + result.stderr_bytes)
+        if self.metrics:
+            if result.cached_age is not None:
+                outcome = "cached"
+            elif result.exit_code is None:
+                outcome = "failed"
+            else:
+                outcome = "ok" if result.ok else "error"
+            self.metrics.count_command(self.ssh_host, self._command_label(cmd), outcome)
+            self._flush_metrics_file()
+
+        if as_json:
+            yield event.plain_result(result.to_json())
+            return
+        if stream and result.cached_age is None:
+            yield event.plain_result(self._stream_summary(result))
+            return
+        for text in self._render_result(result):
+            yield event.plain_result(text)
+
+    async def _stream_command(self, cmd: str, timeout: float | None):
+        """
+        执行命令并按 STREAM_FLUSH_SECONDS 或 STREAM_FLUSH_CHARS 分段产出输出文本（stderr 合并到 stdout），
+        最后产出一个 _CommandResult，其中不保存输出内容，只记录字节数。
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def worker():
+            start = time.perf_counter()
+            received = 0
+            try:
+                client = self.connect_client()
+                try:
+                    channel = client.get_transport().open_session(timeout=self.timeout)
+                    channel.set_combine_stderr(True)
+                    channel.settimeout(timeout)
+                    channel.exec_command(cmd)
+                    with channel.makefile("rb") as output:
+                        for line in output:
+                            received += len(line)
+                            loop.call_soon_threadsafe(queue.put_nowait, line.decode(errors="replace"))
+                    exit_code = channel.recv_exit_status()
+                finally:
+                    client.close()
+                result = _CommandResult(cmd, exit_code=exit_code, duration=time.perf_counter() - start)
+                result.stdout_bytes = received
+            except Exception as e:
+                logger.error(f"执行命令 {cmd} 时失败: {e}")
+                result = _CommandResult(cmd, duration=time.perf_counter() - start, error=self._error_text(e))
+            loop.call_soon_threadsafe(queue.put_nowait, result)
+
+        task = asyncio.ensure_future(asyncio.to_thread(worker))
+        pending: list[str] = []
+        size = 0
+        flushed = time.monotonic()
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=self.STREAM_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                item = None
+            if isinstance(item, str):
+                pending.append(item)
+                size += len(item)
+            done = isinstance(item, _CommandResult)
+            due = time.monotonic() - flushed >= self.STREAM_FLUSH_SECONDS or size >= self.STREAM_FLUSH_CHARS
+            if pending and (done or due):
+                text = "".join(pending).rstrip()
+                pending, size, flushed = [], 0, time.monotonic()
+                if text:
+                    yield text
+            if done:
+                await task
+                yield item
+                return
+
+    @staticmethod
+    def _stream_summary(result: _CommandResult) -> str:
+        if result.exit_code is None:
+            return f"❌ 执行失败: {result.error}"
+        took = f"耗时 {result.duration:.2f}s，输出 {_format_bytes(result.stdout_bytes)}"
+        if result.ok:
+            return f"✅ 执行完成（{took}）"
+        return f"❌ 执行结束，退出码 {result.exit_code}（{took}）"
+
+    @staticmethod
+    def _wants_json(event: AstrMessageEvent) -> bool:
+        return "--json" in (event.message_str or "").split()
+
+    @staticmethod
+    def _render_result(result: _CommandResult) -> list[str]:
+        """把执行结果整理为回复消息：失败时给出原因或退出码与 stderr，成功时 stderr 作为警告附带"""
+        if result.exit_code is None:
+            return [f"❌ 执行失败: {result.error}"]
+        stdout = result.stdout.rstrip()
+        stderr = result.stderr.rstrip()
+        if not result.ok:
+            reason = f"退出码 {result.exit_code}" if result.exit_code >= 0 else "远程未返回退出状态"
+            replies = [f"❌ Error（{reason}，耗时 {result.duration:.2f}s）:\n" + (stderr or "（无错误输出）")]
+            if stdout:
+                replies.append("📄 Output:\n" + stdout)
+            return replies
+        replies = []
+        if stderr:
+            replies.append("⚠️ Warning:\n" + stderr)
+        if stdout:
+            cached = f"（缓存于 {result.cached_age} 秒前）" if result.cached_age is not None else ""
+            replies.append(f"✅ Result{cached}:\n" + stdout)
+        else:
+            replies.append(f"✅ 执行成功（无输出，耗时 {result.duration:.2f}s）")
+        return replies
+
+    # 以子命令区分操作的程序，耗时统计的键保留其子命令，其余程序只保留程序名
+    SUBCOMMAND_PROGRAMS = frozenset({
+        "systemctl", "docker", "podman", "ip", "cpupower", "apt", "apt-get", "dnf", "yum", "git", "kubectl",
+        "snap", "flatpak", "nmcli", "zpool", "zfs", "btrfs",
+    })
+
+    @classmethod
+    def _command_label(cls, cmd: str) -> str:
+        """
+        将命令归并为程序名（对 SUBCOMMAND_PROGRAMS 中的程序再加子命令），用作耗时统计的键，
+        避免参数导致统计项无限增长：journalctl -u nginx -n 100 归为 journalctl，systemctl status nginx 归为 systemctl status。
+        """
+        try:
+            tokens = shlex.split(cmd)
+        except ValueError:
+            tokens = cmd.split()
+        if tokens and tokens[0] == "sudo":
+            tokens = tokens[1:]
+        while tokens and re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*=.*", tokens[0]):
+            tokens = tokens[1:]
+        label = tokens[:1]
+        if label and os.path.basename(label[0]) in cls.SUBCOMMAND_PROGRAMS:
+            for token in tokens[1:]:
+                if not token.startswith("-"):
+                    label.append(token)
+                    break
+        return " ".join(label) or cmd
+
+    def _exec_timed(self, client: paramiko.SSHClient, cmd: str, timeout: float | None = None):
+        """
+        执行命令并分段计时，返回 (stdout 字节, stderr 字节, 退出码, 各阶段耗时)。
+        channel 为打开通道并发送命令，exec 为等待首字节（近似远程执行时间），transfer 为其余输出的传输。
+        远程没有返回退出状态（如被信号终止）时退出码为 -1。
+        """
+        start = time.perf_counter()
+        stdin, stdout, stderr = client.exec_command(cmd, timeout=timeout)
+        opened = time.perf_counter()
+        first = stdout.read(1)
+        first_byte = time.perf_counter()
+        output = first + stdout.read()
+        error = stderr.read()
+        # 输出已读到 EOF，退出状态随后即到，不会额外等待远程执行
+        exit_code = stdout.channel.recv_exit_status()
+        done = time.perf_counter()
+        return output, error, exit_code, {
+            "channel": opened - start,
+            "exec": first_byte - opened,
+            "transfer": done - first_byte,
+        }
+
+    def _exec(self, client: paramiko.SSHClient, cmd: str, label: str | None = None):
+        """在已经建立的 SSH 连接上执行命令并返回输出，label 为耗时统计中使用的名称（缺省为命令本身）"""
+        output, error, _, phases = self._exec_timed(client, cmd, timeout=self.timeout)
+        self.latency.record(self.ssh_host, "probe", label or cmd, phases)
+        return output.decode(errors="ignore").strip(), error.decode(errors="ignore").strip()
+
+    def _safe_run(self, client: paramiko.SSHClient, cmd: str, label: str | None = None) -> str:
+        """执行命令，记录错误但不中断收集流程"""
+        try:
+            output, error = self._exec(client, cmd, label)
+            if error:
+                logger.warning(f"[命令警告] {label or cmd}: {error}")
+            return output
+        except Exception as e:
+            logger.error(f"[命令失败] {label or cmd}: {e}")
+            return ""
+
+    def _run_batch(self, client: paramiko.SSHClient, sections: dict[str, str], label: str) -> dict[str, str]:
+        """
+        将多个探测命令合并为一次远程执行，各段输出以随机标记行分隔，返回 段名 -> 输出。
+        每段的 stderr 被丢弃，某段失败不影响其他段。
+        """
+        marker = f"__shell_executor_{os.urandom(4).hex()}__"
+        script = "\n".join(
+            f"echo {marker}{name}\n{{ {cmd}\n}} 2>/dev/null" for name, cmd in sections.items()
+        )
+        output = self._safe_run(client, script, label)
+        results = {name: [] for name in sections}
+        current = None
+        for line in output.splitlines():
+            if line.startswith(marker):
+                current = line[len(marker):]
+                continue
+            if current in results:
+                results[current].append(line)
+        return {name: "\n".join(lines).strip() for name, lines in results.items()}
+
+    # 批量操作：动作 -> (远程命令, 判定成功的状态)。systemctl 按 ActiveState / UnitFileState 判定，docker 按输出的容器名判定
+    BULK_ACTIONS = {
+        ("systemctl", "start"): ("sudo systemctl start --", ("active", "activating", "reloading")),
+        ("systemctl", "stop"): ("sudo systemctl stop --", ("inactive", "deactivating", "failed")),
+        ("systemctl", "restart"): ("sudo systemctl restart --", ("active", "activating", "reloading")),
+        ("systemctl", "enable"): ("sudo systemctl enable --", ("enabled", "enabled-runtime", "alias", "static")),
+        ("systemctl", "disable"): ("sudo systemctl disable --", ("disabled", "static")),
+        ("docker", "start"): ("docker start --", ()),
+        ("docker", "stop"): ("docker stop --", ()),
+        ("docker", "restart"): ("docker restart --", ()),
+        ("docker", "rm"): ("docker rm --", ()),
+    }
 
-    def connect_client(self):
+    @staticmethod
+    def _command_targets(event: AstrMessageEvent, action: str, first: str) -> list[str]:
         """
-        创建并返回一个已连接的 SSH 客户端
+        从原始消息中取出子命令 action 之后的全部参数。
+        指令处理函数只按声明的参数个数接收参数，多个目标需从消息文本中解析（引号按 shell 规则去除），
+        解析失败时退回 first。
         """
-        client = paramiko.SSHClient()
-        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        targets = ShellExecutor._message_args(event, action)
+        return list(dict.fromkeys(targets)) if targets else [first]
 
+    @staticmethod
+    def _message_args(event: AstrMessageEvent, action: str) -> list[str]:
+        """
+        按 shell 规则拆分原始消息，返回第一个 action 之后的全部参数（保留顺序与重复项）。
+        --json 是回复格式的开关而不是参数，不会出现在结果中。
+        """
         try:
-            # 根据配置选择密钥或密码认证方式
-            if self.private_key_path and os.path.exists(os.path.expanduser(self.private_key_path)):
-                private_key = paramiko.RSAKey.from_private_key_file(
-                    os.path.expanduser(self.private_key_path),
-                    password=self.passphrase or None
-                )
-                client.connect(
-                    hostname=self.ssh_host,
-                    port=self.ssh_port,
-                    username=self.username,
-                    pkey=private_key,
-                    timeout=self.timeout
-                )
-                logger.info(f"[连接成功] 使用密钥认证连接到主机 {self.ssh_host}:{self.ssh_port}")
+            tokens = shlex.split(event.message_str or "")
+        except ValueError:
+            tokens = (event.message_str or "").split()
+        args = tokens[tokens.index(action) + 1:] if action in tokens else []
+        return [arg for arg in args if arg != "--json"]
+
+    @staticmethod
+    def _glob_to_ere(pattern: str) -> str:
+        """将仅含 * 与 ? 的通配符转换为 grep -E 使用的正则"""
+        out = []
+        for ch in pattern:
+            if ch == "*":
+                out.append(".*")
+            elif ch == "?":
+                out.append(".")
+            elif ch in ".^$+(){}|[]\\":
+                out.append("\\" + ch)
             else:
-                client.connect(
-                    hostname=self.ssh_host,
-                    port=self.ssh_port,
-                    username=self.username,
-                    password=self.password,
-                    timeout=self.timeout
+                out.append(ch)
+        return "".join(out)
+
+    def _bulk_expand(self, kind: str, action: str, targets: list[str]) -> str:
+        """
+        生成把目标列表设置为位置参数的脚本：普通名称原样加引号，含通配符的目标在远程展开。
+        systemctl 直接使用其自带的模式匹配，docker 用 grep 在全部容器名中匹配。
+        """
+        args = []
+        for target in targets:
+            if not any(ch in target for ch in "*?"):
+                args.append(shlex.quote(target))
+            elif kind == "systemctl":
+                lister = "list-unit-files" if action in ("enable", "disable") else "list-units --all"
+                args.append(
+                    f"$(systemctl {lister} --plain --no-legend --full -- {shlex.quote(target)} | awk '{{print $1}}')"
                 )
-                logger.info(f"[连接成功] 使用密码认证连接到主机 {self.ssh_host}:{self.ssh_port}")
+            else:
+                regex = shlex.quote(self._glob_to_ere(target))
+                args.append(f"$(docker ps -a --format '{{{{.Names}}}}' | grep -xE -e {regex})")
+        return f"set -- {' '.join(args)}\nprintf '%s\\n' \"$@\""
 
-            return client
-        except Exception as e:
-            logger.error(f"[连接失败] 无法连接到 {self.ssh_host}:{self.ssh_port}, 错误: {e}")
-            raise e
+    @staticmethod
+    def _parse_systemctl_show(output: str) -> list[dict[str, str]]:
+        """解析 systemctl show 的输出，各单元之间以空行分隔，按参数顺序返回"""
+        units, current = [], {}
+        for line in output.splitlines() + [""]:
+            if not line.strip():
+                if current:
+                    units.append(current)
+                current = {}
+                continue
+            key, _, value = line.partition("=")
+            current[key] = value
+        return units
 
-    # 可能存在安全风险，暂不启用自定义执行命令指令
-    async def _run_command(self, event: AstrMessageEvent, cmd: str):
+    # systemctl overview 查询的单元属性
+    SYSTEMD_OVERVIEW_PROPERTIES = (
+        "Id", "LoadState", "ActiveState", "SubState", "Result", "NRestarts", "MemoryCurrent", "CPUUsageNSec",
+    )
+
+    @staticmethod
+    def _systemd_number(value: str | None) -> int | None:
+        """systemd 对未启用统计的属性返回 [not set] 或 2^64-1，均视为无数据"""
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            return None
+        return number if number < 2 ** 64 - 1 else None
+
+    def _probe_systemd_overview(self, patterns: list[str]) -> dict:
         """
-        执行单条 Shell 命令
+        一次远程执行获取系统整体状态，以及全部（或匹配 patterns 的）服务单元的状态、内存、CPU 时间与重启次数：
+        list-units 列出单元后作为参数交给单次 systemctl show。结果按 systemctl_overview 策略缓存。
         """
+        key = "systemd_overview " + " ".join(patterns)
+        policy = self.CACHE_POLICIES["systemctl_overview"]
+        cached = self.result_cache.get(self.ssh_host, key) if self.result_cache else None
+        if cached is not None:
+            return cached[0]
+        quoted = " ".join(shlex.quote(p) for p in patterns)
+        lister = f"systemctl list-units --type=service --all --plain --no-legend --full -- {quoted}"
+        client = self.connect_client()
         try:
-            client = self.connect_client()
-            stdin, stdout, stderr = client.exec_command(cmd)
-
-            output = stdout.read().decode()
-            error = stderr.read().decode()
+            out = self._run_batch(
+                client,
+                {
+                    "system": "systemctl is-system-running",
+                    "show": (
+                        f"units=$({lister} | awk '{{print $1}}')\n"
+                        f'[ -n "$units" ] && systemctl show -p {",".join(self.SYSTEMD_OVERVIEW_PROPERTIES)} -- $units'
+                    ),
+                },
+                "systemctl overview",
+            )
+        finally:
             client.close()
+        units = []
+        for unit in self._parse_systemctl_show(out["show"]):
+            if unit.get("LoadState") == "not-found":
+                continue
+            cpu_ns = self._systemd_number(unit.get("CPUUsageNSec"))
+            units.append(
+                {
+                    "name": unit.get("Id", "-"),
+                    "active": unit.get("ActiveState", ""),
+                    "sub": unit.get("SubState", ""),
+                    "result": unit.get("Result", ""),
+                    "restarts": self._systemd_number(unit.get("NRestarts")) or 0,
+                    "memory_bytes": self._systemd_number(unit.get("MemoryCurrent")),
+                    "cpu_seconds": cpu_ns / 1e9 if cpu_ns is not None else None,
+                }
+            )
+        overview = {"system": out["system"] or "unknown", "units": units}
+        if self.result_cache:
+            self.result_cache.put(self.ssh_host, key, overview, *policy)
+        return overview
 
-            # 过滤 stderr 中的警告信息
-            warnings = []
-            errors = []
-            for line in error.splitlines():
-                if line.startswith("warning:"):
-                    warnings.append(line)  # 将警告单独记录
-                else:
-                    errors.append(line)  # 将非警告视为真正的错误
-
-            if errors:
-                # 如果有真正的错误，抛出错误信息
-                yield event.plain_result("❌ Error:\n" + "\n".join(errors))
-            if warnings:
-                yield event.plain_result("⚠️ Warning:\n" + "\n".join(warnings))
-            if output:
-                yield event.plain_result("✅ Result:\n" + output)
-        except Exception as e:
-            logger.error(f"执行命令 {cmd} 时失败: {str(e)}")
+    def _build_systemd_overview(self, overview: dict, limit: int = 10) -> str:
+        """生成 /shell systemctl overview 的文本：失败与异常单元优先，其次是内存与 CPU 时间占用最高的服务"""
+        units = overview["units"]
+        if not units:
+            return f"🧭 系统状态 {overview['system']}，没有匹配的服务单元"
 
-    def _exec(self, client: paramiko.SSHClient, cmd: str):
-        """在已经建立的 SSH 连接上执行命令并返回输出"""
-        stdin, stdout, stderr = client.exec_command(cmd, timeout=self.timeout)
-        output = stdout.read().decode(errors="ignore").strip()
-        error = stderr.read().decode(errors="ignore").strip()
-        return output, error
+        def fmt_cpu(seconds: float | None) -> str:
+            if seconds is None:
+                return "-"
+            if seconds < 60:
+                return f"{seconds:.1f}s"
+            minutes, sec = divmod(int(seconds), 60)
+            hours, minutes = divmod(minutes, 60)
+            return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{sec:02d}s"
 
-    def _safe_run(self, client: paramiko.SSHClient, cmd: str) -> str:
-        """执行命令，记录错误但不中断收集流程"""
+        def line(unit: dict) -> str:
+            parts = [f"{unit['active']} ({unit['sub']})"]
+            if unit["result"] and unit["result"] != "success":
+                parts.append(f"结果 {unit['result']}")
+            if unit["restarts"]:
+                parts.append(f"重启 {unit['restarts']} 次")
+            if unit["memory_bytes"] is not None:
+                parts.append(f"内存 {_format_bytes(unit['memory_bytes'])}")
+            if unit["cpu_seconds"] is not None:
+                parts.append(f"CPU {fmt_cpu(unit['cpu_seconds'])}")
+            return f"- {unit['name']}：" + " · ".join(parts)
+
+        failed = [u for u in units if u["active"] == "failed"]
+        degraded = [
+            u for u in units
+            if u not in failed and (u["active"] in ("activating", "deactivating", "reloading") or u["restarts"])
+        ]
+        running = sum(1 for u in units if u["sub"] == "running")
+        icon = "✅" if overview["system"] == "running" and not failed else "⚠️"
+        lines = [
+            f"{icon} 系统状态 {overview['system']}：服务 {len(units)} 个，运行中 {running}，"
+            f"失败 {len(failed)}，异常 {len(degraded)}"
+        ]
+        for title, group in (("❌ 失败", failed), ("⚠️ 异常（启动中 / 反复重启）", degraded)):
+            if group:
+                lines += ["", title + ":"] + [line(u) for u in group[:limit]]
+                if len(group) > limit:
+                    lines.append(f"- 另有 {len(group) - limit} 个")
+        for title, key in (("📈 内存占用最高", "memory_bytes"), ("⏱️ CPU 时间最多", "cpu_seconds")):
+            top = heapq.nlargest(5, (u for u in units if u[key]), key=lambda u: u[key])
+            if top:
+                lines += ["", title + ":"] + [line(u) for u in top]
+        return "\n".join(lines)
+
+    @staticmethod
+    def _lines_mentioning(lines: list[str], *names: str) -> list[str]:
+        """返回完整提到某个名称的输出行，web 不会匹配 web-2、nginx 不会匹配 nginx-exporter"""
+        patterns = [re.compile(rf"(?<![\w.@-]){re.escape(name)}(?![\w@-])") for name in names if name]
+        return [line for line in lines if any(p.search(line) for p in patterns)]
+
+    async def _run_bulk(self, event: AstrMessageEvent, kind: str, action: str, first: str):
+        """
+        对多个服务或容器执行同一操作，目标支持通配符。
+        目标展开、操作本身与操作后的状态查询在一次远程执行中完成，回复中列出每个目标的结果。
+        systemctl 的成败只看操作后的单元状态，docker 只看命令是否原样回显了容器名；
+        命令的原始输出仅作为失败目标的详情。
+        """
+        command, ok_states = self.BULK_ACTIONS[(kind, action)]
+        targets = self._command_targets(event, action, first)
+        sections = {
+            "targets": self._bulk_expand(kind, action, targets),
+            "output": f'[ $# -gt 0 ] && {command} "$@" 2>&1',
+        }
+        if kind == "systemctl":
+            sections["state"] = 'systemctl show -p Id,LoadState,ActiveState,SubState,UnitFileState -- "$@"'
+        else:
+            sections["state"] = 'docker inspect -f \'{{.Name}} {{.State.Status}}\' -- "$@"'
+        label = f"{kind} {action}"
+
+        def run() -> dict[str, str]:
+            client = self.connect_client()
+            try:
+                return self._run_batch(client, sections, label)
+            finally:
+                client.close()
+
+        start = time.perf_counter()
         try:
-            output, error = self._exec(client, cmd)
-            if error:
-                logger.warning(f"[命令警告] {cmd}: {error}")
-            return output
+            out = await asyncio.to_thread(run)
         except Exception as e:
-            logger.error(f"[命令失败] {cmd}: {e}")
+            logger.error(f"批量执行 {label} 失败: {e}")
+            self._audit(event, f"{label} {' '.join(targets)}")
+            if self.metrics:
+                self.metrics.count_command(self.ssh_host, label, "failed")
+            yield event.plain_result(f"❌ {label} 执行失败: {e}")
+            return
+        finally:
+            if self.result_cache:
+                self.result_cache.invalidate(self.ssh_host, ("systemd",) if kind == "systemctl" else ("docker",))
+
+        expanded = out["targets"].splitlines()
+        if not expanded:
+            yield event.plain_result(f"⚠️ 没有与 {' '.join(targets)} 匹配的目标")
+            return
+        output_lines = out["output"].splitlines()
+        results = []
+        if kind == "systemctl":
+            units = self._parse_systemctl_show(out["state"])
+            seen = set()
+            for target, unit in zip(expanded, units + [{}] * (len(expanded) - len(units))):
+                name = unit.get("Id") or target
+                # 普通名称与通配符可能展开出同一单元
+                if name in seen:
+                    continue
+                seen.add(name)
+                if unit.get("LoadState") == "not-found":
+                    results.append((False, name, "未找到该单元"))
+                    continue
+                state = unit.get("UnitFileState") if action in ("enable", "disable") else unit.get("ActiveState")
+                detail = f"{unit.get('ActiveState', '-')} ({unit.get('SubState', '-')})"
+                if action in ("enable", "disable"):
+                    detail = f"{unit.get('UnitFileState') or '-'}，{detail}"
+                ok = state in ok_states
+                errors = [] if ok else self._lines_mentioning(output_lines, target, name)
+                results.append((ok, name, "；".join(errors) or detail))
+        else:
+            states = {}
+            for line in out["state"].splitlines():
+                name, _, state = line.partition(" ")
+                states[name.lstrip("/")] = state
+            for target in dict.fromkeys(expanded):
+                ok = target in output_lines
+                errors = [] if ok else self._lines_mentioning(output_lines, target)
+                detail = "已删除" if ok and action == "rm" else states.get(target, "-")
+                results.append((ok, target, "；".join(errors) or detail))
+
+        failed = sum(1 for ok, _, _ in results if not ok)
+        self._audit(
+            event,
+            f"{label} {' '.join(name for _, name, _ in results)}",
+            duration=time.perf_counter() - start,
+            output_bytes=sum(len(v) for v in out.values()),
+        )
+        if self.metrics:
+            self.metrics.count_command(self.ssh_host, label, "error" if failed else "ok")
+            self._flush_metrics_file()
+        if self._wants_json(event):
+            payload = {
+                "action": label,
+                "ok": not failed,
+                "results": [{"target": name, "ok": ok, "detail": detail} for ok, name, detail in results],
+            }
+            yield event.plain_result(json.dumps(payload, ensure_ascii=False, indent=2))
+            return
+        header = f"{'✅' if not failed else '⚠️'} {label}：{len(results)} 个目标"
+        if failed:
+            header += f"，{failed} 个失败"
+        lines = [header] + [f"{'✔' if ok else '❌'} {name}：{detail}" for ok, name, detail in results]
+        yield event.plain_result("\n".join(lines))
+
+    @staticmethod
+    def _gpu_field(val: str) -> str:
+        """清理 nvidia-smi 等输出中的 [N/A]、[Not Supported] 等占位"""
+        val = (val or "").strip()
+        return "" if not val or val.startswith("[") or val.upper() in ("N/A", "NA") else val
+
+    def _parse_nvidia_gpus(self, gpu_output: str, apps_output: str) -> list[dict]:
+        gpus, by_uuid = [], {}
+        for line in gpu_output.splitlines():
+            fields = [self._gpu_field(f) for f in line.split(",")]
+            if len(fields) < 12:
+                continue
+            gpu = {
+                "vendor": "nvidia",
+                "index": fields[0],
+                "name": fields[2],
+                "mem_used": fields[3],
+                "mem_total": fields[4],
+                "util": fields[5],
+                "temp": fields[6],
+                "clock_core": fields[7],
+                "clock_mem": fields[8],
+                "power_draw": fields[9],
+                "power_limit": fields[10],
+                "fan": fields[11],
+                "processes": [],
+            }
+            gpus.append(gpu)
+            by_uuid[fields[1]] = gpu
+        for line in apps_output.splitlines():
+            fields = [self._gpu_field(f) for f in line.split(",")]
+            if len(fields) >= 4 and fields[0] in by_uuid:
+                by_uuid[fields[0]]["processes"].append({"pid": fields[1], "name": fields[2], "mem": fields[3]})
+        return gpus
+
+    def _parse_rocm_gpus(self, output: str) -> list[dict]:
+        if not output:
+            return []
+        try:
+            data = json.loads(output[output.index("{"):])
+        except ValueError:
+            logger.warning("[GPU 探测] rocm-smi 输出无法解析为 JSON")
+            return []
+
+        def pick(card: dict, *needles: str) -> str:
+            for key, value in card.items():
+                lower = key.lower()
+                if all(n in lower for n in needles):
+                    return self._gpu_field(str(value))
             return ""
 
+        def mib(val: str) -> str:
+            try:
+                return str(round(int(val) / 1024 / 1024))
+            except (TypeError, ValueError):
+                return ""
+
+        gpus = []
+        for name, card in data.items():
+            if not name.startswith("card") or not isinstance(card, dict):
+                continue
+            gpus.append(
+                {
+                    "vendor": "amd",
+                    "index": name[4:],
+                    "name": pick(card, "card series") or pick(card, "card model") or "AMD GPU",
+                    "mem_used": mib(pick(card, "vram", "used")),
+                    "mem_total": mib(pick(card, "vram", "total memory")),
+                    "util": pick(card, "gpu use"),
+                    "temp": pick(card, "temperature", "edge") or pick(card, "temperature"),
+                    "clock_core": re.sub(r"[^0-9.]", "", pick(card, "sclk")),
+                    "clock_mem": re.sub(r"[^0-9.]", "", pick(card, "mclk")),
+                    "power_draw": pick(card, "average", "power") or pick(card, "current", "power"),
+                    "power_limit": pick(card, "max", "power"),
+                    "fan": pick(card, "fan speed (%)"),
+                    "processes": [],
+                }
+            )
+        # rocm-smi 的进程列表不区分显卡，只有一张 AMD 显卡时才能可靠地归属
+        pids = data.get("system", {}) if isinstance(data.get("system"), dict) else {}
+        if len(gpus) == 1:
+            for key, value in pids.items():
+                if not key.startswith("PID"):
+                    continue
+                parts = [p.strip() for p in str(value).split(",")]
+                gpus[0]["processes"].append(
+                    {"pid": key[3:], "name": parts[0] if parts else "", "mem": mib(parts[2]) if len(parts) > 2 else ""}
+                )
+        return gpus
+
+    def _parse_intel_gpus(self, output: str) -> list[dict]:
+        gpus = []
+        for line in output.splitlines():
+            parts = line.split("|")
+            if len(parts) < 5:
+                continue
+            card, name, cur, max_freq, temp = parts[:5]
+            try:
+                temp = str(round(int(temp) / 1000))
+            except ValueError:
+                temp = ""
+            gpus.append(
+                {
+                    "vendor": "intel",
+                    "index": card[4:],
+                    "name": name.strip() or "Intel GPU",
+                    "mem_used": "",
+                    "mem_total": "",
+                    "util": "",
+                    "temp": temp,
+                    "clock_core": cur.strip(),
+                    "clock_max": max_freq.strip(),
+                    "clock_mem": "",
+                    "power_draw": "",
+                    "power_limit": "",
+                    "fan": "",
+                    "processes": [],
+                }
+            )
+        return gpus
+
+    def _probe_gpus(self, client: paramiko.SSHClient | None = None) -> list[dict]:
+        """
+        统一 GPU 探测：一次远程执行获取 nvidia-smi（含进程显存占用）、rocm-smi 与 Intel sysfs 信息，
+        结果在 gpu_cache_seconds 内缓存（需开启结果缓存），状态卡片与 /shell nvidia-smi 共用。
+        未传入 client 时只在缓存未命中时才建立连接，用完即关闭。
+        """
+        ttl = self.config.get("gpu_cache_seconds", 5)
+        if self.result_cache and ttl > 0:
+            cached = self.result_cache.get(self.ssh_host, "gpu_probe")
+            if cached is not None:
+                return cached[0]
+        own_client = client is None
+        if own_client:
+            client = self.connect_client()
+        try:
+            out = self._run_batch(client, _GPU_PROBE_SECTIONS, "gpu probe")
+        finally:
+            if own_client:
+                client.close()
+        gpus = (
+            self._parse_nvidia_gpus(out["nvidia_gpu"], out["nvidia_apps"])
+            + self._parse_rocm_gpus(out["rocm"])
+            + self._parse_intel_gpus(out["intel"])
+        )
+        if self.result_cache and ttl > 0:
+            self.result_cache.put(self.ssh_host, "gpu_probe", gpus, ttl, ("gpu",))
+        return gpus
+
+    def _build_gpu_report(self, gpus: list[dict]) -> str:
+        """生成 /shell nvidia-smi 的文本输出"""
+        if not gpus:
+            return "未检测到可用的 GPU（nvidia-smi、rocm-smi 与 Intel sysfs 均无输出）"
+        lines = []
+        for gpu in gpus:
+            lines.append(f"🎮 [{gpu.get('vendor', '').upper()} #{gpu.get('index')}] {gpu.get('name')}")
+            details = []
+            if gpu.get("util"):
+                details.append(f"负载 {gpu['util']}%")
+            if gpu.get("mem_total"):
+                details.append(f"显存 {gpu.get('mem_used') or '-'} / {gpu['mem_total']} MiB")
+            if gpu.get("temp"):
+                details.append(f"温度 {gpu['temp']}℃")
+            if gpu.get("power_draw"):
+                limit = f" / {gpu['power_limit']}" if gpu.get("power_limit") else ""
+                details.append(f"功耗 {gpu['power_draw']}{limit} W")
+            if gpu.get("fan"):
+                details.append(f"风扇 {gpu['fan']}%")
+            clocks = [c for c in (gpu.get("clock_core"), gpu.get("clock_mem")) if c]
+            if clocks:
+                details.append(f"频率 {' / '.join(clocks)} MHz")
+            if details:
+                lines.append("   " + " | ".join(details))
+            processes = _gpu_processes_line(gpu, limit=10)
+            if processes:
+                lines.append(f"   进程: {processes}")
+        return "\n".join(lines)
+
+    @staticmethod
+    def _parse_docker(ps_output: str, stats_output: str) -> list[dict]:
+        """
+        合并 docker ps 与 docker stats 的 JSON 行输出，返回容器列表。
+        运行中的容器排在前面并按 CPU 占用从高到低排序。
+        """
+
+        def percent(val) -> float | None:
+            try:
+                return round(float(str(val).rstrip("%")), 2)
+            except ValueError:
+                return None
+
+        stats = {}
+        for line in stats_output.splitlines():
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            used, _, limit = (item.get("MemUsage") or "").partition("/")
+            stats[item.get("ID") or item.get("Name")] = {
+                "cpu": percent(item.get("CPUPerc")),
+                "mem_used_bytes": _parse_size(used),
+                "mem_limit_bytes": _parse_size(limit),
+                "mem_percent": percent(item.get("MemPerc")),
+                "net_io": item.get("NetIO") or None,
+                "block_io": item.get("BlockIO") or None,
+                "pids": item.get("PIDs") or None,
+            }
+
+        containers = []
+        for line in ps_output.splitlines():
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            container = {
+                "id": (item.get("ID") or "")[:12],
+                "name": item.get("Names") or item.get("ID", "")[:12],
+                "image": item.get("Image"),
+                "state": item.get("State") or "",
+                "status": item.get("Status"),
+                "ports": item.get("Ports") or None,
+                "cpu": None,
+            }
+            container.update(stats.get(item.get("ID")) or stats.get(container["name"]) or {})
+            containers.append(container)
+        containers.sort(key=lambda c: (c["state"] != "running", -(c.get("cpu") or 0), c["name"]))
+        return containers
+
+    def _probe_docker(self, client: paramiko.SSHClient | None = None) -> list[dict] | None:
+        """
+        一次远程执行获取全部容器及其资源快照（docker ps + 单次 docker stats --no-stream），
+        结果在 docker_cache_seconds 内缓存，状态卡片与 /shell docker ps 共用；
+        容器的启停、删除会通过 docker 标签使缓存失效。远程没有 Docker 时返回 None。
+        未传入 client 时只在缓存未命中时才建立连接，用完即关闭。
+        """
+        ttl = self.config.get("docker_cache_seconds", 10)
+        if self.result_cache and ttl > 0:
+            cached = self.result_cache.get(self.ssh_host, "docker_probe")
+            if cached is not None:
+                return cached[0]
+        own_client = client is None
+        if own_client:
+            client = self.connect_client()
+        try:
+            out = self._run_batch(
+                client,
+                {"available": "command -v docker", **_DOCKER_PROBE_SECTIONS},
+                "docker probe",
+            )
+        finally:
+            if own_client:
+                client.close()
+        containers = self._parse_docker(out["ps"], out["stats"]) if out["available"] else None
+        if self.result_cache and ttl > 0:
+            self.result_cache.put(self.ssh_host, "docker_probe", containers, ttl, ("docker",))
+        return containers
+
+    def _probe_fetch(self, client: paramiko.SSHClient) -> str:
+        """
+        执行 status_fetch_command（如 neofetch --stdout）并返回输出，结果基本不变，在 fetch_cache_seconds 内缓存。
+        受独立的 fetch_timeout 约束；命令不存在、超时或失败时返回空字符串，并缓存较短时间以免每次重试。
+        """
+        ttl = self.config.get("fetch_cache_seconds", 3600)
+        if self.result_cache and ttl > 0:
+            cached = self.result_cache.get(self.ssh_host, "fetch_probe")
+            if cached is not None:
+                return cached[0]
+        try:
+            output, _, exit_code, phases = self._exec_timed(
+                client, self.fetch_command, timeout=self.config.get("fetch_timeout", 10)
+            )
+            self.latency.record(self.ssh_host, "probe", "fetch", phases)
+            text = output.decode(errors="ignore").strip() if exit_code == 0 else ""
+            if exit_code != 0:
+                logger.warning(f"[fetch 失败] {self.fetch_command} 退出码 {exit_code}")
+        except Exception as e:
+            logger.warning(f"[fetch 失败] {self.fetch_command}: {self._error_text(e)}")
+            text = ""
+        if self.result_cache and ttl > 0:
+            self.result_cache.put(self.ssh_host, "fetch_probe", text, ttl if text else min(ttl, 300), ("hw",))
+        return text
+
+    def _build_docker_report(self, containers: list[dict] | None) -> str:
+        """生成 /shell docker ps 的文本输出"""
+        if containers is None:
+            return "未检测到 Docker（docker 命令不可用）"
+        if not containers:
+            return "🐳 没有容器"
+        running = sum(1 for c in containers if c["state"] == "running")
+        lines = [f"🐳 容器 {len(containers)} 个（运行中 {running} 个）"]
+        for container in containers:
+            icon = "🟢" if container["state"] == "running" else "⚪"
+            state = container["status"] or container["state"]
+            lines.append(f"{icon} {container['name']}  {container.get('image') or '-'}  [{state}]")
+            if container.get("cpu") is not None:
+                lines.append(f"   {_container_line(container)}")
+        return "\n".join(lines)
+
     def _parse_cpu_usage(self, top_line: str) -> dict | None:
         """从 top 输出中提取 CPU 使用率及分布"""
         if not top_line:
@@ -133,16 +3031,19 @@ class ShellExecutor(Star):
         if not metrics:
             return None
 
-        idle = metrics.get("id") or metrics.get("idle")
+        def pick(*labels: str) -> float | None:
+            # 满载时 idle 为 0.0，不能用 or 回退
+            return next((metrics[label] for label in labels if label in metrics), None)
 
         def r(v: float | None) -> float | None:
             return round(v, 1) if v is not None else None
 
+        idle = pick("id", "idle")
         total = r(100 - idle) if idle is not None else None
         return {
             "total": total,
-            "user": r(metrics.get("us") or metrics.get("user")),
-            "system": r(metrics.get("sy") or metrics.get("sys")),
+            "user": r(pick("us", "user")),
+            "system": r(pick("sy", "sys")),
             "iowait": r(metrics.get("wa")),
             "idle": r(idle),
         }
@@ -180,7 +3081,7 @@ class ShellExecutor(Star):
             configured_best = None
             current_best = None
             for cmd in cmds:
-                out = (self._safe_run(client, cmd) or "").strip()
+                out = (self._safe_run(client, cmd, "memory speed dmidecode") or "").strip()
                 if not out:
                     continue
                 for line in out.splitlines():
@@ -209,7 +3110,7 @@ class ShellExecutor(Star):
             r"PATH=$PATH:/usr/sbin:/sbin lshw -C memory 2>/dev/null | awk '/clock/ {print $2 $3}'",
         ]
         for cmd in lshw_cmds:
-            out = (self._safe_run(client, cmd) or "").strip()
+            out = (self._safe_run(client, cmd, "memory speed lshw") or "").strip()
             if not out:
                 continue
             for line in out.splitlines():
@@ -297,47 +3198,309 @@ class ShellExecutor(Star):
         return "".join(out_parts)
 
 
+    # 默认排除的伪文件系统与挂载点，按 fnmatch 匹配文件系统类型、挂载点或设备
+    DEFAULT_DISK_EXCLUDES = (
+        "tmpfs", "devtmpfs", "squashfs", "overlay", "efivarfs", "ramfs",
+        "/snap/*", "/var/lib/docker/*", "/run/*",
+    )
+
+    def _disk_excluded(self, source: str, fstype: str, mount: str) -> bool:
+        patterns = self.config.get("disk_exclude_patterns") or self.DEFAULT_DISK_EXCLUDES
+        return any(fnmatch.fnmatch(value, pattern) for pattern in patterns for value in (fstype, mount, source))
+
+    @staticmethod
+    def _parse_diskstats(text: str) -> dict[str, tuple[int, ...]]:
+        """解析 /proc/diskstats，返回 设备名 -> (读次数, 读扇区, 写次数, 写扇区, IO 耗时 ms)"""
+        stats = {}
+        for line in text.splitlines():
+            parts = line.split()
+            if len(parts) < 14:
+                continue
+            try:
+                stats[parts[2]] = (int(parts[3]), int(parts[5]), int(parts[7]), int(parts[9]), int(parts[12]))
+            except ValueError:
+                continue
+        return stats
+
+    @staticmethod
+    def _parse_uptime_seconds(text: str) -> float | None:
+        try:
+            return float(text.split()[0])
+        except (IndexError, ValueError):
+            return None
+
+    def _parse_disks(self, out: dict[str, str], elapsed: float | None) -> list[dict]:
+        """
+        解析状态批量探测中的 df 与前后两次 /proc/diskstats，
+        计算各设备的读写吞吐、IOPS 与繁忙度。结果按占用比例从高到低排序。
+        """
+        io = {}
+        if elapsed:
+            before, after = self._parse_diskstats(out["diskstats1"]), self._parse_diskstats(out["diskstats2"])
+            for dev, b in before.items():
+                a = after.get(dev)
+                if a is None:
+                    continue
+                io[dev] = {
+                    "read_iops": round((a[0] - b[0]) / elapsed, 1),
+                    "read_bps": (a[1] - b[1]) * 512 / elapsed,
+                    "write_iops": round((a[2] - b[2]) / elapsed, 1),
+                    "write_bps": (a[3] - b[3]) * 512 / elapsed,
+                    "util": round(min((a[4] - b[4]) / (elapsed * 1000) * 100, 100), 1),
+                }
+        mapper = {}
+        for line in out["mapper"].splitlines():
+            parts = line.split()
+            if len(parts) == 2:
+                mapper[parts[0]] = parts[1]
+
+        min_bytes = self.config.get("disk_min_size_mb", 100) * 1024 * 1024
+        disks, seen = [], set()
+        for line in out["df"].splitlines()[1:]:
+            parts = line.split(None, 5)
+            if len(parts) < 6:
+                continue
+            source, fstype, used, size, percent, mount = parts
+            if self._disk_excluded(source, fstype, mount):
+                continue
+            try:
+                used_bytes, size_bytes = int(used), int(size)
+            except ValueError:
+                continue
+            # 绑定挂载、btrfs 子卷等会重复出现同一设备，只保留第一次出现的挂载点
+            if size_bytes < min_bytes or (source, used_bytes, size_bytes) in seen:
+                continue
+            seen.add((source, used_bytes, size_bytes))
+            try:
+                percent_num = int(re.sub(r"[^0-9]", "", percent) or 0)
+            except ValueError:
+                percent_num = 0
+            device = os.path.basename(mapper.get(source, source))
+            disks.append(
+                {
+                    "mount": mount,
+                    "source": source,
+                    "fstype": fstype,
+                    "used": _format_bytes(used_bytes),
+                    "size": _format_bytes(size_bytes),
+                    "used_bytes": used_bytes,
+                    "size_bytes": size_bytes,
+                    "percent": percent_num,
+                    "io": io.get(device),
+                }
+            )
+        disks.sort(key=lambda d: d["percent"], reverse=True)
+        return disks
+
+    # 默认排除的网卡，按 fnmatch 匹配网卡名
+    DEFAULT_NET_EXCLUDES = ("lo", "veth*", "docker*", "br-*", "virbr*")
+
+    @staticmethod
+    def _parse_netdev(text: str) -> dict[str, tuple[int, ...]]:
+        """解析 /proc/net/dev，返回 网卡名 -> (接收字节, 接收错误, 接收丢包, 发送字节, 发送错误, 发送丢包)"""
+        stats = {}
+        for line in text.splitlines():
+            name, sep, rest = line.partition(":")
+            parts = rest.split()
+            if not sep or len(parts) < 12:
+                continue
+            try:
+                stats[name.strip()] = tuple(int(parts[i]) for i in (0, 2, 3, 8, 10, 11))
+            except ValueError:
+                continue
+        return stats
+
+    @staticmethod
+    def _parse_snmp(text: str) -> dict[str, dict[str, int]]:
+        """解析 /proc/net/snmp 中成对出现的 表头行 / 数值行，返回 协议 -> 字段 -> 值"""
+        tables, headers = {}, {}
+        for line in text.splitlines():
+            proto, sep, rest = line.partition(":")
+            if not sep:
+                continue
+            fields = rest.split()
+            if proto not in headers:
+                headers[proto] = fields
+                continue
+            try:
+                tables[proto] = dict(zip(headers.pop(proto), (int(v) for v in fields)))
+            except ValueError:
+                continue
+        return tables
+
+    def _parse_network(self, out: dict[str, str], elapsed: float | None) -> dict:
+        """
+        解析状态批量探测中前后两次 /proc/net/dev 与 /proc/net/snmp，
+        计算各网卡的收发速率、链路占用，以及 TCP 连接数与重传比例。网卡按总流量从高到低排序。
+        """
+        links = {}
+        for line in out["netinfo"].splitlines():
+            parts = line.split()
+            if parts:
+                links[parts[0]] = parts[1:]
+        patterns = self.config.get("net_exclude_patterns") or self.DEFAULT_NET_EXCLUDES
+        before, after = self._parse_netdev(out["netdev1"]), self._parse_netdev(out["netdev2"])
+        interfaces = []
+        for name, a in after.items():
+            state, speed = (links.get(name, []) + ["", ""])[:2]
+            if state == "down" or any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                continue
+            b = before.get(name)
+            rx_bps = tx_bps = None
+            if elapsed and b is not None:
+                rx_bps = max(a[0] - b[0], 0) / elapsed
+                tx_bps = max(a[3] - b[3], 0) / elapsed
+            try:
+                speed_mbps = int(speed) if int(speed) > 0 else None
+            except ValueError:
+                speed_mbps = None
+            percent = None
+            if speed_mbps and rx_bps is not None:
+                percent = round(min(max(rx_bps, tx_bps) * 8 / (speed_mbps * 1e6) * 100, 100), 1)
+            interfaces.append(
+                {
+                    "name": name,
+                    "state": state or None,
+                    "speed_mbps": speed_mbps,
+                    "rx_bps": rx_bps,
+                    "tx_bps": tx_bps,
+                    "rx_bytes": a[0],
+                    "tx_bytes": a[3],
+                    "errors": a[1] + a[4],
+                    "drops": a[2] + a[5],
+                    "percent": percent,
+                }
+            )
+        interfaces.sort(key=lambda i: (i["rx_bps"] or 0) + (i["tx_bps"] or 0), reverse=True)
+
+        tcp = {}
+        snmp1, snmp2 = self._parse_snmp(out["snmp1"]).get("Tcp", {}), self._parse_snmp(out["snmp2"]).get("Tcp", {})
+        if "CurrEstab" in snmp2:
+            tcp["established"] = snmp2["CurrEstab"]
+        if snmp1 and snmp2:
+            sent = snmp2.get("OutSegs", 0) - snmp1.get("OutSegs", 0)
+            retrans = snmp2.get("RetransSegs", 0) - snmp1.get("RetransSegs", 0)
+            tcp["retrans_percent"] = round(retrans / sent * 100, 2) if sent > 0 else 0.0
+        for line in out["sockstat"].splitlines():
+            if line.startswith("TCP:"):
+                fields = line.split()[1:]
+                values = dict(zip(fields[::2], fields[1::2]))
+                for key, field in (("time_wait", "tw"), ("orphan", "orphan")):
+                    if values.get(field, "").isdigit():
+                        tcp[key] = int(values[field])
+        return {"interfaces": interfaces, "tcp": tcp}
+
+    # 逐进程读取 /proc/[pid]/stat：采样前只取 CPU 时间（utime + stime），采样后再附带 RSS 页数与进程名。
+    # 去掉 "pid (comm) " 前缀后字段整体前移两位，进程名可能包含空格与括号，故单独截取并放在行尾
+    _PROC_SCAN_BEFORE = r"""cat /proc/[0-9]*/stat 2>/dev/null | awk '{pid=$1; sub(/^.*\) /, ""); print pid, $12+$13}'"""
+    _PROC_SCAN_AFTER = (
+        r"""cat /proc/[0-9]*/stat 2>/dev/null | awk '{pid=$1; c=$0; sub(/^[^(]*\(/, "", c); """
+        r"""sub(/\) [^)]*$/, "", c); sub(/^.*\) /, ""); print pid, $12+$13, $22, c}'"""
+    )
+
+    @staticmethod
+    def _parse_processes(out: dict[str, str], elapsed: float | None, limit: int) -> dict:
+        """
+        根据采样间隔前后两次 /proc/[pid]/stat 扫描计算各进程的 CPU 占用（单核为 100%），
+        返回按 CPU 与按常驻内存排序的前 limit 个进程及进程总数。
+        """
+        try:
+            clk_tck, page_size = (int(v) for v in out["sysconf"].split()[:2])
+        except ValueError:
+            clk_tck, page_size = 100, 4096
+        before = {}
+        for line in out["procs1"].splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0].isdigit() and parts[1].isdigit():
+                before[parts[0]] = int(parts[1])
+        processes = []
+        for line in out["procs2"].splitlines():
+            parts = line.split(None, 3)
+            if len(parts) < 4 or not (parts[1].isdigit() and parts[2].lstrip("-").isdigit()):
+                continue
+            pid, ticks, rss_pages, name = parts
+            cpu = None
+            if elapsed and pid in before:
+                cpu = round(max(int(ticks) - before[pid], 0) / clk_tck / elapsed * 100, 1)
+            processes.append(
+                {"pid": int(pid), "name": name, "cpu": cpu, "rss_bytes": max(int(rss_pages), 0) * page_size}
+            )
+        return {
+            "count": len(processes),
+            "cpu": heapq.nlargest(limit, (p for p in processes if p["cpu"]), key=lambda p: p["cpu"]),
+            "memory": heapq.nlargest(limit, (p for p in processes if p["rss_bytes"]), key=lambda p: p["rss_bytes"]),
+        }
+
     def _collect_remote_status(self) -> dict:
         """
         收集远程主机的基础状态信息，供图片渲染使用。
-        尽量在单个 SSH 连接中完成，以减少握手开销。
+        基础信息、磁盘与网络在一次远程执行中完成，吞吐类指标在采样间隔前后各读一次 /proc 计数器；
+        GPU 与 Docker 探测各自缓存，并在同一连接的其他通道上与之并发执行。
+        fetch 命令同样并发执行，但不在关键路径上：采集结束时尚未完成就不等待，
+        由其在后台写入缓存（完成后再关闭连接），之后的状态图片再显示。
         """
         client = self.connect_client()
         status = {}
+        interval = max(float(self.config.get("io_sample_interval", 0.5)), 0.1)
+        top_processes = self.config.get("status_top_processes", 5)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+        fetch_future = self._fetch_pool.submit(self._probe_fetch, client) if self.fetch_command else None
         try:
+            gpu_future = pool.submit(self._probe_gpus, client)
+            docker_future = pool.submit(self._probe_docker, client) if self.config.get("status_docker", True) else None
+            sections = {
+                "hostname": "hostname",
+                "os": '. /etc/os-release 2>/dev/null && echo "$NAME $VERSION" || uname -sr',
+                "kernel": "uname -sr",
+                "uptime": "uptime -p",
+                "loadavg": "cat /proc/loadavg",
+                "cpu_model": "grep 'model name' /proc/cpuinfo | head -n 1 | cut -d: -f2",
+                "cpu_freq": "awk '/cpu MHz/ {print $4; exit}' /proc/cpuinfo",
+                "cpu_freq_max": "lscpu | awk -F: '/CPU max MHz/ {gsub(/^[ \\t]+/, \"\", $2); print $2; exit}'",
+                "cpu": "LANG=C top -bn1 | grep \"Cpu(s)\"",
+                "free": "LANG=C free -m",
+                "swaps": "tail -n +2 /proc/swaps | awk '{s+=$3; u+=$4} END {print s, u}'",
+                "date": "date '+%Y-%m-%d %H:%M:%S %Z'",
+                "df": "LANG=C df -B1 --output=source,fstype,used,size,pcent,target",
+                "mapper": 'for f in /dev/mapper/*; do [ -L "$f" ] && echo "$f $(readlink -f "$f")"; done',
+                "netinfo": 'for d in /sys/class/net/*; do echo "${d##*/} $(cat $d/operstate) $(cat $d/speed)"; done',
+                "sockstat": "cat /proc/net/sockstat",
+                "t1": "cat /proc/uptime",
+                "diskstats1": "cat /proc/diskstats",
+                "netdev1": "cat /proc/net/dev",
+                "snmp1": "cat /proc/net/snmp",
+            }
+            if top_processes > 0:
+                sections["sysconf"] = "getconf CLK_TCK; getconf PAGESIZE"
+                sections["procs1"] = self._PROC_SCAN_BEFORE
+            sections["sleep"] = f"sleep {interval}"
+            sections.update({
+                "t2": "cat /proc/uptime",
+                "diskstats2": "cat /proc/diskstats",
+                "netdev2": "cat /proc/net/dev",
+                "snmp2": "cat /proc/net/snmp",
+            })
+            if top_processes > 0:
+                sections["procs2"] = self._PROC_SCAN_AFTER
+            out = self._run_batch(client, sections, "status probe")
             status["host"] = self.ssh_host
-            status["hostname"] = self._safe_run(client, "hostname") or self.ssh_host
-            status["os"] = self._safe_run(
-                client,
-                '. /etc/os-release 2>/dev/null && echo "$NAME $VERSION" || uname -sr',
-            )
-            status["kernel"] = self._safe_run(client, "uname -sr")
-            status["uptime"] = self._safe_run(client, "uptime -p").replace("up ", "")
-            status["load_avg"] = self._safe_run(
-                client, "cat /proc/loadavg | awk '{print $1\" \" $2\" \" $3}'"
-            )
+            status["hostname"] = out["hostname"] or self.ssh_host
+            status["os"] = out["os"]
+            status["kernel"] = out["kernel"]
+            status["uptime"] = out["uptime"].replace("up ", "")
+            status["load_avg"] = " ".join(out["loadavg"].split()[:3])
 
-            cpu_model = self._safe_run(
-                client, "grep 'model name' /proc/cpuinfo | head -n 1 | cut -d: -f2"
-            )
-            status["cpu_model"] = cpu_model.strip() if cpu_model else "Unknown CPU"
-            cpu_freq = self._safe_run(
-                client, "awk '/cpu MHz/ {print $4; exit}' /proc/cpuinfo"
-            )
-            cpu_freq_max = self._safe_run(
-                client, "lscpu 2>/dev/null | awk -F: '/CPU max MHz/ {gsub(/^[ \\t]+/, \"\", $2); print $2; exit}'"
-            )
-            status["cpu_freq"] = cpu_freq.strip() if cpu_freq else None
-            status["cpu_freq_max"] = cpu_freq_max.strip() if cpu_freq_max else None
-            cpu_line = self._safe_run(client, "LANG=C top -bn1 | grep \"Cpu(s)\"")
-            cpu_usage_detail = self._parse_cpu_usage(cpu_line)
+            status["cpu_model"] = out["cpu_model"] or "Unknown CPU"
+            status["cpu_freq"] = out["cpu_freq"] or None
+            status["cpu_freq_max"] = out["cpu_freq_max"] or None
+            cpu_usage_detail = self._parse_cpu_usage(out["cpu"])
             status["cpu_usage_detail"] = cpu_usage_detail
             status["cpu_usage"] = (
                 cpu_usage_detail.get("total") if isinstance(cpu_usage_detail, dict) else None
             )
             status["mem_speed"] = self._get_memory_speed(client)
 
-            mem_output = self._safe_run(client, "LANG=C free -m")
+            mem_output = out["free"]
             mem_total = mem_used = swap_total = swap_used = None
             if mem_output:
                 for line in mem_output.splitlines():
@@ -363,95 +3526,203 @@ class ShellExecutor(Star):
             status["mem_free"] = mem_free
             status["swap_total"] = swap_total
             status["swap_used"] = swap_used
-            if swap_total is None and not status.get("swap_used"):
-                swap_info = self._safe_run(client, "cat /proc/swaps 2>/dev/null | tail -n +2 | awk '{s+=$3; u+=$4} END {print s, u}'")
-                if swap_info:
-                    try:
-                        size_kb, used_kb = [int(x) for x in swap_info.split()[:2]]
-                        status["swap_total"] = round(size_kb / 1024)
-                        status["swap_used"] = round(used_kb / 1024)
-                    except (ValueError, IndexError):
-                        pass
+            if swap_total is None and out["swaps"]:
+                try:
+                    size_kb, used_kb = [int(x) for x in out["swaps"].split()[:2]]
+                    status["swap_total"] = round(size_kb / 1024)
+                    status["swap_used"] = round(used_kb / 1024)
+                except (ValueError, IndexError):
+                    pass
             if mem_total and mem_total > 0 and mem_used is not None:
                 status["mem_percent"] = round(mem_used / mem_total * 100, 1)
 
-            def _size_to_mb(val: str) -> float | None:
-                match = re.match(r"([\d.]+)\s*([KMGTP]?)(i?B)?", val, re.IGNORECASE)
-                if not match:
-                    return None
-                num, unit, _ = match.groups()
-                try:
-                    num = float(num)
-                except ValueError:
-                    return None
-                unit = unit.upper()
-                factor = {
-                    "": 1 / 1024,
-                    "K": 1 / 1024,
-                    "M": 1,
-                    "G": 1024,
-                    "T": 1024 * 1024,
-                    "P": 1024 * 1024 * 1024,
-                }.get(unit, None)
-                return num * factor if factor is not None else None
-
-            df_output = self._safe_run(
-                client,
-                "df -h --output=target,used,size,pcent -x tmpfs -x devtmpfs | tail -n +2 | head -n 6",
-            )
-            disks = []
-            for line in df_output.splitlines():
-                parts = line.split()
-                if len(parts) == 4:
-                    mount, used, size, percent = parts
-                    total_mb = _size_to_mb(size)
-                    if total_mb is not None and total_mb < 100:
-                        continue
-                    try:
-                        percent_num = int(re.sub(r"[^0-9]", "", percent) or 0)
-                    except ValueError:
-                        percent_num = 0
-                    disks.append(
-                        {
-                            "mount": mount,
-                            "used": used,
-                            "size": size,
-                            "percent": percent_num,
-                        }
-                    )
-            status["disks"] = disks
+            t1, t2 = self._parse_uptime_seconds(out["t1"]), self._parse_uptime_seconds(out["t2"])
+            elapsed = t2 - t1 if t1 is not None and t2 is not None and t2 > t1 else None
+            status["disks"] = self._parse_disks(out, elapsed)
+            status["network"] = self._parse_network(out, elapsed)
+            if top_processes > 0:
+                status["processes"] = self._parse_processes(out, elapsed, top_processes)
 
-            gpu_output = self._safe_run(
-                client,
-                "nvidia-smi --query-gpu=name,memory.used,memory.total,utilization.gpu,temperature.gpu,clocks.gr,clocks.mem --format=csv,noheader",
-            )
-            gpus = []
-            for line in gpu_output.splitlines():
-                fields = [f.strip() for f in line.split(",")]
-                if len(fields) >= 7:
-                    def num(val: str) -> str:
-                        return re.sub(r"[^0-9.]", "", val)
-
-                    gpus.append(
-                        {
-                            "name": fields[0],
-                            "mem_used": num(fields[1]),
-                            "mem_total": num(fields[2]),
-                            "util": num(fields[3]),
-                            "temp": num(fields[4]),
-                            "clock_core": num(fields[5]),
-                            "clock_mem": num(fields[6]),
-                        }
-                    )
-            status["gpus"] = gpus
+            status["gpus"] = gpu_future.result()
+            if docker_future is not None:
+                status["containers"] = docker_future.result()
+            if fetch_future is not None and fetch_future.done():
+                status["fetch"] = fetch_future.result()
 
-            status["timestamp"] = self._safe_run(
-                client, "date '+%Y-%m-%d %H:%M:%S %Z'"
-            ) or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            status["timestamp"] = out["date"] or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             status["summary_text"] = self._build_summary_text(status)
             return status
         finally:
-            client.close()
+            pool.shutdown(wait=True)
+            if fetch_future is not None and not fetch_future.done():
+                fetch_future.add_done_callback(lambda _: client.close())
+            else:
+                client.close()
+
+    def _status_to_metrics(self, status: dict) -> dict[str, list[tuple[dict, float]]]:
+        """将状态字典转换为按指标族组织的 (标签, 值) 样本"""
+
+        def num(val) -> float | None:
+            try:
+                return float(val)
+            except (TypeError, ValueError):
+                return None
+
+        mib = 1024 * 1024
+        samples: dict[str, list[tuple[dict, float]]] = {
+            "shell_executor_host_up": [({}, 1)],
+            "shell_executor_last_sample_timestamp_seconds": [({}, time.time())],
+            "shell_executor_cpu_usage_percent": [({}, status.get("cpu_usage"))],
+        }
+        load_parts = (status.get("load_avg") or "").split()
+        samples["shell_executor_load_average"] = [
+            ({"period": period}, num(val)) for period, val in zip(("1m", "5m", "15m"), load_parts)
+        ]
+        for family, key in (
+            ("shell_executor_memory_total_bytes", "mem_total"),
+            ("shell_executor_memory_used_bytes", "mem_used"),
+            ("shell_executor_swap_total_bytes", "swap_total"),
+            ("shell_executor_swap_used_bytes", "swap_used"),
+        ):
+            val = num(status.get(key))
+            samples[family] = [({}, val * mib if val is not None else None)]
+        for disk in status.get("disks", []):
+            labels = {"mount": disk.get("mount")}
+            samples.setdefault("shell_executor_disk_used_percent", []).append((labels, num(disk.get("percent"))))
+            samples.setdefault("shell_executor_disk_used_bytes", []).append((labels, disk.get("used_bytes")))
+            samples.setdefault("shell_executor_disk_size_bytes", []).append((labels, disk.get("size_bytes")))
+            stats = disk.get("io")
+            if stats:
+                for op in ("read", "write"):
+                    op_labels = {**labels, "op": op}
+                    samples.setdefault("shell_executor_disk_io_bytes_per_second", []).append(
+                        (op_labels, stats[f"{op}_bps"])
+                    )
+                    samples.setdefault("shell_executor_disk_iops", []).append((op_labels, stats[f"{op}_iops"]))
+                samples.setdefault("shell_executor_disk_busy_percent", []).append((labels, stats["util"]))
+        if status.get("processes"):
+            samples["shell_executor_processes"] = [({}, status["processes"].get("count"))]
+        network = status.get("network") or {}
+        for iface in network.get("interfaces", []):
+            labels = {"interface": iface["name"]}
+            if iface.get("rx_bps") is not None:
+                for direction in ("rx", "tx"):
+                    samples.setdefault("shell_executor_network_bytes_per_second", []).append(
+                        ({**labels, "direction": direction}, iface[f"{direction}_bps"])
+                    )
+            samples.setdefault("shell_executor_network_link_utilization_percent", []).append(
+                (labels, iface.get("percent"))
+            )
+            samples.setdefault("shell_executor_network_errors_total", []).append((labels, iface.get("errors")))
+            samples.setdefault("shell_executor_network_drops_total", []).append((labels, iface.get("drops")))
+        tcp = network.get("tcp", {})
+        samples["shell_executor_tcp_connections"] = [
+            ({"state": state}, tcp.get(state)) for state in ("established", "time_wait", "orphan") if state in tcp
+        ]
+        if "retrans_percent" in tcp:
+            samples["shell_executor_tcp_retransmit_percent"] = [({}, tcp["retrans_percent"])]
+        for container in status.get("containers") or []:
+            labels = {"container": container["name"]}
+            samples.setdefault("shell_executor_container_running", []).append(
+                (labels, 1 if container["state"] == "running" else 0)
+            )
+            samples.setdefault("shell_executor_container_cpu_percent", []).append((labels, container.get("cpu")))
+            samples.setdefault("shell_executor_container_memory_bytes", []).append(
+                (labels, container.get("mem_used_bytes"))
+            )
+        for index, gpu in enumerate(status.get("gpus", [])):
+            labels = {"gpu": gpu.get("index", index), "vendor": gpu.get("vendor", ""), "name": gpu.get("name") or ""}
+            mem_used = num(gpu.get("mem_used"))
+            mem_total = num(gpu.get("mem_total"))
+            samples.setdefault("shell_executor_gpu_utilization_percent", []).append((labels, num(gpu.get("util"))))
+            samples.setdefault("shell_executor_gpu_memory_used_bytes", []).append(
+                (labels, mem_used * mib if mem_used is not None else None)
+            )
+            samples.setdefault("shell_executor_gpu_memory_total_bytes", []).append(
+                (labels, mem_total * mib if mem_total is not None else None)
+            )
+            samples.setdefault("shell_executor_gpu_temperature_celsius", []).append((labels, num(gpu.get("temp"))))
+            samples.setdefault("shell_executor_gpu_power_watts", []).append((labels, num(gpu.get("power_draw"))))
+        return samples
+
+    def _publish_metrics(self, host: str, status: dict | None = None):
+        """用最新采样更新指标导出与历史库；status 为 None 表示本次采集失败"""
+        if not (self.metrics or self.history):
+            return
+        samples = self._status_to_metrics(status) if status is not None else None
+        if self.metrics:
+            self.metrics.update_host(host, samples or {"shell_executor_host_up": [({}, 0)]})
+            self._flush_metrics_file()
+        if self.history and samples:
+            try:
+                self.history.record_samples(host, time.time(), _HistoryStore.series_values(samples))
+            except sqlite3.Error as e:
+                logger.warning(f"[历史记录] 写入采样失败: {e}")
+
+    async def _on_sample(self, host: str, status: dict | None):
+        """处理一次状态采样：更新指标导出与历史库，评估告警规则并推送状态变化"""
+        self._publish_metrics(host, status)
+        if not self.alerts:
+            return
+        fired, resolved = self.alerts.evaluate(status, time.time())
+        if fired or resolved:
+            await self._send_alert(self._build_alert_message(host, fired, resolved))
+
+    def _build_alert_message(self, host: str, fired: list, resolved: list) -> str:
+        """把同一次采样产生的告警与恢复合并为一条消息"""
+        fmt = self._format_alert_value
+        now = time.time()
+        parts = []
+        if fired:
+            parts.append(f"🚨 {host} 告警（{len(fired)}）")
+            for rule, label, value, since in fired:
+                line = f"- {rule.name(label)} = {fmt(value)} {rule.op_text} {fmt(rule.threshold)}"
+                if now - since >= 60:
+                    line += f"（已持续 {self._format_duration(int(now - since) // 60 * 60)}）"
+                parts.append(line)
+        if resolved:
+            if parts:
+                parts.append("")
+            parts.append(f"✅ {host} 已恢复（{len(resolved)}）")
+            for rule, label, value, _ in resolved:
+                current = "已无数据" if value is None else f"当前 {fmt(value)}"
+                parts.append(f"- {rule.name(label)}（{current}）")
+        return "\n".join(parts)
+
+    @staticmethod
+    def _format_alert_value(value: float) -> str:
+        return f"{value:.1f}".removesuffix(".0")
+
+    async def _send_alert(self, text: str):
+        """把告警消息推送到 alert_targets 中的每个会话"""
+        targets = self.config.get("alert_targets") or []
+        if not targets:
+            logger.warning(f"[告警] 未配置 alert_targets，告警未推送:\n{text}")
+            return
+        for target in targets:
+            try:
+                await self.context.send_message(target, MessageChain().message(text))
+            except Exception as e:
+                logger.error(f"[告警] 推送到 {target} 失败: {e}")
+
+    def _audit(self, event: AstrMessageEvent, command: str, exit_code: int | None = None,
+               duration: float | None = None, output_bytes: int | None = None):
+        """向历史库写入一条命令审计记录，未启用历史库时不做任何事"""
+        if not self.history:
+            return
+        try:
+            user = event.get_sender_name() or event.get_sender_id()
+            self.history.record_command(self.ssh_host, user, command, exit_code, duration, output_bytes)
+        except sqlite3.Error as e:
+            logger.warning(f"[历史记录] 写入命令审计失败: {e}")
+
+    def _flush_metrics_file(self):
+        if not (self.metrics and self.metrics_file):
+            return
+        try:
+            self.metrics.write_file(self.metrics_file)
+        except OSError as e:
+            logger.warning(f"[指标导出] 写入 {self.metrics_file} 失败: {e}")
 
     def _build_summary_text(self, status: dict) -> str:
         """构建用于降级返回的纯文本摘要"""
@@ -467,96 +3738,196 @@ class ShellExecutor(Star):
             parts.append(
                 f"内存: {status['mem_used']} / {status['mem_total']} MiB ({status.get('mem_percent','-')}%)"
             )
-        if status.get("load_avg"):
-            parts.append(f"平均负载: {status['load_avg']}")
+        if status.get("load_avg"):
+            parts.append(f"平均负载: {status['load_avg']}")
+        network = status.get("network") or {}
+        for iface in network.get("interfaces", [])[:2]:
+            parts.append(f"网络 {iface['name']}: {_net_rate_line(iface)}")
+        if _tcp_line(network.get("tcp", {})):
+            parts.append(_tcp_line(network["tcp"]))
+        processes = status.get("processes") or {}
+        for title, key, fmt in (
+            ("CPU 最高", "cpu", lambda p: f"{p['cpu']}%"),
+            ("内存最高", "memory", lambda p: _format_bytes(p["rss_bytes"])),
+        ):
+            top = processes.get(key, [])[:3]
+            if top:
+                parts.append(f"{title}: " + ", ".join(f"{p['name']}({p['pid']}) {fmt(p)}" for p in top))
+        containers = status.get("containers") or []
+        if containers:
+            running = sum(1 for c in containers if c["state"] == "running")
+            parts.append(f"容器: {running} / {len(containers)} 运行中")
+        return "\n".join(parts)
+
+    def _build_latency_report(self, host: str) -> str:
+        """根据耗时直方图生成各阶段、各命令的 p50/p95/p99 以及最慢探测的文本报告"""
+
+        def fmt(val: float | None) -> str:
+            if val is None:
+                return "-"
+            return f"{val * 1000:.0f}ms" if val < 1 else f"{val:.2f}s"
+
+        def line(name: str, hist: _Histogram) -> str:
+            return (
+                f"- {name}: {fmt(hist.quantile(0.5))} / {fmt(hist.quantile(0.95))} / "
+                f"{fmt(hist.quantile(0.99))}（最大 {fmt(hist.max)}，n={hist.count}）"
+            )
+
+        phase_order = ["jump", "tcp", "kex", "auth", "channel", "exec", "transfer", "collect", "render"]
+        phases, commands = {}, {}
+        with self.latency._lock:
+            for (h, kind, name), hist in self.latency.histograms.items():
+                if h != host:
+                    continue
+                if kind == "phase":
+                    phases[name] = hist
+                elif kind in ("command", "connect"):
+                    commands[name if kind == "command" else "连接"] = hist
+            slow = sorted(self.latency.slow_probes.get(host, []), reverse=True)
+
+        if not phases and not commands:
+            return f"📊 {host} 暂无耗时数据，执行任意命令或 /shell status 后再查看。"
+
+        parts = [f"📊 {host} 耗时统计（p50 / p95 / p99）", "", "⏱️ 分阶段:"]
+        for name in sorted(phases, key=lambda n: phase_order.index(n) if n in phase_order else len(phase_order)):
+            parts.append(line(name, phases[name]))
+        if commands:
+            parts += ["", "🧾 按命令:"]
+            for name, hist in sorted(commands.items(), key=lambda kv: kv[1].quantile(0.95) or 0, reverse=True):
+                parts.append(line(name, hist))
+        if slow:
+            parts += ["", "🐢 最慢的状态探测:"]
+            for total, name, at in slow:
+                short = name if len(name) <= 60 else name[:57] + "..."
+                parts.append(f"- {fmt(total)} @ {at}  {short}")
+        if self.result_cache:
+            stats = self.result_cache.stats()
+            lookups = stats["hits"] + stats["misses"]
+            rate = f"，命中率 {stats['hits'] / lookups:.0%}" if lookups else ""
+            parts += [
+                "",
+                f"🗃️ 结果缓存: 命中 {stats['hits']} 次，未命中 {stats['misses']} 次{rate}"
+                f"（{stats['entries']} 条，{_format_bytes(stats['bytes'])}）",
+            ]
+        return "\n".join(parts)
+
+    @staticmethod
+    def _format_series_value(name: str, value: float | None) -> str:
+        """按序列名中的单位格式化历史数值"""
+        if value is None:
+            return "-"
+        if "bytes_per_second" in name:
+            return _format_rate(value)
+        if "_bytes" in name:
+            return _format_bytes(value)
+        if "percent" in name:
+            return f"{value:.1f}%"
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+
+    def _build_audit_report(self, host: str, limit: int = 20) -> str:
+        """列出历史库中该主机最近执行的命令"""
+        rows = self.history.recent_commands(host, limit)
+        if not rows:
+            return f"🧾 {host} 暂无命令记录。"
+        parts = [f"🧾 {host} 最近 {len(rows)} 条命令"]
+        for ts, user, command, exit_code, duration, output_bytes in rows:
+            when = datetime.fromtimestamp(ts).strftime("%m-%d %H:%M:%S")
+            code = "-" if exit_code is None else ("✅" if exit_code == 0 else f"❌{exit_code}")
+            took = "-" if duration is None else f"{duration:.2f}s"
+            short = command if len(command) <= 80 else command[:77] + "..."
+            parts.append(f"- {when} {user or '-'} {code} {took} {_format_bytes(output_bytes)}  {short}")
+        return "\n".join(parts)
+
+    def _build_trend_report(self, host: str, pattern: str, seconds: int) -> str:
+        """
+        以文字迷你图展示匹配 pattern 的指标在最近 seconds 秒内的趋势。
+        pattern 含 * 或 ? 时按通配符匹配，否则按子串匹配；按时间范围自动选择降采样层。
+        """
+        available = self.history.metrics(host)
+        if any(ch in pattern for ch in "*?"):
+            names = [name for name in available if fnmatch.fnmatchcase(name, pattern)]
+        else:
+            names = [name for name in available if pattern in name]
+        if not names:
+            families = sorted({name.split("{", 1)[0] for name in available})
+            hint = "、".join(families) if families else "暂无数据，执行 /shell status 或开启定时采样后再查看"
+            return f"⚠️ 没有与 {pattern} 匹配的指标。可用指标: {hint}"
+
+        now = time.time()
+        since = now - seconds
+        step = self.history.pick_step(since, now)
+        width = self.TREND_WIDTH
+        step_name = {0: "原始采样"}.get(step, f"{step // 60} 分钟粒度" if step < 3600 else f"{step // 3600} 小时粒度")
+        parts = [f"📈 {host} 最近 {self._format_duration(seconds)}的趋势（{step_name}）"]
+        for name in names[: self.TREND_MAX_SERIES]:
+            rows = self.history.query(host, name, since, now, step)
+            if not rows:
+                continue
+            columns: list[list[float]] = [[] for _ in range(width)]
+            for ts, avg, _, _ in rows:
+                columns[min(int((ts - since) / seconds * width), width - 1)].append(avg)
+            points = [sum(col) / len(col) if col else None for col in columns]
+            low = min(row[2] for row in rows)
+            high = max(row[3] for row in rows)
+            mean = sum(row[1] for row in rows) / len(rows)
+            spread = (high - low) or 1
+            chars = self.SPARK_CHARS
+            spark = "".join(
+                " " if val is None else chars[min(int((val - low) / spread * len(chars)), len(chars) - 1)]
+                for val in points
+            )
+            fmt = self._format_series_value
+            parts += [
+                "",
+                name,
+                spark.rstrip(),
+                f"最小 {fmt(name, low)} · 平均 {fmt(name, mean)} · 最大 {fmt(name, high)} · 最新 {fmt(name, rows[-1][1])}",
+            ]
+        if len(parts) == 1:
+            parts.append(f"该时间范围内没有 {pattern} 的采样。")
+        elif len(names) > self.TREND_MAX_SERIES:
+            parts += ["", f"另有 {len(names) - self.TREND_MAX_SERIES} 个匹配的指标未显示，可使用更具体的名称。"]
         return "\n".join(parts)
 
-    def _build_status_html(self, status: dict) -> str:
-        """使用简单的 HTML/CSS 将状态渲染为图片"""
-        def esc(val):
-            return html.escape(str(val)) if val is not None else "-"
+    @staticmethod
+    def _format_duration(seconds: int) -> str:
+        for unit, name in ((86400, "天"), (3600, "小时"), (60, "分钟")):
+            if seconds >= unit and seconds % unit == 0:
+                return f"{seconds // unit} {name}"
+        return f"{seconds} 秒"
+
+    @staticmethod
+    def _esc(val) -> str:
+        return html.escape(str(val)) if val is not None else "-"
+
+    def _status_fragment(self, name: str, key: tuple, build) -> str:
+        """按输入缓存状态卡片的片段，输入未变化时直接复用上次生成的 HTML"""
+        cache_key = (name, key)
+        fragment = self._fragment_cache.get(cache_key)
+        if fragment is None:
+            fragment = build()
+            self._fragment_cache[cache_key] = fragment
+            while len(self._fragment_cache) > self.FRAGMENT_CACHE_SIZE:
+                self._fragment_cache.popitem(last=False)
+        else:
+            self._fragment_cache.move_to_end(cache_key)
+        return fragment
 
+    def _build_overview_html(self, status: dict) -> str:
+        """CPU、内存、运行时间三个概览面板"""
+        esc = self._esc
         mem_total = status.get("mem_total")
         mem_used = status.get("mem_used")
         mem_percent = status.get("mem_percent")
         mem_free = status.get("mem_free")
-        mem_speed = status.get("mem_speed")
         mem_line = "-"
         mem_free_line = "-"
         if mem_total and mem_used is not None:
             mem_line = f"{mem_used} / {mem_total} MiB"
             if mem_free is not None:
                 mem_free_line = f"{mem_free} MiB 可用"
-        mem_speed_line = mem_speed or "-"
-        load_avg = esc(status.get("load_avg", "-"))
-        disks_html = ""
-        for disk in status.get("disks", []):
-            percent = disk.get("percent", 0)
-            usage_display = f"{esc(disk.get('used'))} / {esc(disk.get('size'))}"
-            percent_display = f"{percent}%"
-            disks_html += f"""
-            <div class="disk-row">
-                <div class="disk-mount" title="{esc(disk.get("mount"))}">{esc(disk.get("mount"))}</div>
-                <div class="bar"><span style="width:{percent}%"></span></div>
-                <div class="disk-value" title="{usage_display} ({percent_display})">{usage_display} ({percent_display})</div>
-            </div>
-            """
-        if not disks_html:
-            disks_html = "<div class='disk-row muted'>未获取到磁盘信息</div>"
-
-        gpus_html = ""
-        for gpu in status.get("gpus", []):
-            mem_used = gpu.get("mem_used")
-            mem_total = gpu.get("mem_total")
-            mem_percent = "-"
-            try:
-                used_val = float(mem_used)
-                total_val = float(mem_total)
-                if total_val > 0:
-                    mem_percent = round(used_val / total_val * 100)
-            except (TypeError, ValueError):
-                pass
-
-            util_percent = "-"
-            try:
-                util_percent = round(float(gpu.get("util")))
-            except (TypeError, ValueError):
-                pass
-
-            mem_display = f"{esc(mem_used)} / {esc(mem_total)} MiB"
-            mem_percent_display = f"{mem_percent}%" if mem_percent != "-" else "-"
-            mem_value_text = f"{mem_display} ({mem_percent_display})" if mem_percent_display != "-" else mem_display
-            util_display = f"{util_percent}%" if util_percent != "-" else "-"
-            core_clock = gpu.get("clock_core")
-            mem_clock = gpu.get("clock_mem")
-            core_display = f"{esc(core_clock)} MHz" if core_clock else "-"
-            mem_clock_display = f"{esc(mem_clock)} MHz" if mem_clock else "-"
-            temp_display = f"{esc(gpu.get('temp'))}℃" if gpu.get("temp") else "-"
-            gpus_html += f"""
-            <div class="gpu-row">
-                <div class="gpu-head">
-                    <div class="gpu-name">{esc(gpu.get("name"))}</div>
-                    <div class="gpu-meta">温度 {temp_display}</div>
-                </div>
-                <div class="gpu-meta small">核心频率 {core_display} · 显存频率 {mem_clock_display}</div>
-                <div class="gpu-bar">
-                    <div class="gpu-label">显存</div>
-                    <div class="bar"><span style="width:{mem_percent if mem_percent != '-' else 0}%"></span></div>
-                    <div class="gpu-value">{mem_value_text}</div>
-                </div>
-                <div class="gpu-bar">
-                    <div class="gpu-label">负载</div>
-                    <div class="bar"><span style="width:{util_percent if util_percent != '-' else 0}%"></span></div>
-                    <div class="gpu-value">{util_display}</div>
-                </div>
-            </div>
-            """
-        if not gpus_html:
-            gpus_html = "<div class='gpu-row muted'>GPU 信息不可用或无显卡</div>"
 
         cpu_usage = status.get("cpu_usage")
-        cpu_usage_display = f"{cpu_usage}%" if cpu_usage is not None else "-"
-        mem_percent_display = f"{mem_percent}%" if mem_percent is not None else "-"
         cpu_freq = status.get("cpu_freq")
         cpu_freq_max = status.get("cpu_freq_max")
         cpu_freq_line = ""
@@ -576,292 +3947,279 @@ class ShellExecutor(Star):
                     max_part = f" / {cpu_freq_max}"
             cpu_freq_line = f"频率: {freq_val}{max_part} MHz"
 
-        return f"""
-        <html>
-        <head>
-            <meta charset="UTF-8" />
-            <style>
-                * {{ box-sizing: border-box; }}
-                body {{
-                    margin: 0;
-                    padding: 12px 14px;
-                    min-height: 100vh;
-                    font-family: "JetBrains Mono","SFMono-Regular",Menlo,Consolas,"Liberation Mono",monospace;
-                    background: radial-gradient(circle at 18% 18%, #0f172a 0, #0f2747 35%, #0b3c66 70%, #0a2551 100%);
-                    color: #eef3fb;
-                    display: flex;
-                    justify-content: center;
-                    align-items: center;
-                }}
-                .card {{
-                    width: min(1100px, 100%);
-                    margin: 0 auto;
-                    background: rgba(15, 38, 72, 0.85);
-                    border: 1px solid rgba(255, 255, 255, 0.14);
-                    border-radius: 16px;
-                    box-shadow: 0 18px 52px rgba(0, 0, 0, 0.55);
-                    padding: 16px 18px 18px 18px;
-                    backdrop-filter: blur(12px);
-                }}
-                .header {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: flex-start;
-                    border-bottom: 1px solid rgba(255, 255, 255, 0.14);
-                    padding-bottom: 14px;
-                    margin-bottom: 14px;
-                }}
-                .title-block {{
-                    max-width: 70%;
-                }}
-                .title {{
-                    font-size: 24px;
-                    font-weight: 700;
-                    letter-spacing: 0.5px;
-                    color: #f9fbff;
-                }}
-                .subtitle {{
-                    color: #b7c8e6;
-                    margin-top: 6px;
-                    font-size: 14px;
-                }}
-                .meta {{
-                    text-align: right;
-                    font-size: 12px;
-                    color: #c1d4ef;
-                }}
-                .section {{
-                    margin-top: 12px;
-                    display: grid;
-                    gap: 12px;
-                }}
-                .triple-grid {{
-                    display: grid;
-                    grid-template-columns: repeat(auto-fit, minmax(240px, 1fr));
-                    gap: 12px;
-                }}
-                .panel {{
-                    background: rgba(255, 255, 255, 0.06);
-                    border: 1px solid rgba(255, 255, 255, 0.12);
-                    border-radius: 12px;
-                    padding: 12px 14px;
-                }}
-                .panel h3 {{
-                    margin: 0 0 8px 0;
-                    font-size: 14px;
-                    color: #d9e5f9;
-                    letter-spacing: 0.2px;
-                }}
-                .value-row {{
-                    display: flex;
-                    align-items: baseline;
-                    gap: 8px;
-                    flex-wrap: wrap;
-                }}
-                .value {{
-                    font-size: 20px;
-                    font-weight: 700;
-                    color: #f8fafc;
-                }}
-                .pill {{
-                    padding: 2px 8px;
-                    background: rgba(255, 255, 255, 0.14);
-                    border: 1px solid rgba(255, 255, 255, 0.16);
-                    border-radius: 999px;
-                    color: #e7edfa;
-                    font-size: 12px;
-                    line-height: 1.4;
-                }}
-                .bar-row {{
-                    display: flex;
-                    align-items: center;
-                    gap: 12px;
-                    margin-top: 8px;
-                }}
-                .bar-value {{
-                    text-align: right;
-                    color: #e5e7eb;
-                    font-variant-numeric: tabular-nums;
-                    min-width: 160px;
-                }}
-                .muted {{
-                    color: #a9bad4;
-                }}
-                .disk-row {{
-                    display: grid;
-                    grid-template-columns: minmax(90px, 180px) 1fr 190px;
-                    align-items: center;
-                    gap: 12px;
-                    font-size: 13px;
-                    margin-bottom: 8px;
-                }}
-                .gpu-row {{
-                    display: flex;
-                    flex-direction: column;
-                    gap: 8px;
-                    font-size: 13px;
-                    margin-bottom: 8px;
-                }}
-                .bar {{
-                    width: 100%;
-                    height: 10px;
-                    background: rgba(255, 255, 255, 0.16);
-                    border-radius: 4px;
-                    overflow: hidden;
-                }}
-                .bar span {{
-                    display: block;
-                    height: 100%;
-                    background: linear-gradient(90deg, #22d3ee, #60a5fa);
-                }}
-                .disk-mount {{
-                    min-width: 80px;
-                    font-weight: 600;
-                    white-space: nowrap;
-                    overflow: hidden;
-                    text-overflow: ellipsis;
-                }}
-                .disk-usage {{
-                    color: #cbd5e1;
-                }}
-                .disk-value {{
-                    text-align: right;
-                    color: #e5e7eb;
-                    font-variant-numeric: tabular-nums;
-                }}
-                .gpu-name {{
-                    font-weight: 600;
-                    color: #e0f2fe;
-                }}
-                .gpu-meta {{
-                    color: #cbd5e1;
-                }}
-                .gpu-meta.small {{
-                    color: #9ca3af;
-                }}
-                .gpu-head {{
-                    width: 100%;
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: center;
-                    gap: 8px;
-                }}
-                .gpu-bar {{
-                    width: 100%;
-                    display: grid;
-                    grid-template-columns: 64px 1fr 130px;
-                    align-items: center;
-                    gap: 10px;
-                }}
-                .gpu-label {{
-                    width: 64px;
-                    color: #9ca3af;
-                }}
-                .gpu-value {{
-                    width: 130px;
-                    text-align: right;
-                    color: #e5e7eb;
-                    font-variant-numeric: tabular-nums;
-                }}
-                @media (max-width: 780px) {{
-                    .disk-row {{
-                        grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                    }}
-                    .gpu-bar {{
-                        grid-template-columns: 80px 1fr;
-                    }}
-                    .gpu-value {{
-                        width: auto;
-                        justify-self: end;
-                    }}
-                    .bar-row {{
-                        flex-direction: column;
-                        align-items: flex-start;
-                    }}
-                    .bar-value {{
-                        min-width: 0;
-                        width: 100%;
-                        text-align: left;
-                    }}
-                }}
-                .fetch-panel pre {{
-                    margin: 8px 0 0 0;
-                    font-size: 13px;
-                    line-height: 1.1;
-                    white-space: pre;
-                    overflow: auto;
-                    color: #e5e7eb;
-                    background: rgba(255, 255, 255, 0.02);
-                    border: 1px solid rgba(255, 255, 255, 0.05);
-                    border-radius: 10px;
-                    padding: 10px;
-                }}
-                .fetch-header {{
-                    display: flex;
-                    justify-content: space-between;
-                    align-items: baseline;
-                    gap: 8px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="card">
-                <div class="header">
-                    <div class="title-block">
-                        <div class="title">{esc(status.get("hostname"))}</div>
-                        <div class="subtitle">{esc(status.get("os"))}</div>
-                    </div>
-                    <div class="meta">
-                        <div>IP: {esc(status.get("host"))}:{esc(self.ssh_port)}</div>
-                        <div>时间: {esc(status.get("timestamp"))}</div>
-                    </div>
-                </div>
-                <div class="section triple-grid">
-                    <div class="panel">
-                        <h3>CPU</h3>
-                        <div class="value-row">
-                            <div class="value">{cpu_usage_display}</div>
-                            <div class="pill">总占用</div>
-                        </div>
-                        <div class="muted" style="margin-top:4px;">{esc(status.get("cpu_model"))}</div>
-                        <div class="muted" style="margin-top:4px;">{cpu_freq_line or '频率: 未获取'}</div>
-                        <div class="muted" style="margin-top:4px;">平均负载: {load_avg}</div>
-                    </div>
-                    <div class="panel">
-                        <h3>内存</h3>
-                        <div class="value-row">
-                            <div class="value">{mem_percent_display}</div>
-                            <div class="pill">内存占用</div>
-                        </div>
-                        <div class="bar-row">
-                            <div class="bar"><span style="width:{mem_percent if mem_percent is not None else 0}%"></span></div>
-                            <div class="bar-value">{mem_line}</div>
-                        </div>
-                        <div class="muted" style="margin-top:4px;">{mem_free_line}</div>
-                        <div class="muted" style="margin-top:4px;">内存频率: {esc(mem_speed_line)}</div>
-                    </div>
-                    <div class="panel">
-                        <h3>运行时间</h3>
-                        <div class="value">{esc(status.get("uptime", "-"))}</div>
-                        <div class="muted">内核 {esc(status.get("kernel"))}</div>
-                    </div>
-                </div>
-                <div class="section">
-                    <div class="panel">
-                        <h3>GPU</h3>
-                        {gpus_html}
-                    </div>
-                </div>
-                <div class="section">
-                    <div class="panel">
-                        <h3>磁盘</h3>
-                        {disks_html}
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
+        return _STATUS_OVERVIEW.substitute(
+            cpu_usage=f"{cpu_usage}%" if cpu_usage is not None else "-",
+            cpu_model=esc(status.get("cpu_model")),
+            cpu_freq=cpu_freq_line or "频率: 未获取",
+            load_avg=esc(status.get("load_avg", "-")),
+            mem_percent_display=f"{mem_percent}%" if mem_percent is not None else "-",
+            mem_percent=mem_percent if mem_percent is not None else 0,
+            mem_line=mem_line,
+            mem_free_line=mem_free_line,
+            mem_speed=esc(status.get("mem_speed") or "-"),
+            uptime=esc(status.get("uptime", "-")),
+            kernel=esc(status.get("kernel")),
+        )
+
+    def _build_disks_html(self, disks: list[dict]) -> str:
+        esc = self._esc
+        rows = []
+        limit = self.config.get("status_disk_rows", 0)
+        for disk in disks[:limit] if limit > 0 else disks:
+            percent = disk.get("percent", 0)
+            io_line = _disk_io_line(disk)
+            rows.append(
+                _DISK_ROW.substitute(
+                    mount=esc(disk.get("mount")),
+                    percent=percent,
+                    value=f"{esc(disk.get('used'))} / {esc(disk.get('size'))} ({percent}%)",
+                    io=f'\n                    <div class="disk-io">{esc(io_line)}</div>' if io_line else "",
+                )
+            )
+        if limit > 0 and len(disks) > limit:
+            rows.append(f"                <div class='disk-row muted'>另有 {len(disks) - limit} 个挂载点未显示</div>")
+        body = "\n".join(rows) or "                <div class='disk-row muted'>未获取到磁盘信息</div>"
+        return _STATUS_SECTION.substitute(title="磁盘", body=body)
+
+    def _build_network_html(self, network: dict) -> str:
+        esc = self._esc
+        interfaces = network.get("interfaces", [])
+        limit = self.config.get("status_net_rows", 4)
+        rows = [
+            _NET_ROW.substitute(
+                name=esc(iface["name"]),
+                percent=iface.get("percent") or 0,
+                rate=esc(_net_rate_line(iface)),
+                meta=esc(_net_meta_line(iface)),
+            )
+            for iface in (interfaces[:limit] if limit > 0 else interfaces)
+        ]
+        if limit > 0 and len(interfaces) > limit:
+            rows.append(f"                <div class='net-row muted'>另有 {len(interfaces) - limit} 个网卡未显示</div>")
+        tcp = _tcp_line(network.get("tcp", {}))
+        if tcp:
+            rows.append(f"                <div class='muted'>{esc(tcp)}</div>")
+        body = "\n".join(rows) or "                <div class='net-row muted'>未获取到网络信息</div>"
+        return _STATUS_SECTION.substitute(title="网络", body=body)
+
+    def _build_processes_html(self, processes: dict) -> str:
+        esc = self._esc
+        tables = []
+        for title, key in (("按 CPU", "cpu"), ("按内存", "memory")):
+            rows = [
+                _PROC_ROW.substitute(
+                    name=esc(proc["name"]),
+                    pid=proc["pid"],
+                    cpu=f"{proc['cpu']}%" if proc.get("cpu") is not None else "-",
+                    mem=_format_bytes(proc["rss_bytes"]),
+                )
+                for proc in processes.get(key, [])
+            ]
+            head = f'<th>{title}</th><th class="num">PID</th><th class="num">CPU</th><th class="num">内存</th>'
+            tables.append(_STATUS_TABLE.substitute(head=head, rows="\n".join(rows)))
+        body = (
+            '                <div class="proc-grid">\n' + "\n".join(tables) + "\n                </div>\n"
+            f"                <div class='muted' style='margin-top:6px;'>共 {processes.get('count', 0)} 个进程</div>"
+        )
+        return _STATUS_SECTION.substitute(title="进程", body=body)
+
+    def _build_containers_html(self, containers: list[dict]) -> str:
+        esc = self._esc
+        limit = self.config.get("status_docker_rows", 8)
+        rows = []
+        for container in containers[:limit] if limit > 0 else containers:
+            running = container["state"] == "running"
+            mem = "-"
+            if container.get("mem_used_bytes") is not None:
+                mem = _format_bytes(container["mem_used_bytes"])
+                if container.get("mem_percent") is not None:
+                    mem += f" ({container['mem_percent']}%)"
+            rows.append(
+                _CONTAINER_ROW.substitute(
+                    name=esc(container["name"]),
+                    image=esc(container.get("image")),
+                    state_class="" if running else "bad",
+                    state=esc(container["status"] or container["state"]),
+                    cpu=f"{container['cpu']}%" if container.get("cpu") is not None else "-",
+                    mem=mem,
+                    pids=esc(container.get("pids") or "-"),
+                )
+            )
+        running = sum(1 for c in containers if c["state"] == "running")
+        footer = f"共 {len(containers)} 个容器，运行中 {running} 个"
+        if limit > 0 and len(containers) > limit:
+            footer += f"，另有 {len(containers) - limit} 个未显示"
+        body = (
+            _STATUS_TABLE.substitute(
+                head='<th>容器</th><th>状态</th><th class="num">CPU</th><th class="num">内存</th><th class="num">PIDs</th>',
+                rows="\n".join(rows),
+            )
+            + f"\n                <div class='muted' style='margin-top:6px;'>{footer}</div>"
+        )
+        return _STATUS_SECTION.substitute(title="Docker", body=body)
+
+    def _build_fetch_html(self, text: str) -> str:
+        """fetch 命令的输出面板，保留其 ANSI 颜色"""
+        command = self.fetch_command.split()
+        return _STATUS_FETCH.substitute(
+            title=self._esc(command[0] if command else "fetch"),
+            meta=self._esc(self.fetch_command),
+            body=self._ansi_to_html(text),
+        )
+
+    def _build_gpus_html(self, gpus: list[dict]) -> str:
+        esc = self._esc
+        rows = []
+        for gpu in gpus:
+            mem_used = gpu.get("mem_used")
+            mem_total = gpu.get("mem_total")
+            mem_percent = None
+            try:
+                total_val = float(mem_total)
+                if total_val > 0:
+                    mem_percent = round(float(mem_used) / total_val * 100)
+            except (TypeError, ValueError):
+                pass
+
+            util_percent = None
+            try:
+                util_percent = round(float(gpu.get("util")))
+            except (TypeError, ValueError):
+                pass
+
+            mem_display = f"{esc(mem_used)} / {esc(mem_total)} MiB"
+            core_clock = gpu.get("clock_core")
+            mem_clock = gpu.get("clock_mem")
+            meta = [
+                f"核心频率 {esc(core_clock)} MHz" if core_clock else "核心频率 -",
+                f"显存频率 {esc(mem_clock)} MHz" if mem_clock else "显存频率 -",
+            ]
+            if gpu.get("power_draw"):
+                limit = f" / {esc(gpu['power_limit'])}" if gpu.get("power_limit") else ""
+                meta.append(f"功耗 {esc(gpu['power_draw'])}{limit} W")
+            processes = _gpu_processes_line(gpu)
+            rows.append(
+                _GPU_ROW.substitute(
+                    name=esc(gpu.get("name")),
+                    temp=f"{esc(gpu.get('temp'))}℃" if gpu.get("temp") else "-",
+                    meta=" · ".join(meta),
+                    processes=(
+                        f'\n                    <div class="gpu-meta small">进程: {esc(processes)}</div>'
+                        if processes else ""
+                    ),
+                    mem_percent=mem_percent if mem_percent is not None else 0,
+                    mem_value=f"{mem_display} ({mem_percent}%)" if mem_percent is not None else mem_display,
+                    util_percent=util_percent if util_percent is not None else 0,
+                    util_value=f"{util_percent}%" if util_percent is not None else "-",
+                )
+            )
+        body = "\n".join(rows) or "                <div class='gpu-row muted'>GPU 信息不可用或无显卡</div>"
+        return _STATUS_SECTION.substitute(title="GPU", body=body)
+
+    def _build_status_html(self, status: dict, lite: bool = False) -> str:
+        """
+        使用预编译模板将状态渲染为 HTML，lite 为 True 时使用去除高开销效果的轻量样式。
+        静态样式在模块加载时构建，标题与 fetch 输出等不常变化的片段按输入缓存复用；
+        磁盘与 GPU 面板带有每次采样都会变化的吞吐、负载与温度，直接生成而不进入片段缓存。
+        """
+        esc = self._esc
+        gpus = status.get("gpus", [])
+        disks = status.get("disks", [])
+        network = status.get("network") or {}
+        title = self._status_fragment(
+            "title",
+            (status.get("hostname"), status.get("os")),
+            lambda: _STATUS_TITLE.substitute(hostname=esc(status.get("hostname")), os=esc(status.get("os"))),
+        )
+        sections = [
+            self._build_overview_html(status),
+            self._build_gpus_html(gpus),
+            self._build_disks_html(disks),
+        ]
+        if network.get("interfaces") or network.get("tcp"):
+            sections.append(self._build_network_html(network))
+        if status.get("processes"):
+            sections.append(self._build_processes_html(status["processes"]))
+        if status.get("containers"):
+            sections.append(self._build_containers_html(status["containers"]))
+        if status.get("fetch"):
+            fetch = status["fetch"]
+            sections.append(self._status_fragment("fetch", (fetch,), lambda: self._build_fetch_html(fetch)))
+        return _STATUS_PAGE.substitute(
+            css=_STATUS_CSS_LITE if lite else _STATUS_CSS,
+            title=title,
+            host=esc(status.get("host")),
+            port=esc(self.ssh_port),
+            timestamp=esc(status.get("timestamp")),
+            sections="\n".join(sections),
+        )
+
+    def _status_content_units(self, status: dict) -> int:
+        """估算状态卡片的内容量，用于自动选择渲染档位与预测图片大小"""
+        network = status.get("network") or {}
+        processes = status.get("processes") or {}
+        return (
+            5
+            + len(status.get("disks", []))
+            + 3 * len(status.get("gpus", []))
+            + len(network.get("interfaces", []))
+            + max(len(processes.get("cpu", [])), len(processes.get("memory", []))) // 2
+            + len(status.get("containers") or []) // 2
+        )
+
+    def _choose_render_profile(self, event: AstrMessageEvent, status: dict, requested: str = "") -> str:
         """
+        依次采用指令参数、会话设置与全局配置；结果为 auto 时从高清晰度到低依次检查各档位：
+        有渲染记录的档位要求平均耗时与预测图片大小均在预算内，没有记录的档位按内容量阈值判断；
+        超出预算的档位在上次记录 RENDER_RETRY_SECONDS 后会被重新尝试。
+        """
+        profile = (requested or "").lower()
+        if profile == "lite":
+            profile = "fast"
+        if profile not in self.RENDER_PROFILES:
+            profile = self._chat_render_profiles.get(event.unified_msg_origin) or self.config.get(
+                "status_render_profile", "auto"
+            )
+        if profile in self.RENDER_PROFILES:
+            return profile
+
+        units = self._status_content_units(status)
+        budget_ms = self.config.get("status_render_budget_ms", 3000)
+        budget_kb = self.config.get("status_image_max_kb", 1024)
+        thresholds = dict(self.AUTO_PROFILE_THRESHOLDS)
+        now = time.monotonic()
+        for name in self.RENDER_PROFILES:
+            stats = self._render_stats.get(name)
+            if stats is not None:
+                if stats["ms"] <= budget_ms and stats["kb_per_unit"] * units <= budget_kb:
+                    return name
+                if now - stats["at"] >= self.RENDER_RETRY_SECONDS:
+                    return name
+            elif units <= thresholds.get(name, float("inf")):
+                return name
+        return "fast"
+
+    def _record_render(self, profile: str, elapsed: float, size_bytes: int, units: int):
+        """
+        以指数滑动平均记录各档位的渲染耗时与单位内容的图片大小。
+        距上次记录已超过 RENDER_RETRY_SECONDS 的旧记录不再参与平均，直接以本次测量替换。
+        """
+        alpha = 0.3
+        ms = elapsed * 1000
+        kb_per_unit = size_bytes / 1024 / max(units, 1)
+        now = time.monotonic()
+        stats = self._render_stats.get(profile)
+        if stats is None or now - stats["at"] >= self.RENDER_RETRY_SECONDS:
+            n = stats["n"] + 1 if stats else 1
+            self._render_stats[profile] = {
+                "n": n, "ms": ms, "kb_per_unit": kb_per_unit, "last_kb": size_bytes / 1024, "at": now,
+            }
+            return
+        stats["n"] += 1
+        stats["ms"] += alpha * (ms - stats["ms"])
+        stats["kb_per_unit"] += alpha * (kb_per_unit - stats["kb_per_unit"])
+        stats["last_kb"] = size_bytes / 1024
+        stats["at"] = now
 
     @command_group("shell")
     def shell(self):
@@ -878,28 +4236,46 @@ class ShellExecutor(Star):
             "",
             "📜 **主要指令列表**:",
             "- `/shell check`：验证与远程服务器的连接是否有效。",
-            "- `/shell status`：生成远程服务器运行状态图片。",
+            "- `/shell status [fast|balanced|ultra]`：生成远程服务器运行状态图片，可指定渲染档位。",
+            "- `/shell render [fast|balanced|ultra|auto]`：设置当前会话的默认渲染档位，不带参数查看渲染记录。",
+            "- `/shell stats`：查看 SSH 各阶段与各命令的耗时分位数。",
+            "- `/shell alerts [subscribe|unsubscribe]`：查看告警规则与当前告警，或将当前会话加入/移出告警推送。",
+            "- `/shell history [指标] [时间范围]`：不带参数时列出最近执行的命令，指定指标时显示趋势，"
+            "例如 `/shell history disk_used 7d`（需配置 history_db_path）。",
+            "- `/shell get [路径]`：通过 SFTP 下载远程文件，以文件形式发送。",
+            "- `/shell put [路径]`：将同一条消息附带的文件上传到远程路径，中断后重试会续传。",
             "- `/shell reboot`：重启远程系统。",
             "- `/shell rewin`：重启到 Windows 系统。（双系统自用）",
             "- `/shell cpupower`：查看 CPU 功率信息。",
-            "- `/shell nvidia-smi`：查看 NVIDIA 图形卡状态。",
+            "- `/shell nvidia-smi`：查看显卡状态（NVIDIA / AMD / Intel）及各进程显存占用。",
+            "- `/shell cmd [名称] [参数...]`：执行已登记的命令（内置命令与配置中的 custom_commands），不带参数时列出全部命令。",
             "",
             "🔧 **系统服务控制**（`/shell systemctl` 子命令）:",
-            "- `start [服务名]`：启动指定的服务，例如 `/shell systemctl start nginx`。",
+            "- `start [服务名...]`：启动一个或多个服务，支持通配符，例如 `/shell systemctl start nginx 'php*'`。",
             "- `status [服务名]`：查看指定服务的状态，例如 `/shell systemctl status sshd`。",
-            "- `stop [服务名]`：停止指定的服务。",
-            "- `enable [服务名]`：设置服务为开机启动。",
-            "- `disable [服务名]`：设置服务为开机禁用。",
+            "- `overview [模式...]`：汇总全部服务的状态、内存、CPU 时间与重启次数，突出失败与异常的服务。",
+            "- `stop [服务名...]`：停止一个或多个服务。",
+            "- `restart [服务名...]`：重启一个或多个服务。",
+            "- `enable [服务名...]`：设置服务为开机启动。",
+            "- `disable [服务名...]`：设置服务为开机禁用。",
             "- `logs [服务名]`：查看最近 100 条服务日志。",
             "",
+            "🔎 **日志搜索**（`/shell logs` 子命令）:",
+            "- `grep [服务或容器] [模式] [--since 时间]`：在远程过滤日志，只返回匹配的行，"
+            "例如 `/shell logs grep nginx 'timeout|refused' --since 2h`。",
+            "",
             "🛠️ **Docker 容器管理**（`/shell docker` 子命令）:",
-            "- `logs [容器名]`：查看 Docker 容器日志，例如 `/shell docker logs my_container`。",
-            "- `start [容器名]`：启动指定的容器。",
-            "- `stop [容器名]`：停止指定的容器。",
+            "- `logs [容器名]`：查看 Docker 容器最近 100 条日志，例如 `/shell docker logs my_container`。",
+            "- `start [容器名...]`：启动一个或多个容器，支持通配符。",
+            "- `stop [容器名...]`：停止一个或多个容器。",
+            "- `restart [容器名...]`：重启一个或多个容器。",
             "- `run [镜像] [选项...]`：运行一个新的容器。",
             "- `pull [镜像]`：拉取指定 Docker 镜像。",
-            "- `ps`：列出所有运行中的 Docker 容器。",
-            "- `rm [容器名]`：删除指定的容器。",
+            "- `ps [image]`：列出全部容器及其 CPU、内存与网络占用，带 `image` 时以图片展示。",
+            "- `rm [容器名...]`：删除一个或多个容器。",
+            "",
+            "ℹ️ 执行单条远程命令的指令（如 `ip`、`inxi`、`systemctl status`、`docker logs`）失败时会回复退出码与错误输出，"
+            "在指令末尾加 `--json` 可获得包含退出码、耗时、stdout/stderr 及其字节数的 JSON 结果。",
         ]
         yield event.plain_result("\n".join(help_msg))
 
@@ -918,31 +4294,518 @@ class ShellExecutor(Star):
 
     @permission_type(PermissionType.ADMIN)
     @shell.command("status")
-    async def render_status(self, event: AstrMessageEvent):
+    async def render_status(self, event: AstrMessageEvent, profile: str = ""):
         """
-        以图片展示远程服务器状态。
+        以图片展示远程服务器状态，可指定渲染档位 fast / balanced / ultra（lite 等同 fast）。
         """
+        start = time.perf_counter()
         try:
-            status = self._collect_remote_status()
+            status = await asyncio.to_thread(self._collect_remote_status)
         except Exception as e:
             logger.error(f"收集远程状态失败: {e}")
+            await self._on_sample(self.ssh_host, None)
             yield event.plain_result("❌ 获取远程状态失败，请检查 SSH 配置或日志。")
             return
+        collected = time.perf_counter()
+        await self._on_sample(self.ssh_host, status)
 
-        html_doc = self._build_status_html(status)
-        try:
-            options = {
-                "type": "jpeg",
-                "quality": 90,
-                "full_page": True,
-                "device_scale_factor_level": "ultra",
-            }
-            image_url = await self.html_render(html_doc, {}, return_url=True, options=options)
-            yield event.image_result(image_url)
-        except Exception as e:
-            logger.error(f"渲染状态图片失败: {e}")
+        profile = self._choose_render_profile(event, status, profile)
+        renderer = self.config.get("status_renderer", "browser")
+        image_path = None
+        if renderer == "pillow":
+            image_path = await self._render_status_local(status, profile)
+        if image_path is None:
+            try:
+                image_path = await self._render_status_browser(status, profile)
+            except Exception as e:
+                logger.error(f"渲染状态图片失败: {e}")
+                if renderer != "pillow":
+                    image_path = await self._render_status_local(status, profile)
+        if image_path is None:
             fallback = status.get("summary_text", "渲染失败，请检查后台日志。")
             yield event.plain_result(fallback)
+            return
+
+        self.latency.record(
+            self.ssh_host,
+            "command",
+            "status",
+            {"collect": collected - start, "render": time.perf_counter() - collected},
+        )
+        yield event.image_result(image_path)
+
+    async def _render_status_browser(self, status: dict, profile: str) -> str:
+        """通过 html_render（无头浏览器）渲染状态图片，返回本地图片路径并记录该档位的耗时与大小"""
+        lite, options = self.RENDER_PROFILES[profile]
+        options = dict(options)
+        if self.config.get("status_image_format", "jpeg") == "png":
+            options["type"] = "png"
+            options.pop("quality", None)
+        html_doc = self._build_status_html(status, lite=lite)
+        start = time.perf_counter()
+        image_path = await self.html_render(html_doc, {}, return_url=False, options=options)
+        elapsed = time.perf_counter() - start
+        try:
+            size_bytes = os.path.getsize(image_path)
+        except OSError:
+            size_bytes = 0
+        if size_bytes:
+            self._record_render(profile, elapsed, size_bytes, self._status_content_units(status))
+        return image_path
+
+    async def _render_status_local(self, status: dict, profile: str) -> str | None:
+        """用 Pillow 在本地绘制状态图片并返回路径，Pillow 不可用或绘制失败时返回 None"""
+        if not self._rasterizer:
+            return None
+        fmt = self.config.get("status_image_format", "jpeg")
+        quality = self.RENDER_PROFILES[profile][1].get("quality", 90)
+        scale = self.RASTER_SCALES.get(profile, 1.0)
+
+        def draw() -> str:
+            image = self._rasterizer.render(
+                status,
+                self.ssh_port,
+                scale,
+                self.config.get("status_disk_rows", 0),
+                self.config.get("status_net_rows", 4),
+                self.config.get("status_docker_rows", 8),
+            )
+            path = self._status_image_path("jpg" if fmt == "jpeg" else fmt)
+            if fmt == "png":
+                image.save(path, "PNG", compress_level=1)
+            elif fmt == "webp":
+                image.save(path, "WEBP", quality=quality, method=2)
+            else:
+                image.save(path, "JPEG", quality=quality)
+            return path
+
+        try:
+            return await asyncio.to_thread(draw)
+        except Exception as e:
+            logger.error(f"本地绘制状态图片失败: {e}")
+            return None
+
+    @staticmethod
+    def _parse_duration(value: str) -> int | None:
+        """解析 30m、2h、1d 这样的时长，返回秒数，无法识别时返回 None"""
+        match = re.fullmatch(r"(\d+)([smhd])", value.strip())
+        if not match:
+            return None
+        return int(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+
+    @staticmethod
+    def _parse_since(value: str) -> tuple[str, str] | None:
+        """
+        将 --since 参数转换为 (journalctl 格式, docker 格式)：
+        支持 30m、2h、1d 这样的相对时间与 2026-01-02 03:04[:05] 这样的绝对时间，无法识别时返回 None。
+        """
+        value = value.strip()
+        seconds = ShellExecutor._parse_duration(value)
+        if seconds is not None:
+            return f"-{seconds}s", f"{seconds}s"
+        if re.fullmatch(r"\d{4}-\d{2}-\d{2}([ T]\d{2}:\d{2}(:\d{2})?)?", value):
+            return value.replace("T", " "), value.replace(" ", "T")
+        return None
+
+    @staticmethod
+    def _build_log_grep_script(target: str, pattern: str, since: tuple[str, str] | None, limit: int) -> str:
+        """
+        生成日志搜索脚本：target 是容器时用 docker logs | grep，否则按 systemd 单元用 journalctl -g，
+        journalctl 不支持 -g 时退回 grep。过滤均在远程完成，只返回最后 limit 条匹配。
+        与 journalctl -g 一致，模式全为小写时忽略大小写。
+        """
+        t, p = shlex.quote(target), shlex.quote(pattern)
+        icase = "-i " if pattern == pattern.lower() else ""
+        journal_since = f" --since {shlex.quote(since[0])}" if since else ""
+        docker_since = f" --since {shlex.quote(since[1])}" if since else ""
+        journal = f"journalctl -u {t}{journal_since} --no-pager -q"
+        fields = "MESSAGE,_PID,PRIORITY"
+        return (
+            f"if command -v docker >/dev/null && docker inspect --type container {t} >/dev/null 2>&1; then\n"
+            f"  echo docker\n"
+            f"  docker logs --timestamps{docker_since} {t} 2>&1 | grep -E {icase}-e {p} | tail -n {limit} | cut -c1-1000\n"
+            f"elif journalctl --help 2>&1 | grep -q -- --grep; then\n"
+            f"  echo journal-json\n"
+            f"  {journal} -g {p} -n {limit} -o json --output-fields={fields}\n"
+            f"else\n"
+            f"  echo journal\n"
+            f"  {journal} -o short-iso | grep -E {icase}-e {p} | tail -n {limit} | cut -c1-1000\n"
+            f"fi"
+        )
+
+    @staticmethod
+    def _format_journal_json(lines: list[str]) -> list[str]:
+        """把 journalctl -o json 的记录整理为 时间 [PID] 消息 的文本行"""
+        out = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            message = entry.get("MESSAGE")
+            if isinstance(message, list):
+                # 非 UTF-8 的消息以字节数组形式给出
+                message = bytes(message).decode(errors="replace")
+            try:
+                ts = datetime.fromtimestamp(int(entry["__REALTIME_TIMESTAMP"]) / 1e6).strftime("%m-%d %H:%M:%S")
+            except (KeyError, ValueError):
+                ts = "-"
+            pid = f"[{entry['_PID']}] " if entry.get("_PID") else ""
+            out.append(f"{ts} {pid}{str(message)[:1000]}")
+        return out
+
+    @staticmethod
+    def _transfer_dir() -> str:
+        """文件传输的本地目录：未完成的 .part 文件保留一天以便续传，已完成的文件十分钟后清理"""
+        directory = os.path.join(tempfile.gettempdir(), "astrbot_shell_executor", "transfers")
+        os.makedirs(directory, exist_ok=True)
+        now = time.time()
+        for old in glob.glob(os.path.join(directory, "*")):
+            try:
+                if os.path.getmtime(old) < now - (86400 if old.endswith(".part") else 600):
+                    if os.path.isdir(old):
+                        for name in os.listdir(old):
+                            os.remove(os.path.join(old, name))
+                        os.rmdir(old)
+                    else:
+                        os.remove(old)
+            except OSError:
+                pass
+        return directory
+
+    @contextlib.contextmanager
+    def _transfer_lock(self, key: str):
+        """按 key 串行化文件传输，最后一个使用者退出后删除该锁，锁表不会随传输过的路径增长"""
+        with self._transfer_locks_guard:
+            entry = self._transfer_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._transfer_locks_guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._transfer_locks[key]
+
+    def _sftp_get(self, remote_path: str) -> tuple[str, dict]:
+        """
+        通过 SFTP 下载远程文件到本地临时目录，返回 (本地路径, 传输信息)。
+        读取请求以 transfer_max_requests 为窗口流水线发出，数据按块写入磁盘而不在内存中整体缓冲；
+        同一文件（路径、大小、修改时间不变）上次中断留下的 .part 文件会从断点续传。
+        """
+        chunk_size = max(int(self.config.get("transfer_chunk_kb", 256)), 32) * 1024
+        client = self.connect_client(compress=self.config.get("transfer_compress", False))
+        try:
+            sftp = client.open_sftp()
+            attr = sftp.stat(remote_path)
+            if stat.S_ISDIR(attr.st_mode or 0):
+                raise IsADirectoryError(f"{remote_path} 是目录")
+            size = attr.st_size or 0
+            max_bytes = self.config.get("transfer_max_mb", 100) * 1024 * 1024
+            if max_bytes > 0 and size > max_bytes:
+                raise ValueError(f"文件大小 {_format_bytes(size)} 超过 transfer_max_mb 限制")
+            key = hashlib.sha1(
+                f"{self.ssh_host}:{self.ssh_port}:{remote_path}:{size}:{attr.st_mtime}".encode()
+            ).hexdigest()[:16]
+            directory = self._transfer_dir()
+            part = os.path.join(directory, f"{key}.part")
+            with self._transfer_lock(part):
+                offset = os.path.getsize(part) if os.path.exists(part) else 0
+                if offset > size:
+                    offset = 0
+                start = time.perf_counter()
+                with sftp.open(remote_path, "rb") as remote, open(part, "ab" if offset else "wb") as local:
+                    remote.seek(offset)
+                    remote.prefetch(size, max_concurrent_requests=self.config.get("transfer_max_requests", 64))
+                    while True:
+                        data = remote.read(chunk_size)
+                        if not data:
+                            break
+                        local.write(data)
+                elapsed = time.perf_counter() - start
+                final_dir = os.path.join(directory, key)
+                os.makedirs(final_dir, exist_ok=True)
+                final = os.path.join(final_dir, os.path.basename(remote_path.rstrip("/")) or key)
+                os.replace(part, final)
+            return final, {"size": size, "resumed": offset, "elapsed": elapsed}
+        finally:
+            client.close()
+
+    def _sftp_put(self, local_path: str, remote_path: str, name: str = "") -> tuple[str, dict]:
+        """
+        通过 SFTP 上传本地文件，返回 (远程路径, 传输信息)。remote_path 为目录时使用 name（缺省为本地文件名）。
+        先以流水线写入 <目标>.<源文件摘要>.part，同一源文件上次留下的 .part 从其末尾续传，
+        完成并核对大小后再重命名为目标文件。摘要取自文件内容，重新发送同一文件（本地临时文件不同）也能续传，
+        而其他文件不会接在旧的 .part 后面；目标相同但来源不同的旧 .part 会被删除。
+        """
+        chunk_size = max(int(self.config.get("transfer_chunk_kb", 256)), 32) * 1024
+        size = os.path.getsize(local_path)
+        digest = hashlib.sha1()
+        with open(local_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        key = digest.hexdigest()[:16]
+        client = self.connect_client(compress=self.config.get("transfer_compress", False))
+        try:
+            sftp = client.open_sftp()
+            try:
+                if remote_path.endswith("/") or stat.S_ISDIR(sftp.stat(remote_path).st_mode or 0):
+                    remote_path = remote_path.rstrip("/") + "/" + (name or os.path.basename(local_path))
+            except IOError:
+                pass
+            part = f"{remote_path}.{key}.part"
+            with self._transfer_lock(f"{self.ssh_host}:{remote_path}"):
+                directory, _, base = remote_path.rpartition("/")
+                try:
+                    stale = [
+                        name for name in sftp.listdir(directory or ".")
+                        if name.startswith(base + ".") and name.endswith(".part") and name != part.rpartition("/")[2]
+                        and len(name) == len(base) + 22
+                    ]
+                except IOError:
+                    stale = []
+                for name in stale:
+                    try:
+                        sftp.remove(f"{directory}/{name}" if directory else name)
+                    except IOError:
+                        pass
+                try:
+                    offset = sftp.stat(part).st_size or 0
+                except IOError:
+                    offset = 0
+                if offset > size:
+                    offset = 0
+                start = time.perf_counter()
+                with open(local_path, "rb") as local, sftp.open(part, "r+b" if offset else "wb") as remote:
+                    remote.set_pipelined(True)
+                    local.seek(offset)
+                    remote.seek(offset)
+                    while True:
+                        data = local.read(chunk_size)
+                        if not data:
+                            break
+                        remote.write(data)
+                written = sftp.stat(part).st_size
+                if written != size:
+                    raise IOError(f"上传后大小不一致：{written} / {size}")
+                sftp.posix_rename(part, remote_path)
+            return remote_path, {"size": size, "resumed": offset, "elapsed": time.perf_counter() - start}
+        finally:
+            client.close()
+
+    @staticmethod
+    def _transfer_summary(icon: str, path: str, info: dict) -> str:
+        elapsed = max(info["elapsed"], 1e-6)
+        moved = info["size"] - info["resumed"]
+        text = f"{icon} {path}（{_format_bytes(info['size'])}，用时 {elapsed:.1f}s，{_format_rate(moved / elapsed)}"
+        if info["resumed"]:
+            text += f"，从 {_format_bytes(info['resumed'])} 处续传"
+        return text + "）"
+
+    @staticmethod
+    async def _attachment_path(component) -> tuple[str, str] | None:
+        """返回消息附件的 (本地路径, 文件名)，不是文件或图片时返回 None"""
+        if isinstance(component, File):
+            getter = getattr(component, "get_file", None)
+            path = await getter() if getter else component.file
+            return (path, component.name or os.path.basename(path)) if path else None
+        if isinstance(component, Image):
+            path = await component.convert_to_file_path()
+            return path, os.path.basename(path)
+        return None
+
+    @staticmethod
+    def _status_image_path(ext: str) -> str:
+        """在临时目录中分配图片路径，并顺带清理十分钟前生成的旧图片"""
+        directory = os.path.join(tempfile.gettempdir(), "astrbot_shell_executor")
+        os.makedirs(directory, exist_ok=True)
+        expire = time.time() - 600
+        for old in glob.glob(os.path.join(directory, "status_*")):
+            try:
+                if os.path.getmtime(old) < expire:
+                    os.remove(old)
+            except OSError:
+                pass
+        fd, path = tempfile.mkstemp(prefix="status_", suffix=f".{ext}", dir=directory)
+        os.close(fd)
+        return path
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("render")
+    async def set_render_profile(self, event: AstrMessageEvent, profile: str = ""):
+        """
+        设置当前会话的状态图片渲染档位（fast / balanced / ultra / auto），不带参数时查看各档位的渲染记录。
+        """
+        profile = (profile or "").lower()
+        if profile:
+            if profile == "auto":
+                self._chat_render_profiles.pop(event.unified_msg_origin, None)
+            elif profile in self.RENDER_PROFILES:
+                self._chat_render_profiles[event.unified_msg_origin] = profile
+            else:
+                yield event.plain_result(f"❌ 未知的渲染档位 {profile}，可选: {', '.join(self.RENDER_PROFILES)}, auto")
+                return
+            yield event.plain_result(f"✅ 当前会话的状态图片渲染档位已设为 {profile}")
+            return
+
+        current = self._chat_render_profiles.get(event.unified_msg_origin) or self.config.get(
+            "status_render_profile", "auto"
+        )
+        lines = [f"🖼️ 当前会话渲染档位: {current}"]
+        for name in self.RENDER_PROFILES:
+            stats = self._render_stats.get(name)
+            if stats:
+                lines.append(
+                    f"- {name}: 平均 {stats['ms']:.0f}ms，最近一张 {stats['last_kb']:.0f}KB（n={stats['n']}）"
+                )
+            else:
+                lines.append(f"- {name}: 暂无记录")
+        yield event.plain_result("\n".join(lines))
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("stats")
+    async def show_stats(self, event: AstrMessageEvent):
+        """
+        查看 SSH 各阶段与各命令的耗时统计。
+        """
+        yield event.plain_result(self._build_latency_report(self.ssh_host))
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("cmd")
+    async def run_registered(self, event: AstrMessageEvent, name: str = ""):
+        """
+        执行内置或 custom_commands 中定义的命令，例如 /shell cmd systemctl-logs nginx 50；不带参数时列出全部命令
+        """
+        if not name:
+            yield event.plain_result(self._build_command_list())
+            return
+        if name not in self.commands:
+            yield event.plain_result(f"⚠️ 没有名为 {name} 的命令，发送 /shell cmd 查看全部命令")
+            return
+        async for result in self._run_registered(event, name, self._message_args(event, name)):
+            yield result
+
+    def _build_command_list(self) -> str:
+        parts = ["🧩 可用命令（/shell cmd 名称 参数...）"]
+        for builtin, title in ((True, "内置"), (False, "自定义")):
+            specs = [spec for spec in self.commands.values() if spec.builtin == builtin]
+            if specs:
+                parts += ["", f"{title}:"]
+                for spec in specs:
+                    flags = [f for f, on in (("流式", spec.stream), (spec.concurrency, spec.concurrency != "default")) if on]
+                    suffix = f"（{'，'.join(flags)}）" if flags else ""
+                    parts.append(f"- {spec.usage()}：{spec.description or '-'}{suffix}")
+        if self.command_errors:
+            parts += ["", "⚠️ 以下自定义命令未能加载:"] + [f"- {error}" for error in self.command_errors]
+        return "\n".join(parts)
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("alerts")
+    async def show_alerts(self, event: AstrMessageEvent, action: str = ""):
+        """
+        查看告警规则与当前告警；subscribe / unsubscribe 将当前会话加入或移出告警推送目标
+        """
+        targets = list(self.config.get("alert_targets") or [])
+        origin = event.unified_msg_origin
+        if action in ("subscribe", "unsubscribe"):
+            if action == "subscribe" and origin not in targets:
+                targets.append(origin)
+            elif action == "unsubscribe" and origin in targets:
+                targets.remove(origin)
+            self.config["alert_targets"] = targets
+            self.config.save_config()
+            state = "将" if action == "subscribe" else "不再"
+            yield event.plain_result(f"✅ 当前会话{state}接收告警推送（共 {len(targets)} 个推送目标）")
+            return
+        if action:
+            yield event.plain_result("⚠️ 用法: /shell alerts [subscribe|unsubscribe]")
+            return
+        if not self.alerts:
+            yield event.plain_result("⚠️ 未配置告警规则，请在 alert_rules 中添加，例如 disk.percent > 90 for 5m")
+            return
+        fmt = self._format_alert_value
+        parts = [f"🔔 告警规则（{len(self.alerts.rules)}）"]
+        parts += [f"- {rule.text}" for rule in self.alerts.rules]
+        parts += [f"- ⚠️ {error}" for error in self.alerts.errors]
+        active = self.alerts.active()
+        parts += ["", f"🚨 当前告警（{len(active)}）" if active else "✅ 当前没有告警"]
+        now = time.time()
+        for rule, label, value, since in active:
+            parts.append(f"- {rule.name(label)} = {fmt(value)}（已持续 {self._format_duration(max(int(now - since) // 60, 1) * 60)}）")
+        subscribed = "已订阅" if origin in targets else "未订阅，可发送 /shell alerts subscribe"
+        parts += ["", f"📮 推送目标 {len(targets)} 个，当前会话{subscribed}"]
+        yield event.plain_result("\n".join(parts))
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("history")
+    async def show_history(self, event: AstrMessageEvent, metric: str = "", span: str = "24h"):
+        """
+        查看历史记录：不带参数时列出最近执行的命令，指定指标时显示其趋势，例如 /shell history disk 7d
+        """
+        if not self.history:
+            yield event.plain_result("⚠️ 未启用历史记录，请先配置 history_db_path")
+            return
+        if not metric:
+            yield event.plain_result(self._build_audit_report(self.ssh_host))
+            return
+        seconds = self._parse_duration(span)
+        if seconds is None:
+            yield event.plain_result("⚠️ 时间范围支持 30m、6h、7d 这样的写法")
+            return
+        yield event.plain_result(self._build_trend_report(self.ssh_host, metric, seconds))
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("get")
+    async def sftp_get(self, event: AstrMessageEvent, path: str):
+        """
+        通过 SFTP 下载远程文件，以文件形式发送
+        """
+        try:
+            local_path, info = await asyncio.to_thread(self._sftp_get, path)
+        except Exception as e:
+            logger.error(f"下载 {path} 失败: {e}")
+            self._audit(event, f"get {path}")
+            if self.metrics:
+                self.metrics.count_command(self.ssh_host, "get", "failed")
+            yield event.plain_result(f"❌ 下载 {path} 失败: {e}")
+            return
+        self.latency.record(self.ssh_host, "command", "get", {"transfer": info["elapsed"]})
+        self._audit(event, f"get {path}", duration=info["elapsed"], output_bytes=info["size"])
+        if self.metrics:
+            self.metrics.count_command(self.ssh_host, "get", "ok")
+        yield event.plain_result(self._transfer_summary("📥", path, info))
+        yield event.chain_result([File(name=os.path.basename(local_path), file=local_path)])
+
+    @permission_type(PermissionType.ADMIN)
+    @shell.command("put")
+    async def sftp_put(self, event: AstrMessageEvent, path: str):
+        """
+        通过 SFTP 将本条消息附带的文件或图片上传到远程路径（以 / 结尾或为目录时沿用原文件名）
+        """
+        attachment = None
+        for component in event.get_messages():
+            attachment = await self._attachment_path(component)
+            if attachment:
+                break
+        if not attachment:
+            yield event.plain_result("⚠️ 请在同一条消息中附带要上传的文件或图片")
+            return
+        local_path, name = attachment
+        try:
+            remote_path, info = await asyncio.to_thread(self._sftp_put, local_path, path, name)
+        except Exception as e:
+            logger.error(f"上传到 {path} 失败: {e}")
+            self._audit(event, f"put {path}")
+            if self.metrics:
+                self.metrics.count_command(self.ssh_host, "put", "failed")
+            yield event.plain_result(f"❌ 上传到 {path} 失败: {e}")
+            return
+        self.latency.record(self.ssh_host, "command", "put", {"transfer": info["elapsed"]})
+        self._audit(event, f"put {remote_path}", duration=info["elapsed"], output_bytes=info["size"])
+        if self.metrics:
+            self.metrics.count_command(self.ssh_host, "put", "ok")
+        yield event.plain_result(self._transfer_summary("📤", remote_path, info))
 
     @permission_type(PermissionType.ADMIN)
     @shell.command("paru")
@@ -950,9 +4813,7 @@ class ShellExecutor(Star):
         """
         在远程 Arch 系统上执行 paru -Syu --noconfirm 命令以更新系统。
         """
-        cmd = "paru -Syu --noconfirm"  # 设置更新命令
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "paru", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -961,9 +4822,7 @@ class ShellExecutor(Star):
         """
         查看网卡信息。
         """
-        cmd = "ip a"
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "ip", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -972,9 +4831,7 @@ class ShellExecutor(Star):
         """
         查看网卡信息。
         """
-        cmd = "lspci"
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "lspci", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -983,9 +4840,7 @@ class ShellExecutor(Star):
         """
         使用 inxi 工具查询精简系统状态。
         """
-        cmd = "inxi -c"
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "inxi", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -994,21 +4849,22 @@ class ShellExecutor(Star):
         """
         使用 inxi 工具查询完整系统状态。
         """
-        cmd = "inxi -F"
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "inxi-full", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @shell.command("nvidia-smi")
     async def nvidia_smi(self, event: AstrMessageEvent):
         """
-        查看nvidia显卡状态
+        查看显卡状态（NVIDIA / AMD / Intel）及各进程的显存占用
         """
-        cmd = "nvidia-smi --query-gpu=name,power.draw,power.limit,fan.speed,clocks.gr,clocks.mem --format=csv,noheader"
-
-        async for result in self._run_command(event, cmd):
-            yield result
+        try:
+            gpus = await asyncio.to_thread(self._probe_gpus)
+        except Exception as e:
+            logger.error(f"GPU 探测失败: {e}")
+            yield event.plain_result(f"❌ GPU 探测失败: {e}")
+            return
+        yield event.plain_result(self._build_gpu_report(gpus))
 
     @permission_type(PermissionType.ADMIN)
     @shell.command("cpupower")
@@ -1016,9 +4872,7 @@ class ShellExecutor(Star):
         """
         使用cpupower查看cpu状态
         """
-        cmd = "cpupower frequency-info" # cpupower -c all frequency-info
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "cpupower", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -1027,9 +4881,7 @@ class ShellExecutor(Star):
         """
         重启远程系统
         """
-        cmd = "sudo reboot"
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "reboot", []):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -1038,9 +4890,7 @@ class ShellExecutor(Star):
         """
         重启到windows系统
         """
-        cmd = "sudo rewin"
-
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "rewin", []):
             yield result
     
     @shell.group("systemctl")
@@ -1051,50 +4901,69 @@ class ShellExecutor(Star):
     @systemctl.command("start")
     async def systemctl_start(self, event: AstrMessageEvent, service: str):
         """
-        启动指定的系统服务
+        启动一个或多个系统服务，支持通配符，例如 /shell systemctl start nginx 'php*'
+        """
+        async for result in self._run_bulk(event, "systemctl", "start", service):
+            yield result
+
+    @permission_type(PermissionType.ADMIN)
+    @systemctl.command("restart")
+    async def systemctl_restart(self, event: AstrMessageEvent, service: str):
+        """
+        重启一个或多个系统服务，支持通配符
         """
-        cmd = f"sudo systemctl start {service}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "systemctl", "restart", service):
             yield result
 
+    @permission_type(PermissionType.ADMIN)
+    @systemctl.command("overview")
+    async def systemctl_overview(self, event: AstrMessageEvent, pattern: str = ""):
+        """
+        汇总全部服务（或匹配给定模式的服务）的状态、内存、CPU 时间与重启次数，突出失败与异常的单元
+        """
+        patterns = self._command_targets(event, "overview", pattern) if pattern else []
+        try:
+            overview = await asyncio.to_thread(self._probe_systemd_overview, patterns)
+        except Exception as e:
+            logger.error(f"获取 systemd 概览失败: {e}")
+            yield event.plain_result(f"❌ 获取 systemd 概览失败: {e}")
+            return
+        yield event.plain_result(self._build_systemd_overview(overview))
+
     @permission_type(PermissionType.ADMIN)
     @systemctl.command("status")
     async def systemctl_status(self, event: AstrMessageEvent, service: str):
         """
         查看指定系统服务的状态
         """
-        cmd = f"sudo systemctl status {service}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "systemctl-status", [service]):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @systemctl.command("stop")
     async def systemctl_stop(self, event: AstrMessageEvent, service: str):
         """
-        停止指定的系统服务
+        停止一个或多个系统服务，支持通配符，例如 /shell systemctl stop nginx 'php*'
         """
-        cmd = f"sudo systemctl stop {service}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "systemctl", "stop", service):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @systemctl.command("enable")
     async def systemctl_enable(self, event: AstrMessageEvent, service: str):
         """
-        启用指定的系统服务
+        启用一个或多个系统服务，支持通配符，例如 /shell systemctl enable nginx 'php*'
         """
-        cmd = f"sudo systemctl enable {service}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "systemctl", "enable", service):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @systemctl.command("disable")
     async def systemctl_disable(self, event: AstrMessageEvent, service: str):
         """
-        禁用指定的系统服务
+        禁用一个或多个系统服务，支持通配符，例如 /shell systemctl disable nginx 'php*'
         """
-        cmd = f"sudo systemctl disable {service}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "systemctl", "disable", service):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -1103,10 +4972,57 @@ class ShellExecutor(Star):
         """
         查看指定服务的最近 100 条日志
         """
-        cmd = f"journalctl -u {service} -n 100 --no-pager"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "systemctl-logs", [service]):
             yield result
 
+    @shell.group("logs")
+    def logs(self):
+        pass
+
+    @permission_type(PermissionType.ADMIN)
+    @logs.command("grep")
+    async def logs_grep(self, event: AstrMessageEvent, target: str, pattern: str):
+        """
+        在服务或容器的日志中搜索，过滤在远程完成，例如 /shell logs grep nginx 'timeout|refused' --since 2h
+        """
+        args = self._message_args(event, "grep") or [target, pattern]
+        since = None
+        command = f"logs grep {shlex.join(args)}"
+        if "--since" in args:
+            index = args.index("--since")
+            since = self._parse_since(" ".join(args[index + 1:]))
+            if since is None:
+                yield event.plain_result("⚠️ --since 支持 30m、2h、1d 或 2026-01-02 03:04 这样的时间")
+                return
+            args = args[:index]
+        if len(args) >= 2:
+            target, pattern = args[0], " ".join(args[1:])
+        limit = max(int(self.config.get("log_grep_max_lines", 200)), 1)
+        script = self._build_log_grep_script(target, pattern, since, limit)
+        async with self._semaphores["default"]:
+            result = await asyncio.to_thread(self._execute, script, None, self.timeout, (0,), "logs grep")
+        self._audit(event, command, result.exit_code, result.duration, result.stdout_bytes + result.stderr_bytes)
+        if self.metrics:
+            outcome = "failed" if result.exit_code is None else ("ok" if result.ok else "error")
+            self.metrics.count_command(self.ssh_host, "logs grep", outcome)
+            self._flush_metrics_file()
+        if result.exit_code is None:
+            logger.error(f"搜索 {target} 的日志失败: {result.error}")
+            yield event.plain_result(f"❌ 搜索日志失败: {result.error}")
+            return
+        source, _, body = result.stdout.strip().partition("\n")
+        lines = body.splitlines()
+        if source == "journal-json":
+            lines = self._format_journal_json(lines)
+        source_name = "容器" if source == "docker" else "journal"
+        if not lines:
+            yield event.plain_result(f"🔎 {target}（{source_name}）中没有匹配 {pattern} 的日志")
+            return
+        header = f"🔎 {target}（{source_name}）最近 {len(lines)} 条匹配"
+        if len(lines) >= limit:
+            header += f"（已达上限 {limit} 条，可用 --since 缩小范围）"
+        yield event.plain_result(header + ":\n" + "\n".join(lines))
+
     @shell.group("docker")
     def docker(self):
         pass
@@ -1115,30 +5031,36 @@ class ShellExecutor(Star):
     @docker.command("logs")
     async def docker_logs(self, event: AstrMessageEvent, container: str):
         """
-        查看指定 Docker 容器的日志。
+        查看指定 Docker 容器的最近 100 条日志。
         """
-        cmd = f"docker logs {container}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "docker-logs", [container]):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @docker.command("start")
     async def docker_start(self, event: AstrMessageEvent, container: str):
         """
-        启动指定的 Docker 容器。
+        启动一个或多个 Docker 容器，支持通配符，例如 /shell docker start web 'worker-*'。
         """
-        cmd = f"docker start {container}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "docker", "start", container):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @docker.command("stop")
     async def docker_stop(self, event: AstrMessageEvent, container: str):
         """
-        停止指定的 Docker 容器。
+        停止一个或多个 Docker 容器，支持通配符，例如 /shell docker stop web 'worker-*'。
+        """
+        async for result in self._run_bulk(event, "docker", "stop", container):
+            yield result
+
+    @permission_type(PermissionType.ADMIN)
+    @docker.command("restart")
+    async def docker_restart(self, event: AstrMessageEvent, container: str):
+        """
+        重启一个或多个 Docker 容器，支持通配符。
         """
-        cmd = f"docker stop {container}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "docker", "restart", container):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -1149,7 +5071,7 @@ class ShellExecutor(Star):
         """
         options = [shlex.quote(opt) for opt in [opt1, opt2, opt3, opt4, opt5] if opt is not None]
         cmd = f"docker run {' '.join(options)}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_command(event, cmd, invalidates=("docker",)):
             yield result
 
     @permission_type(PermissionType.ADMIN)
@@ -1158,26 +5080,47 @@ class ShellExecutor(Star):
         """
         拉取指定的 Docker 镜像。
         """
-        cmd = f"docker pull {image}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_registered(event, "docker-pull", [image]):
             yield result
 
     @permission_type(PermissionType.ADMIN)
     @docker.command("ps")
-    async def docker_ps(self, event: AstrMessageEvent):
+    async def docker_ps(self, event: AstrMessageEvent, mode: str = ""):
         """
-        列出所有运行中的 Docker 容器。
+        列出全部 Docker 容器及其 CPU、内存与网络占用，mode 为 image 时以图片展示。
         """
-        cmd = "docker ps"
-        async for result in self._run_command(event, cmd):
-            yield result
+        try:
+            containers = await asyncio.to_thread(self._probe_docker)
+        except Exception as e:
+            logger.error(f"Docker 探测失败: {e}")
+            yield event.plain_result(f"❌ Docker 探测失败: {e}")
+            return
+        if mode.lower() == "image" and containers:
+            try:
+                yield event.image_result(await self._render_docker_image(event, containers))
+                return
+            except Exception as e:
+                logger.error(f"渲染容器图片失败: {e}")
+        yield event.plain_result(self._build_docker_report(containers))
+
+    async def _render_docker_image(self, event: AstrMessageEvent, containers: list[dict]) -> str:
+        """复用状态卡片的页面与 Docker 片段渲染容器列表图片"""
+        lite, options = self.RENDER_PROFILES[self._choose_render_profile(event, {"containers": containers})]
+        html_doc = _STATUS_PAGE.substitute(
+            css=_STATUS_CSS_LITE if lite else _STATUS_CSS,
+            title=_STATUS_TITLE.substitute(hostname="Docker", os=self._esc(self.ssh_host)),
+            host=self._esc(self.ssh_host),
+            port=self._esc(self.ssh_port),
+            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            sections=self._build_containers_html(containers),
+        )
+        return await self.html_render(html_doc, {}, return_url=False, options=options)
 
     @permission_type(PermissionType.ADMIN)
     @docker.command("rm")
     async def docker_rm(self, event: AstrMessageEvent, container: str):
         """
-        删除指定的 Docker 容器。
+        删除一个或多个 Docker 容器，支持通配符，例如 /shell docker rm web 'worker-*'。
         """
-        cmd = f"docker rm {container}"
-        async for result in self._run_command(event, cmd):
+        async for result in self._run_bulk(event, "docker", "rm", container):
             yield result